@@ -0,0 +1,144 @@
+"""
+Native async list/retrieve endpoints for restaurants and reviews.
+
+Under ASGI the DRF viewsets run in the thread pool and hold a thread while
+they wait on the database. These views await the async ORM (`acount`,
+`aiterator`, `aget`) instead and mirror the filtering, ordering, search and
+pagination of the synchronous endpoints, rendering the same JSON (or
+MessagePack).
+"""
+import functools
+
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAcceptable, NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+
+from . import search
+from .filters import afilter_lookups
+from .models import Restaurant, Review
+from .pagination import EstimatedCountPagination, ReviewPagination
+from .renderers import MessagePackRenderer, ORJSONRenderer
+from .serializers import RestaurantSerializer, ReviewSerializer
+from .views import RestaurantViewSet, ReviewViewSet
+
+
+RENDERERS = (ORJSONRenderer(), MessagePackRenderer())
+
+
+def render(data, status_code=status.HTTP_200_OK, renderer=RENDERERS[0], media_type=None):
+    media_type = media_type or renderer.media_type
+    return HttpResponse(renderer.render(data, media_type), status=status_code, content_type=media_type)
+
+
+def async_api_view(view):
+    """
+    Wraps an async view returning response data: hands it a DRF request for
+    `query_params` and absolute URLs, renders the data in the negotiated
+    format and turns API exceptions into error responses like DRF's
+    exception handler does.
+    """
+    @require_safe
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request = Request(request)
+        try:
+            renderer, media_type = DefaultContentNegotiation().select_renderer(request, RENDERERS)
+        except NotAcceptable as exc:
+            return render({'detail': exc.detail}, exc.status_code)
+        try:
+            data = await view(request, *args, **kwargs)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return render(detail, exc.status_code, renderer, media_type)
+        return render(data, renderer=renderer, media_type=media_type)
+    return wrapper
+
+
+def list_queryset(request, view_class):
+    """
+    Starts from the viewset's queryset, loading only the columns the
+    requested fields and its ordering fields read like SparseFieldsViewMixin.
+    Returns:
+        QuerySet: The pruned queryset.
+    """
+    queryset = view_class.queryset.all()
+    columns = {field.name for field in queryset.model._meta.concrete_fields}
+    always = [name for name in view_class.ordering_fields if name in columns]
+    return view_class.serializer_class.prune_queryset(queryset, request, always)
+
+
+async def filter_queryset(request, queryset, view_class):
+    """
+    Applies the FilterSet parameters, full-text search and ordering the same
+    way the viewset's filter backends do, including its ordering fields and
+    aliases.
+    Returns:
+        QuerySet: The filtered and ordered queryset.
+    """
+    lookups, errors = await afilter_lookups(view_class.filterset_class, request.query_params)
+    if errors:
+        raise ValidationError(errors)
+    queryset = queryset.filter(**lookups)
+
+    ordering_filter = next(backend for backend in view_class.filter_backends if issubclass(backend, OrderingFilter))
+    queryset = ordering_filter().filter_queryset(request, queryset, view_class(request=request))
+
+    text = request.query_params.get('search', '').strip()
+    if text:
+        queryset = search.search(queryset, text)
+        if 'ordering' not in request.query_params:
+            queryset = queryset.order_by('-search_rank', queryset.model._meta.pk.name)
+    return queryset
+
+
+async def get_object(queryset, pk):
+    try:
+        pk = int(pk)
+    except ValueError:
+        raise NotFound()
+    try:
+        return await queryset.aget(pk=pk)
+    except queryset.model.DoesNotExist:
+        raise NotFound(f"No {queryset.model._meta.object_name} matches the given query.")
+
+
+async def paginated_list(request, queryset, paginator, serializer_class):
+    page = await paginator.apaginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data).data
+
+
+@async_api_view
+async def restaurant_list(request):
+    """Async equivalent of GET /api/restaurants/."""
+    queryset = await filter_queryset(request, list_queryset(request, RestaurantViewSet), RestaurantViewSet)
+    return await paginated_list(request, queryset, EstimatedCountPagination(), RestaurantSerializer)
+
+
+@async_api_view
+async def restaurant_detail(request, pk):
+    """Async equivalent of GET /api/restaurants/{id}/."""
+    restaurant = await get_object(
+        RestaurantSerializer.prune_queryset(Restaurant.objects.defer('search_vector'), request), pk,
+    )
+    return RestaurantSerializer(restaurant, context={'request': request}).data
+
+
+@async_api_view
+async def review_list(request):
+    """Async equivalent of GET /api/reviews/, including cursor pagination."""
+    queryset = await filter_queryset(request, list_queryset(request, ReviewViewSet), ReviewViewSet)
+    return await paginated_list(request, queryset, ReviewPagination(), ReviewSerializer)
+
+
+@async_api_view
+async def review_detail(request, pk):
+    """Async equivalent of GET /api/reviews/{id}/."""
+    review = await get_object(
+        ReviewSerializer.prune_queryset(Review.objects.defer('search_vector').select_related('user'), request), pk,
+    )
+    return ReviewSerializer(review, context={'request': request}).data
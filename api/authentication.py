@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from . import db_routing, metrics
+
+# The user state needed by the views and permissions, everything else is
+# loaded lazily (as a deferred field) if a view happens to touch it.
+CACHED_USER_FIELDS = ('user_id', 'username', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def user_cache_key(user_id):
+    return f'jwt-user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """Drops the cached authentication state of a user."""
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves the token's user from a short-lived
+    cache instead of querying the user table on every request. The cache
+    entry is dropped whenever the user is saved or deleted.
+    """
+
+    def authenticate(self, request):
+        with metrics.phase('auth'):
+            result = super().authenticate(request)
+        if result is not None:
+            # Users who just wrote read from the primary, see db_routing.
+            db_routing.set_user(result[0].pk)
+        return result
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares the password hash, which is not cached.
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = user_cache_key(user_id)
+        values = cache.get(key)
+        if values is None:
+            user = super().get_user(validated_token)
+            cache.set(
+                key,
+                {field: getattr(user, field) for field in CACHED_USER_FIELDS},
+                getattr(settings, 'JWT_USER_CACHE_TTL', 60),
+            )
+            return user
+
+        # from_db() marks every other field as deferred, so it is loaded on
+        # access instead of showing a default value, and save() never
+        # overwrites it. It takes the values in concrete field order.
+        field_names = [f.attname for f in self.user_model._meta.concrete_fields if f.attname in values]
+        user = self.user_model.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
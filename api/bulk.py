@@ -0,0 +1,66 @@
+"""
+Bulk insert helpers shared by the seed generator and the recommendations
+build.
+
+bulk_insert writes model instances with bulk_create. For rows counted in
+millions, adapt_rows and insert_rows skip model instances altogether:
+plain tuples are adapted to their database form (in worker processes, if
+any) and sent with multi-row INSERTs.
+"""
+from django.db import connections, transaction
+
+
+def bulk_insert(model, objects, batch_size, using='default'):
+    """
+    Writes model instances with bulk_create in one transaction.
+    Returns:
+        list: The created instances, with primary keys.
+    """
+    with transaction.atomic(using=using):
+        return model.objects.using(using).bulk_create(objects, batch_size=batch_size)
+
+
+def adapt_rows(model, columns, rows, using='default'):
+    """
+    Converts the datetimes of plain row tuples to their database form, so
+    insert_rows can send them as they are. Seed workers run this, not the
+    writer.
+    Returns:
+        list: The adapted rows.
+    """
+    fields = [model._meta.get_field(column) for column in columns]
+    datetimes = {index for index, field in enumerate(fields) if field.get_internal_type() == 'DateTimeField'}
+    adapt = connections[using].ops.adapt_datetimefield_value
+    return [tuple(adapt(value) if index in datetimes else value for index, value in enumerate(row)) for row in rows]
+
+
+def insert_rows(model, columns, rows, using='default'):
+    """
+    Inserts adapted row tuples with multi-row INSERT ... RETURNING statements.
+    At tens of millions of rows the per-value preparation and SQL compilation
+    of bulk_create dominate, so rows skip model instantiation.
+    Returns:
+        list: Primary keys of the inserted rows, in order.
+    """
+    connection = connections[using]
+    meta = model._meta
+    fields = [meta.get_field(column) for column in columns]
+    quote = connection.ops.quote_name
+    placeholder = f"({', '.join(['%s'] * len(fields))})"
+    max_params = connection.features.max_query_params or 10000
+    rows_per_statement = max(1, min(1000, max_params // len(fields)))
+    prefix = (
+        f"INSERT INTO {quote(meta.db_table)} ({', '.join(quote(field.column) for field in fields)}) VALUES "
+    )
+    suffix = f" RETURNING {quote(meta.pk.column)}"
+
+    pks = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), rows_per_statement):
+            batch = rows[start:start + rows_per_statement]
+            cursor.execute(
+                prefix + ', '.join([placeholder] * len(batch)) + suffix,
+                [value for row in batch for value in row],
+            )
+            pks.extend(pk for pk, in cursor.fetchall())
+    return pks
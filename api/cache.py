@@ -0,0 +1,194 @@
+"""
+Versioned server-side response cache for the restaurant endpoints.
+
+Every cached response records the version token of each restaurant it
+contains. A write bumps the token of the restaurant it touched, so the next
+read of any list page or detail containing that restaurant misses, while
+every other entry stays valid. Creating, editing or deleting a restaurant
+also bumps a global token that list pages are keyed by, because it can
+change which restaurants a page holds. Responses whose order depends on
+data spread over many objects, such as rankings, are also keyed by named
+scope tokens that the writes affecting that data bump.
+
+Version tokens are random rather than counters: if a token is evicted from
+the cache it is recreated with a fresh value, so old entries can never match
+it again.
+"""
+import hashlib
+import threading
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+RESPONSE_CACHE_ALIAS = 'api_responses'
+
+
+class CacheStats:
+    """Thread-safe, per-process hit/miss counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class VersionedResponseCache:
+    """
+    Caches serialized response data keyed by endpoint and normalized query
+    string, invalidated through per-object and global version tokens.
+    """
+
+    def __init__(self, namespace, alias=RESPONSE_CACHE_ALIAS):
+        self.namespace = namespace
+        self.alias = alias
+        self.stats = CacheStats()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'RESPONSE_CACHE_ENABLED', True)
+
+    def _version_key(self, object_id=None):
+        suffix = 'all' if object_id is None else object_id
+        return f'{self.namespace}:version:{suffix}'
+
+    def _scope_key(self, scope):
+        return f'{self.namespace}:scope:{scope}'
+
+    def _generation(self):
+        """Token bumped by every write, used to detect writes racing a cache fill."""
+        return self.cache.get(f'{self.namespace}:generation')
+
+    def _versions(self, object_ids):
+        """
+        Fetches the current version tokens, creating missing ones.
+        Returns:
+            dict: Mapping of object id (None for the global token) to token.
+        """
+        keys = {self._version_key(object_id): object_id for object_id in object_ids}
+        found = self.cache.get_many(keys)
+        versions = {keys[key]: token for key, token in found.items()}
+        for key, object_id in keys.items():
+            if object_id not in versions:
+                token = uuid.uuid4().hex
+                # add() keeps a token another process created meanwhile.
+                if not self.cache.add(key, token, timeout=None):
+                    token = self.cache.get(key, token)
+                versions[object_id] = token
+        return versions
+
+    @staticmethod
+    def normalize_query(request):
+        """
+        Builds a canonical form of the query string, independent of parameter order.
+        Returns:
+            str: The sorted, encoded query string.
+        """
+        return urlencode(sorted(
+            (key, value) for key in request.query_params for value in request.query_params.getlist(key)
+        ))
+
+    def _scope_versions(self, scopes):
+        """
+        Fetches the current tokens of the named scopes, creating missing ones.
+        Returns:
+            list: The tokens, in scope name order.
+        """
+        keys = [self._scope_key(scope) for scope in sorted(scopes)]
+        found = self.cache.get_many(keys)
+        tokens = []
+        for key in keys:
+            token = found.get(key)
+            if token is None:
+                token = uuid.uuid4().hex
+                if not self.cache.add(key, token, timeout=None):
+                    token = self.cache.get(key, token)
+            tokens.append(token)
+        return tokens
+
+    def _entry_key(self, request, endpoint, global_version=None, scope_versions=()):
+        parts = [self.namespace, endpoint, request.scheme, request.get_host(), self.normalize_query(request)]
+        if global_version is not None:
+            parts.insert(2, global_version)
+        parts[2:2] = scope_versions
+        # Hashed so any query string makes a key memcached accepts.
+        return f'{self.namespace}:entry:{hashlib.sha256(":".join(parts).encode()).hexdigest()}'
+
+    def get_or_set(self, request, endpoint, compute, object_ids, depends_on_all=False, scopes=()):
+        """
+        Returns the cached response data for the request, or computes, stores
+        and returns it. `object_ids(data)` lists the objects the data contains,
+        `scopes` names the scope tokens the response also depends on.
+        Returns:
+            tuple: (data, True if served from cache).
+        """
+        if not self.enabled:
+            return compute(), False
+
+        global_version = self._versions([None])[None] if depends_on_all else None
+        key = self._entry_key(request, endpoint, global_version, self._scope_versions(scopes) if scopes else ())
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            current = self._versions(entry['versions'])
+            if current == entry['versions']:
+                self.stats.record(hit=True)
+                return entry['data'], True
+
+        self.stats.record(hit=False)
+        generation = self._generation()
+        data = compute()
+        if data is None:
+            return None, False
+        versions = self._versions(object_ids(data))
+        # A write committed while computing may already have bumped the tokens
+        # just read, storing now could pin stale data under fresh tokens.
+        if self._generation() == generation:
+            self.cache.set(key, {'data': data, 'versions': versions})
+        return data, False
+
+    def invalidate(self, object_ids=(), membership=False, scopes=()):
+        """
+        Bumps the version tokens of the given objects and scopes, and the
+        global token if the set or order of objects may have changed. Runs
+        after the current transaction commits so readers never cache
+        uncommitted state.
+        """
+        keys = [self._version_key(object_id) for object_id in object_ids]
+        keys.extend(self._scope_key(scope) for scope in scopes)
+        if membership:
+            keys.append(self._version_key())
+        if not keys:
+            return
+
+        keys.append(f'{self.namespace}:generation')
+
+        def bump():
+            self.cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=None)
+
+        transaction.on_commit(bump)
+
+
+restaurant_cache = VersionedResponseCache('restaurants')
@@ -0,0 +1,132 @@
+"""
+Read replica routing.
+
+ReplicaRoutingMiddleware opens a RoutingState for every request. Reads of
+GET/HEAD/OPTIONS requests go to one of settings.DATABASE_REPLICAS, picked
+once per request so a response never mixes replicas; everything else,
+including reads of write requests and of code running outside a request
+(management commands, signals, tests), uses the primary.
+
+Replicas lag behind the primary, so after a successful write request an
+authenticated user is pinned to the primary for DB_REPLICA_STICKY_SECONDS
+and reads their own writes. Pins live in the default cache, which must be
+shared between processes for pins to apply across workers.
+
+`safe_reads()` routes a block of a write request like a safe request, for
+the read-only sub-requests of POST /api/batch/.
+"""
+import contextlib
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+_current = contextvars.ContextVar('db_routing', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_key(user_id):
+    return f'db-pin:{user_id}'
+
+
+class RoutingState:
+    """Database routing decisions of a single request."""
+    __slots__ = ('replica', 'user_id', 'writes', '_pinned')
+
+    def __init__(self, replica, writes=False):
+        self.replica = replica
+        self.user_id = None
+        self.writes = writes  # pins the user to the primary once successful
+        self._pinned = None
+
+    def read_alias(self):
+        """
+        The database reads of this request go to.
+        Returns:
+            str: A replica alias, or None for the primary.
+        """
+        if self.replica is None:
+            return None
+        if self.user_id is not None:
+            if self._pinned is None:
+                self._pinned = cache.get(pin_key(self.user_id)) is not None
+            if self._pinned:
+                return None
+        return self.replica
+
+
+def start_request(method):
+    """
+    Starts routing the current request.
+    Returns:
+        tuple: (RoutingState, token for stop_request).
+    """
+    aliases = replicas()
+    safe = method in REPLICA_SAFE_METHODS
+    state = RoutingState(random.choice(aliases) if aliases and safe else None, writes=not safe)
+    return state, _current.set(state)
+
+
+def stop_request(token, status_code):
+    """Ends routing the current request, pinning its user to the primary after a successful write."""
+    state = _current.get()
+    _current.reset(token)
+    if state.writes and state.user_id is not None and status_code < 400:
+        cache.set(pin_key(state.user_id), True, getattr(settings, 'DB_REPLICA_STICKY_SECONDS', 5))
+
+
+@contextlib.contextmanager
+def safe_reads():
+    """
+    Routes the reads of a block to one replica, as in a safe request, and
+    keeps the current request from pinning its user: the block must not write.
+    """
+    outer = _current.get()
+    aliases = replicas()
+    if outer is None or not aliases:
+        yield
+        return
+    outer.writes = False
+    state = RoutingState(random.choice(aliases))
+    state.user_id = outer.user_id
+    token = _current.set(state)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def set_user(user_id):
+    """Records the authenticated user of the current request, whose pin decides where it reads."""
+    state = _current.get()
+    if state is not None:
+        state.user_id = user_id
+
+
+class PrimaryReplicaRouter:
+    """Sends the reads of safe requests to a replica and everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        return state.read_alias() if state is not None else None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication.
+        return False if db in replicas() else None
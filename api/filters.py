@@ -1,4 +1,9 @@
 import django_filters
+from django import forms
+from django.core.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from . import search
 from .models import User, Restaurant, Review
  
 class UserFilter(django_filters.FilterSet):
@@ -27,4 +32,98 @@ class ReviewFilter(django_filters.FilterSet):
             'restaurant': ['exact'],
             'created_at': ['gte', 'lte'],
             'user': ['exact'],
-        }
\ No newline at end of file
+        }
+
+class RestaurantReviewFilter(django_filters.FilterSet):
+    """ReviewFilter without the restaurant, which the nested route fixes."""
+    class Meta:
+        model = Review
+        fields = {
+            'rating': ['gte', 'lte'],
+            'created_at': ['gte', 'lte'],
+            'user': ['exact'],
+        }
+
+class RankingOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter that also accepts `rating`, `review_count` and `score`,
+    read from the precomputed ranking table where they are indexed. Ties are
+    broken by primary key so pages are stable.
+    """
+    ordering_aliases = {
+        'rating': 'ranking__average_rating',
+        'review_count': 'ranking__review_count',
+        'score': 'ranking__score',
+    }
+
+    def uses_ranking(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view) or ()
+        return any(field.lstrip('-') in self.ordering_aliases for field in ordering)
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+        fields = []
+        for field in ordering:
+            descending = field.startswith('-')
+            name = self.ordering_aliases.get(field.lstrip('-'), field.lstrip('-'))
+            fields.append(f"-{name}" if descending else name)
+        if not any(field.lstrip('-') == 'pk' for field in fields):
+            fields.append('pk')
+        return queryset.order_by(*fields)
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Full-text search with relevance ranking through the `search` query parameter.
+    Results are ordered by relevance unless an explicit `ordering` is requested.
+    """
+    search_param = 'search'
+    ordering_param = 'ordering'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        queryset = search.search(queryset, text)
+        if self.ordering_param not in request.query_params:
+            queryset = queryset.order_by('-search_rank', queryset.model._meta.pk.name)
+        return queryset
+
+async def afilter_lookups(filterset_class, params):
+    """
+    Parses the query parameters of a FilterSet into ORM lookups for async
+    views. The FilterSet form can't be used there because its
+    ModelChoiceFields validate with a synchronous query, so related objects
+    are checked with the async ORM instead, with the same error message.
+    Returns:
+        tuple: (lookup kwargs for filter(), errors keyed by parameter).
+    """
+    model = filterset_class._meta.model
+    lookups, errors = {}, {}
+    for name, filter_ in filterset_class.base_filters.items():
+        raw = params.get(name)
+        if raw in (None, ''):
+            continue
+        model_field = model._meta.get_field(filter_.field_name)
+        try:
+            if model_field.is_relation:
+                value = await related_pk(model_field, raw)
+            else:
+                value = filter_.field.clean(raw)
+        except ValidationError as exc:
+            errors[name] = exc.messages
+            continue
+        lookups[f'{filter_.field_name}__{filter_.lookup_expr}'] = value
+    return lookups, errors
+
+
+async def related_pk(model_field, raw):
+    invalid = ValidationError(forms.ModelChoiceField.default_error_messages['invalid_choice'], code='invalid_choice')
+    try:
+        pk = model_field.target_field.to_python(raw)
+    except ValidationError:
+        raise invalid
+    if not await model_field.related_model._default_manager.filter(pk=pk).aexists():
+        raise invalid
+    return pk
@@ -0,0 +1,146 @@
+"""
+Geohash helpers used to index restaurant coordinates.
+
+A geohash interleaves longitude and latitude bits into a base32 string, so
+points that share a prefix lie in the same rectangular cell. Storing the
+geohash in an indexed column lets a radius query scan a handful of
+contiguous index ranges instead of the whole table.
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9  # ~4.8m x 4.8m cells
+EARTH_RADIUS_KM = 6371.0088
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """
+    Encodes a coordinate into a geohash.
+    Returns:
+        str: The geohash of the given precision.
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(geohash) < precision:
+        value, interval = (longitude, lng_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(geohash)
+
+
+def cell_size(precision):
+    """
+    Returns the size of a geohash cell.
+    Returns:
+        tuple: (height, width) of the cell in degrees.
+    """
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 - lng_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Returns the bounding box of a circle, clamped to valid latitudes.
+    Returns:
+        tuple: (min_lat, max_lat, min_lng, max_lng) in degrees.
+    """
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = max(latitude - lat_delta, -90.0)
+    max_lat = min(latitude + lat_delta, 90.0)
+    widest = max(abs(min_lat), abs(max_lat))
+    if widest >= 90.0:
+        return min_lat, max_lat, -180.0, 180.0
+    lng_delta = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(widest))))
+    if lng_delta >= 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, longitude - lng_delta, longitude + lng_delta
+
+
+def covering_cells(latitude, longitude, radius_km, max_cells=16):
+    """
+    Finds the geohash prefixes covering a circle, using the finest precision
+    that needs at most `max_cells` cells.
+    Returns:
+        list: Sorted, de-duplicated geohash prefixes.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor((max_lat + 90.0) / height) - math.floor((min_lat + 90.0) / height) + 1
+        columns = math.floor((max_lng + 180.0) / width) - math.floor((min_lng + 180.0) / width) + 1
+        if rows * columns <= max_cells or precision == 1:
+            break
+
+    cells = set()
+    for row in range(rows):
+        lat = min(min_lat + row * height, max_lat)
+        for column in range(columns):
+            lng = min(min_lng + column * width, max_lng)
+            # Wrap around the antimeridian.
+            lng = (lng + 180.0) % 360.0 - 180.0
+            cells.add(encode(lat, lng, precision))
+    return sorted(cells)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    Calculates the great-circle distance between two coordinates.
+    Returns:
+        float: Distance in kilometers.
+    """
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def prefix_successor(prefix):
+    """
+    Returns the smallest geohash prefix of the same length sorting after
+    every geohash that starts with `prefix`.
+    Returns:
+        str: The successor prefix, or None if `prefix` is the last one.
+    """
+    chars = list(prefix)
+    while chars:
+        index = BASE32.index(chars[-1])
+        if index < len(BASE32) - 1:
+            chars[-1] = BASE32[index + 1]
+            return ''.join(chars)
+        chars.pop()
+    return None
+
+
+def prefix_ranges(prefixes):
+    """
+    Converts geohash prefixes into half-open [start, end) ranges of the
+    geohash column, merging adjacent cells into a single range.
+    Returns:
+        list: (start, end) tuples, `end` is None for an unbounded range.
+    """
+    ranges = []
+    for prefix in sorted(prefixes):
+        end = prefix_successor(prefix)
+        if ranges and ranges[-1][1] == prefix:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((prefix, end))
+    return ranges
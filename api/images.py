@@ -0,0 +1,180 @@
+"""
+Resized WebP/JPEG variants of restaurant images.
+
+Resizing runs in a bounded process pool so neither the request thread nor
+the GIL is tied up by Pillow. Workers only turn image bytes into variant
+bytes; storing the files and recording them on the restaurant happens back
+in the web process. The variant names are saved in
+`Restaurant.image_variants`, so serializers build URLs without touching the
+storage.
+"""
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# name: (width, height, crop to fill)
+VARIANTS = {
+    'thumbnail': (200, 200, True),
+    'card': (640, 400, True),
+    'full': (1600, 1600, False),
+}
+# extension: (Pillow format, save options)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+VARIANT_DIR = 'variants'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_name(restaurant_id, image_name, variant, extension):
+    """
+    Builds the storage name of an image variant. The name includes the
+    restaurant and the source extension, so restaurants whose images share
+    a name (or pizza.jpg replaced by pizza.png) never share variant files.
+    Returns:
+        str: e.g. "restaurant_images/variants/42/pizza_jpg_card.webp".
+    """
+    directory, filename = posixpath.split(image_name)
+    stem, source_extension = posixpath.splitext(filename)
+    if source_extension:
+        stem = f'{stem}_{source_extension[1:]}'
+    return posixpath.join(directory, VARIANT_DIR, str(restaurant_id), f'{stem}_{variant}.{extension}')
+
+
+def render_variants(data):
+    """
+    Resizes and encodes image bytes into every variant and format. Runs in
+    a worker process, so it only deals with bytes.
+    Returns:
+        dict: Mapping of (variant, extension) to encoded bytes.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGBA' if 'transparency' in source.info or source.mode in ('LA', 'PA') else 'RGB')
+
+        rendered = {}
+        for variant, (width, height, crop) in VARIANTS.items():
+            if crop:
+                image = ImageOps.fit(source, (width, height), Image.Resampling.LANCZOS)
+            else:
+                image = source.copy()
+                image.thumbnail((width, height), Image.Resampling.LANCZOS)
+            for extension, (image_format, options) in FORMATS.items():
+                output = image.convert('RGB') if image_format == 'JPEG' and image.mode != 'RGB' else image
+                buffer = io.BytesIO()
+                output.save(buffer, image_format, **options)
+                rendered[variant, extension] = buffer.getvalue()
+        return rendered
+
+
+def store_variants(restaurant_id, image_name, rendered):
+    """
+    Writes rendered variants to the default storage, replacing the
+    restaurant's own older variants of the same image.
+    Returns:
+        dict: Mapping of variant to {extension: storage name}.
+    """
+    names = {}
+    for (variant, extension), data in rendered.items():
+        name = variant_name(restaurant_id, image_name, variant, extension)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        names.setdefault(variant, {})[extension] = default_storage.save(name, ContentFile(data))
+    return names
+
+
+def record_variants(restaurant_id, image_name, names):
+    """
+    Saves the variant names on the restaurant, unless its image changed meanwhile.
+    """
+    from .cache import restaurant_cache
+    from .models import Restaurant
+
+    updated = Restaurant.objects.filter(pk=restaurant_id, image=image_name).update(image_variants=names)
+    if updated:
+        restaurant_cache.invalidate([restaurant_id])
+
+
+def delete_variants(names):
+    """
+    Deletes stored variant files, e.g. those of a replaced or removed image.
+    """
+    for stored in names.values():
+        for name in stored.values():
+            default_storage.delete(name)
+
+
+def get_executor():
+    """
+    Returns the shared process pool, created on first use.
+    Returns:
+        ProcessPoolExecutor: The pool, or None when IMAGE_VARIANT_WORKERS is 0.
+    """
+    global _executor
+    workers = getattr(settings, 'IMAGE_VARIANT_WORKERS', 2)
+    if workers <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        return _executor
+
+
+def generate_variants(restaurant):
+    """
+    Renders and stores the variants of a restaurant image synchronously.
+    Returns:
+        dict: Mapping of variant to {extension: storage name}.
+    """
+    image_name = restaurant.image.name
+    with restaurant.image.open('rb') as image:
+        data = image.read()
+    names = store_variants(restaurant.pk, image_name, render_variants(data))
+    record_variants(restaurant.pk, image_name, names)
+    return names
+
+
+def schedule_variants(restaurant):
+    """
+    Queues variant generation for a restaurant image on the process pool.
+    With IMAGE_VARIANT_WORKERS = 0 the variants are generated inline.
+    """
+    if not restaurant.image:
+        return
+    executor = get_executor()
+    if executor is None:
+        generate_variants(restaurant)
+        return
+
+    restaurant_id, image_name = restaurant.pk, restaurant.image.name
+    with restaurant.image.open('rb') as image:
+        data = image.read()
+    submitter = threading.current_thread()
+
+    def done(future):
+        # Runs on the pool's management thread, or right away on the submitting
+        # thread if the future has already finished.
+        try:
+            record_variants(restaurant_id, image_name, store_variants(restaurant_id, image_name, future.result()))
+        except Exception:
+            logger.exception("Generating image variants for restaurant %s failed", restaurant_id)
+        finally:
+            # Only close the connection opened on the management thread, not the request's.
+            if threading.current_thread() is not submitter:
+                connections.close_all()
+
+    executor.submit(render_variants, data).add_done_callback(done)
@@ -0,0 +1,277 @@
+"""
+Streaming bulk import of restaurants and reviews from CSV or NDJSON files.
+
+Rows are read lazily and written in fixed-size batches with bulk_create, so
+memory stays constant no matter how large the file is. Every batch resolves
+its users and restaurants with one query each and runs in its own
+transaction. Derived data (rating aggregates, search index, response cache)
+is refreshed once per batch or once at the end instead of once per row.
+"""
+import contextlib
+import csv
+import io
+import json
+import sys
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from . import geo, search
+from .cache import restaurant_cache
+from .models import Change, Restaurant, RestaurantRanking, Review, User
+from .serializers import ReviewSerializer
+
+FORMATS = ('csv', 'ndjson')
+
+
+class RowError(ValueError):
+    """Raised for a row that can't be imported."""
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+    restaurant_ids: set = field(default_factory=set)  # restaurants that received reviews
+
+    def reject(self, line, message, max_errors):
+        self.skipped += 1
+        if len(self.errors) < max_errors:
+            self.errors.append(f"line {line}: {message}")
+
+
+def detect_format(path, fmt=None):
+    """
+    Works out the file format from the explicit choice or the file extension.
+    Returns:
+        str: 'csv' or 'ndjson'.
+    """
+    if fmt:
+        return fmt
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    raise ValueError(f"Cannot detect the format of {path!r}, pass --format.")
+
+
+@contextlib.contextmanager
+def open_source(path):
+    """Opens a file for streaming, '-' reads standard input."""
+    if path == '-':
+        yield io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        return
+    with open(path, encoding='utf-8', newline='') as handle:
+        yield handle
+
+
+def iter_rows(handle, fmt):
+    """
+    Lazily parses a CSV or NDJSON stream.
+    Returns:
+        iterator: (line number, row dict or RowError) tuples.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(handle, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, RowError(f"invalid JSON ({exc})")
+            continue
+        yield line_number, row if isinstance(row, dict) else RowError("expected a JSON object")
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def optional_float(row, name, minimum, maximum):
+    value = row.get(name)
+    if blank(value):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{name} must be a number")
+    if not minimum <= value <= maximum:
+        raise RowError(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+
+def required_integer(row, name):
+    """
+    Reads an integer column. Booleans and fractional numbers are rejected
+    rather than truncated by int().
+    """
+    value = row.get(name)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise RowError(f"{name} must be an integer")
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError(f"{name} must be an integer")
+
+
+def required_text(row, name):
+    value = row.get(name)
+    if blank(value):
+        raise RowError(f"{name} is required")
+    return str(value)
+
+
+@contextlib.contextmanager
+def preserve_timestamps(model, *field_names):
+    """
+    Temporarily disables auto_now/auto_now_add so imported timestamps are kept.
+    Rows without a timestamp still need one set explicitly.
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def import_restaurants(rows, batch_size=5000, max_errors=100):
+    """
+    Validates and bulk inserts restaurants.
+    Returns:
+        ImportResult: Counters and the first `max_errors` error messages.
+    """
+    result = ImportResult()
+    for batch in batched(rows, batch_size):
+        restaurants = []
+        for line, row in batch:
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                latitude = optional_float(row, 'latitude', -90, 90)
+                longitude = optional_float(row, 'longitude', -180, 180)
+                restaurants.append(Restaurant(
+                    name=required_text(row, 'name')[:200],
+                    image=required_text(row, 'image'),
+                    description=required_text(row, 'description'),
+                    address=required_text(row, 'address')[:200],
+                    latitude=latitude,
+                    longitude=longitude,
+                    website=None if blank(row.get('website')) else str(row['website'])[:200],
+                    geohash=geo.encode(latitude, longitude) if None not in (latitude, longitude) else None,
+                ))
+            except RowError as exc:
+                result.reject(line, exc, max_errors)
+
+        with transaction.atomic():
+            created = Restaurant.objects.bulk_create(restaurants)
+            search.index_instances(Restaurant, created)
+            RestaurantRanking.objects.refresh([restaurant.pk for restaurant in created])
+            Change.objects.record(('restaurant', restaurant.pk, 'create') for restaurant in created)
+        result.created += len(created)
+
+    if result.created:
+        restaurant_cache.invalidate(membership=True, scopes=['ranking'])
+    return result
+
+
+def import_reviews(rows, batch_size=5000, max_errors=100):
+    """
+    Validates and bulk inserts reviews, keeping at most one review per user
+    and restaurant, then rebuilds the rating aggregates of every restaurant
+    that received reviews.
+    Returns:
+        ImportResult: Counters and the first `max_errors` error messages.
+    """
+    result = ImportResult()
+    validator = ReviewSerializer()
+    with preserve_timestamps(Review, 'created_at', 'updated_at'):
+        for batch in batched(rows, batch_size):
+            parsed = []
+            for line, row in batch:
+                try:
+                    if isinstance(row, RowError):
+                        raise row
+                    try:
+                        rating = validator.validate_rating(required_integer(row, 'rating'))
+                    except serializers.ValidationError as exc:
+                        raise RowError(exc.detail[0])
+                    restaurant_id = required_integer(row, 'restaurant')
+                    created_at = None
+                    if not blank(row.get('created_at')):
+                        created_at = parse_datetime(str(row['created_at']))
+                        if created_at is None:
+                            raise RowError("created_at must be an ISO 8601 datetime")
+                        if timezone.is_naive(created_at):
+                            created_at = timezone.make_aware(created_at)
+                    parsed.append((line, required_text(row, 'user'), restaurant_id, rating,
+                                   required_text(row, 'review'), created_at))
+                except RowError as exc:
+                    result.reject(line, exc, max_errors)
+
+            with transaction.atomic():
+                result.created += _insert_review_batch(parsed, result, max_errors)
+
+    if result.restaurant_ids:
+        Restaurant.objects.rebuild_rating_aggregates(result.restaurant_ids)
+        Change.objects.record(('restaurant', pk, 'update') for pk in result.restaurant_ids)
+        restaurant_cache.invalidate(result.restaurant_ids, scopes=['ranking'])
+    return result
+
+
+def _insert_review_batch(parsed, result, max_errors):
+    """
+    Resolves users and restaurants of a parsed batch with one query each,
+    drops duplicates and inserts the rest.
+    Returns:
+        int: Number of reviews created.
+    """
+    users = dict(User.objects.filter(username__in={row[1] for row in parsed}).values_list('username', 'user_id'))
+    restaurants = set(Restaurant.objects.filter(pk__in={row[2] for row in parsed}).values_list('pk', flat=True))
+    existing = set(
+        Review.objects.filter(user_id__in=users.values(), restaurant_id__in=restaurants)
+        .values_list('user_id', 'restaurant_id')
+    )
+
+    now = timezone.now()
+    reviews = []
+    for line, username, restaurant_id, rating, text, created_at in parsed:
+        user_id = users.get(username)
+        if user_id is None:
+            result.reject(line, f"user {username!r} does not exist", max_errors)
+        elif restaurant_id not in restaurants:
+            result.reject(line, f"restaurant {restaurant_id} does not exist", max_errors)
+        elif (user_id, restaurant_id) in existing:
+            result.reject(line, f"user {username!r} has already reviewed restaurant {restaurant_id}", max_errors)
+        else:
+            existing.add((user_id, restaurant_id))
+            reviews.append(Review(
+                user_id=user_id, restaurant_id=restaurant_id, rating=rating, review=text,
+                created_at=created_at or now, updated_at=created_at or now,
+            ))
+
+    created = Review.objects.bulk_create(reviews)
+    search.index_instances(Review, created)
+    Change.objects.record(('review', review.pk, 'create') for review in created)
+    result.restaurant_ids.update(review.restaurant_id for review in created)
+    return len(created)
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from api import recommendations
+from api.cache import restaurant_cache
+
+
+class Command(BaseCommand):
+    help = "Compute the most similar restaurants of every restaurant from the reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help="Only recompute restaurants reviewed since the last build.",
+        )
+        parser.add_argument(
+            '--neighbours', type=int, default=recommendations.NEIGHBOURS,
+            help="Similar restaurants stored per restaurant.",
+        )
+        parser.add_argument(
+            '--shrinkage', type=float, default=recommendations.SHRINKAGE,
+            help="Common reviewers at which a similarity counts half.",
+        )
+        parser.add_argument(
+            '--min-common', type=int, default=recommendations.MIN_COMMON_REVIEWERS,
+            help="Common reviewers needed for two restaurants to be similar at all.",
+        )
+        parser.add_argument(
+            '--block-size', type=int, default=recommendations.BLOCK_SIZE,
+            help="Restaurants compared per sparse matrix product, bounds memory use.",
+        )
+
+    def handle(self, *args, **options):
+        result = recommendations.build(
+            incremental=options['incremental'],
+            neighbours=options['neighbours'],
+            shrinkage=options['shrinkage'],
+            min_common=options['min_common'],
+            block_size=options['block_size'],
+            progress=self.stdout.write,
+        )
+        restaurant_cache.invalidate(scopes=['similarity'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {result['rows']} neighbours of {result['restaurants']} restaurants from {result['reviews']} "
+            f"reviews (load {result['load']:.1f}s, compute {result['compute']:.1f}s, store {result['store']:.1f}s)."
+        ))
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import Change
+
+
+class Command(BaseCommand):
+    help = "Delete change log entries older than --days that newer entries of the same object supersede."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=30,
+            help="Only compact entries older than this many days.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help="Number of change ids scanned per DELETE.",
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        deleted = Change.objects.compact(before, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} superseded change log entries."))
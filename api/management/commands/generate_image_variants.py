@@ -0,0 +1,60 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from api import images
+from api.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = "Generate resized WebP/JPEG variants for existing restaurant images in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Number of resizing processes.",
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Regenerate variants that already exist.",
+        )
+
+    def handle(self, *args, **options):
+        restaurants = Restaurant.objects.exclude(image='').only('pk', 'image', 'image_variants').order_by('pk')
+        if not options['force']:
+            restaurants = restaurants.filter(image_variants={})
+
+        generated = failed = 0
+        # Keep a bounded number of images in flight so memory stays flat.
+        max_pending = options['workers'] * 4
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            pending = {}
+
+            def collect(futures):
+                nonlocal generated, failed
+                for future in futures:
+                    restaurant_id, image_name = pending.pop(future)
+                    try:
+                        names = images.store_variants(restaurant_id, image_name, future.result())
+                        images.record_variants(restaurant_id, image_name, names)
+                        generated += 1
+                    except Exception as exc:
+                        failed += 1
+                        self.stderr.write(f"Restaurant {restaurant_id} ({image_name}): {exc}")
+
+            for restaurant in restaurants.iterator(chunk_size=500):
+                try:
+                    with restaurant.image.open('rb') as image:
+                        data = image.read()
+                except OSError as exc:
+                    failed += 1
+                    self.stderr.write(f"Restaurant {restaurant.pk} ({restaurant.image.name}): {exc}")
+                    continue
+                pending[executor.submit(images.render_variants, data)] = (restaurant.pk, restaurant.image.name)
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(list(pending))
+
+        self.stdout.write(self.style.SUCCESS(f"Generated variants for {generated} restaurants, {failed} failed."))
@@ -0,0 +1,12 @@
+from api import imports
+
+from .import_reviews import Command as ImportReviewsCommand
+
+
+class Command(ImportReviewsCommand):
+    help = (
+        "Stream restaurants from a CSV or NDJSON file into the database. Columns: "
+        "name, image, description, address and optionally latitude, longitude, website."
+    )
+    importer = staticmethod(imports.import_restaurants)
+    label = "restaurants"
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream reviews from a CSV or NDJSON file into the database. Columns: "
+        "user (username), restaurant (id), rating, review and optionally created_at."
+    )
+    importer = staticmethod(imports.import_reviews)
+    label = "reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, '-' reads standard input.")
+        parser.add_argument('--format', choices=imports.FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT batch.")
+        parser.add_argument('--max-errors', type=int, default=100, help="Number of rejected rows to report.")
+
+    def handle(self, *args, **options):
+        try:
+            fmt = imports.detect_format(options['path'], options['format'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        started = time.perf_counter()
+        try:
+            with imports.open_source(options['path']) as handle:
+                result = self.importer(
+                    imports.iter_rows(handle, fmt),
+                    batch_size=options['batch_size'],
+                    max_errors=options['max_errors'],
+                )
+        except OSError as exc:
+            raise CommandError(exc)
+        elapsed = time.perf_counter() - started
+
+        for error in result.errors:
+            self.stderr.write(error)
+        if result.skipped > len(result.errors):
+            self.stderr.write(f"... and {result.skipped - len(result.errors)} more rejected rows")
+        rate = result.created / elapsed * 60 if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} {self.label}, skipped {result.skipped} "
+            f"in {elapsed:.1f}s ({rate:,.0f} rows/min)."
+        ))
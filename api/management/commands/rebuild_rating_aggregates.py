@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = "Rebuild the stored rating aggregates of restaurants from their reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'restaurant_ids', nargs='*', type=int,
+            help="Only rebuild these restaurants (default: all).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of restaurants written per UPDATE batch.",
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = Restaurant.objects.rebuild_rating_aggregates(
+            options['restaurant_ids'] or None,
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating aggregates for {rebuilt} restaurants."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import restaurant_cache
+from api.models import RatingRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily, weekly and monthly rating rollups of restaurants from their reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'restaurant_ids', nargs='*', type=int,
+            help="Only rebuild these restaurants (default: all).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of rollup rows written per INSERT batch.",
+        )
+
+    def handle(self, *args, **options):
+        written = RatingRollup.objects.rebuild(options['restaurant_ids'] or None, batch_size=options['batch_size'])
+        restaurant_cache.invalidate(scopes=['rollups'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} rating rollups."))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api import search
+from api.models import Restaurant, Review
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of restaurants and reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of rows indexed per batch.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in (Restaurant, Review):
+            fields = ['pk'] + [field for field, _ in search.SEARCH_FIELDS[search.kind_of(model)]]
+            indexed = 0
+            batch = []
+            for instance in model.objects.only(*fields).iterator(chunk_size=batch_size):
+                batch.append(instance)
+                if len(batch) >= batch_size:
+                    search.index_instances(model, batch)
+                    indexed += len(batch)
+                    batch = []
+            search.index_instances(model, batch)
+            indexed += len(batch)
+            self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} {model._meta.verbose_name_plural}."))
@@ -0,0 +1,68 @@
+import os
+import time
+from datetime import datetime, time as day_start
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api import seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with deterministic synthetic users, clustered restaurants and "
+        "Zipf-distributed reviews for load testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--restaurants', type=int, default=2000)
+        parser.add_argument('--reviews', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=42, help="Same seed and sizes give the same data.")
+        parser.add_argument('--years', type=float, default=5, help="Time span of the review dates.")
+        parser.add_argument(
+            '--end-date', type=datetime.fromisoformat, default=timezone.localdate(),
+            help="Date of the newest reviews (default today), fix it to reproduce a data set exactly.",
+        )
+        parser.add_argument('--zipf', type=float, default=1.1, help="Skew of reviews per restaurant.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix, must not clash with existing users.")
+        parser.add_argument('--password', help="Password shared by all users (default: unusable).")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Review generating processes.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT batch.")
+        parser.add_argument(
+            '--no-search-index', action='store_true',
+            help="Skip indexing for full-text search (run rebuild_search_index later).",
+        )
+
+    def handle(self, *args, **options):
+        if any(options[name] < 0 for name in ('users', 'restaurants', 'reviews')):
+            raise CommandError("Sizes can't be negative.")
+        end = options['end_date']
+        if not isinstance(end, datetime):
+            end = datetime.combine(end, day_start())
+        if timezone.is_naive(end):
+            end = timezone.make_aware(end)
+
+        spec = seed.SeedSpec(
+            users=options['users'],
+            restaurants=options['restaurants'],
+            reviews=options['reviews'],
+            end=end,
+            seed=options['seed'],
+            years=options['years'],
+            zipf=options['zipf'],
+            prefix=options['prefix'],
+            password=options['password'],
+            batch_size=options['batch_size'],
+            index_search=not options['no_search_index'],
+        )
+        started = time.perf_counter()
+        created = seed.seed(
+            spec, workers=options['workers'],
+            progress=lambda message: self.stdout.write(message) if options['verbosity'] > 1 else None,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created['users']} users, {created['restaurants']} restaurants and "
+            f"{created['reviews']} reviews in {elapsed:.1f}s."
+        ))
@@ -1,6 +1,48 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
 from django.contrib.auth.base_user import BaseUserManager
+from django.core.cache import cache
+from django.db import connections, models, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Sum, Value, When
+from django.db.models.functions import Trunc
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from . import geo
+
+RATING_STARS = range(1, 6)
+# Geohash characters kept as the ranking area, 6 is about 1.2 x 0.6 km.
+RANKING_AREA_PRECISION = 6
+RANKING_PRIOR_CACHE_KEY = 'ranking:prior-mean'
+# The prior mean drifts slowly, it is recomputed at most this often.
+RANKING_PRIOR_TTL = 3600
+# Ratings above this count as liking a restaurant in recommendations.
+NEUTRAL_RATING = 3
+# Rating rollup bucket sizes, named after the Trunc kinds that compute them.
+ROLLUP_GRANULARITIES = ('day', 'week', 'month')
+# Object types and actions recorded in the change log served at /api/changes/.
+CHANGE_TYPES = ('restaurant', 'review')
+CHANGE_ACTIONS = ('create', 'update', 'delete')
+
+
+def period_start(value, granularity):
+    """
+    The first day of the rollup bucket containing a date or datetime, in the
+    current time zone. Weeks start on Monday.
+    Returns:
+        date: The bucket's period.
+    """
+    day = timezone.localtime(value).date() if isinstance(value, datetime) else value
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
 class UserManager(BaseUserManager):
     """Custom manager for user model"""
 
@@ -28,4 +70,376 @@ class UserManager(BaseUserManager):
         if extra_fields.get('is_staff') is not True:
             raise ValueError(_("Superuser must have is_staff=True."))
 
-        return self.create_user(username, email, password, **extra_fields)
\ No newline at end of file
+        return self.create_user(username, email, password, **extra_fields)
+
+class RestaurantManager(models.Manager):
+    """Custom manager for restaurant model"""
+
+    def apply_rating_change(self, restaurant_id, rating, delta=1):
+        """
+        Atomically adds (delta=1) or removes (delta=-1) a single rating from
+        the stored aggregates of a restaurant, and re-ranks it.
+        Returns:
+            int: Number of restaurants updated (0 if the restaurant does not exist).
+        """
+        updated = self.filter(pk=restaurant_id).update(**{
+            'review_count': F('review_count') + delta,
+            'rating_sum': F('rating_sum') + delta * rating,
+            f'rating_count_{rating}': F(f'rating_count_{rating}') + delta,
+        })
+        if updated:
+            self.model._meta.get_field('ranking').related_model.objects.refresh([restaurant_id])
+        return updated
+
+    def apply_ratings(self, ratings):
+        """
+        Adds one new rating to each of several restaurants in a single
+        UPDATE, and re-ranks them. `ratings` maps restaurant id to rating.
+        Returns:
+            int: Number of restaurants updated (fewer than given if some do not exist).
+        """
+        if not ratings:
+            return 0
+        updated = self.filter(pk__in=ratings).update(
+            review_count=F('review_count') + 1,
+            rating_sum=F('rating_sum') + Case(
+                *(When(pk=restaurant_id, then=Value(rating)) for restaurant_id, rating in ratings.items()),
+                default=Value(0),
+            ),
+            **{
+                f'rating_count_{star}': F(f'rating_count_{star}') + Case(
+                    When(pk__in=[pk for pk, rating in ratings.items() if rating == star], then=Value(1)),
+                    default=Value(0),
+                )
+                for star in set(ratings.values())
+            },
+        )
+        if updated:
+            self.model._meta.get_field('ranking').related_model.objects.refresh(ratings)
+        return updated
+
+    def rebuild_rating_aggregates(self, restaurant_ids=None, batch_size=1000, rank=True):
+        """
+        Recomputes the stored rating aggregates and rating rollups from the
+        review table, and the rankings of the restaurants unless `rank` is False.
+        Restaurants without reviews are reset to zero.
+        Returns:
+            int: Number of restaurants rebuilt.
+        """
+        review_model = self.model._meta.get_field('reviews').related_model
+        reviews = review_model.objects.all()
+        restaurants = self.all()
+        if restaurant_ids is not None:
+            reviews = reviews.filter(restaurant_id__in=restaurant_ids)
+            restaurants = restaurants.filter(pk__in=restaurant_ids)
+
+        totals = {
+            row.pop('restaurant_id'): row
+            for row in reviews.values('restaurant_id').order_by().annotate(
+                review_count=Count('pk'),
+                rating_sum=Sum('rating'),
+                **{
+                    f'rating_count_{star}': Count('pk', filter=Q(rating=star))
+                    for star in RATING_STARS
+                },
+            )
+        }
+
+        fields = ['review_count', 'rating_sum'] + [f'rating_count_{star}' for star in RATING_STARS]
+        empty = dict.fromkeys(fields, 0)
+        rebuilt = 0
+        with transaction.atomic(using=self.db):
+            batch = []
+            for restaurant in restaurants.only('pk').iterator(chunk_size=batch_size):
+                for field, value in totals.get(restaurant.pk, empty).items():
+                    setattr(restaurant, field, value)
+                batch.append(restaurant)
+                if len(batch) >= batch_size:
+                    self.bulk_update(batch, fields)
+                    rebuilt += len(batch)
+                    batch = []
+            if batch:
+                self.bulk_update(batch, fields)
+                rebuilt += len(batch)
+
+        self.model._meta.get_field('rollups').related_model.objects.rebuild(restaurant_ids, batch_size)
+        if rank:
+            rankings = self.model._meta.get_field('ranking').related_model.objects
+            if restaurant_ids is None:
+                rankings.rebuild(batch_size)
+            else:
+                rankings.refresh(restaurant_ids, batch_size)
+        return rebuilt
+
+    def nearby(self, latitude, longitude, radius_km, limit):
+        """
+        Finds the restaurants closest to a coordinate within a radius.
+        Only the geohash cells covering the search circle are scanned.
+        Returns:
+            list: (restaurant, distance in km) tuples, nearest first.
+        """
+        cell_filter = Q()
+        for start, end in geo.prefix_ranges(geo.covering_cells(latitude, longitude, radius_km)):
+            cell = Q(geohash__gte=start)
+            if end is not None:
+                cell &= Q(geohash__lt=end)
+            cell_filter |= cell
+
+        candidates = self.filter(cell_filter).values_list('pk', 'latitude', 'longitude')
+        nearest = sorted(
+            (distance, pk)
+            for pk, lat, lng in candidates.iterator()
+            if (distance := geo.haversine_km(latitude, longitude, lat, lng)) <= radius_km
+        )[:limit]
+
+        restaurants = self.in_bulk([pk for _, pk in nearest])
+        return [(restaurants[pk], distance) for distance, pk in nearest if pk in restaurants]
+
+class RankingManager(models.Manager):
+    """Custom manager for the precomputed restaurant ranking"""
+
+    def prior(self):
+        """
+        The prior of the Bayesian average: the mean of every rating, cached
+        in the shared cache, and how many reviews' worth of weight it gets.
+        Returns:
+            tuple: (prior mean, prior weight).
+        """
+        weight = getattr(settings, 'RANKING_PRIOR_WEIGHT', 10)
+        mean = cache.get(RANKING_PRIOR_CACHE_KEY)
+        if mean is None:
+            restaurant_model = self.model._meta.get_field('restaurant').related_model
+            totals = restaurant_model.objects.aggregate(ratings=Sum('rating_sum'), reviews=Sum('review_count'))
+            mean = totals['ratings'] / totals['reviews'] if totals['reviews'] else 3.0
+            cache.set(RANKING_PRIOR_CACHE_KEY, mean, RANKING_PRIOR_TTL)
+        return mean, weight
+
+    def score(self, rating_sum, review_count, prior):
+        mean, weight = prior
+        return (weight * mean + rating_sum) / (weight + review_count)
+
+    def refresh(self, restaurant_ids, batch_size=1000):
+        """
+        Recomputes the ranking rows of the given restaurants from their
+        stored aggregates, creating missing rows.
+        Returns:
+            int: Number of rows written.
+        """
+        restaurant_model = self.model._meta.get_field('restaurant').related_model
+        restaurant_ids = list(restaurant_ids)
+        prior = self.prior()
+        written = 0
+        for start in range(0, len(restaurant_ids), batch_size):
+            rows = restaurant_model.objects.filter(pk__in=restaurant_ids[start:start + batch_size]).values_list(
+                'pk', 'geohash', 'review_count', 'rating_sum',
+            )
+            written += self._write(rows, prior, batch_size)
+        return written
+
+    def rebuild(self, batch_size=1000):
+        """
+        Recomputes the prior mean and the ranking of every restaurant.
+        Returns:
+            int: Number of rows written.
+        """
+        cache.delete(RANKING_PRIOR_CACHE_KEY)
+        restaurant_model = self.model._meta.get_field('restaurant').related_model
+        prior = self.prior()
+        rows = restaurant_model.objects.order_by('pk').values_list('pk', 'geohash', 'review_count', 'rating_sum')
+        batch, written = [], 0
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                written += self._write(batch, prior, batch_size)
+                batch = []
+        return written + self._write(batch, prior, batch_size)
+
+    def _write(self, rows, prior, batch_size):
+        rankings = [
+            self.model(
+                restaurant_id=pk,
+                score=self.score(rating_sum, review_count, prior),
+                average_rating=rating_sum / review_count if review_count else 0,
+                review_count=review_count,
+                area=(geohash or '')[:RANKING_AREA_PRECISION],
+            )
+            for pk, geohash, review_count, rating_sum in rows
+        ]
+        self.bulk_create(
+            rankings, batch_size=batch_size, update_conflicts=True, unique_fields=['restaurant'],
+            update_fields=['score', 'average_rating', 'review_count', 'area'],
+        )
+        return len(rankings)
+
+class SimilarityManager(models.Manager):
+    """Custom manager for the precomputed restaurant neighbours"""
+
+    def recommend(self, user_id, limit=25):
+        """
+        Scores restaurants the user hasn't reviewed by their similarity to
+        the ones they have: neighbours of restaurants rated above
+        NEUTRAL_RATING gain, neighbours of those rated below lose.
+        Returns:
+            list: (restaurant id, score) tuples, best first.
+        """
+        return list(
+            self.filter(restaurant__reviews__user_id=user_id)
+            .exclude(similar__reviews__user_id=user_id)
+            .values('similar_id')
+            .annotate(recommendation=Sum(F('score') * (F('restaurant__reviews__rating') - NEUTRAL_RATING)))
+            .filter(recommendation__gt=0)
+            .order_by('-recommendation', 'similar_id')
+            .values_list('similar_id', 'recommendation')[:limit]
+        )
+
+class RollupManager(models.Manager):
+    """Custom manager for the per-period rating rollups"""
+
+    def apply_changes(self, changes):
+        """
+        Adds reviews to (delta=1) or removes them from (delta=-1) the rollup
+        buckets of every granularity. `changes` holds (restaurant id, review
+        created_at, rating, delta) tuples. Buckets receiving the same
+        increments are updated by a single UPDATE.
+        Returns:
+            int: Number of buckets updated.
+        """
+        increments = defaultdict(Counter)
+        for restaurant_id, created_at, rating, delta in changes:
+            day = period_start(created_at, 'day')
+            for granularity in ROLLUP_GRANULARITIES:
+                increments[restaurant_id, granularity, period_start(day, granularity)].update({
+                    'review_count': delta, 'rating_sum': delta * rating, f'rating_count_{rating}': delta,
+                })
+
+        groups = defaultdict(list)
+        for bucket, counter in increments.items():
+            changed = tuple(sorted((field, value) for field, value in counter.items() if value))
+            if changed:
+                groups[changed].append(bucket)
+        new_buckets = [
+            self.model(restaurant_id=pk, granularity=granularity, period=period)
+            for changed, buckets in groups.items() if dict(changed).get('review_count', 0) > 0
+            for pk, granularity, period in buckets
+        ]
+        if new_buckets:
+            # Zeroed rows for buckets that may not exist yet, so every bucket is incremented in place.
+            self.bulk_create(new_buckets, ignore_conflicts=True)
+        updated = 0
+        for changed, buckets in groups.items():
+            updated += self.filter(reduce(or_, (
+                Q(restaurant_id=pk, granularity=granularity, period=period) for pk, granularity, period in buckets
+            ))).update(**{field: F(field) + value for field, value in changed})
+        return updated
+
+    def rebuild(self, restaurant_ids=None, batch_size=1000):
+        """
+        Recomputes the rollups of the given restaurants (default: all) from
+        the review table with one grouped query per granularity.
+        Returns:
+            int: Number of rollup rows written.
+        """
+        review_model = self.model._meta.get_field('restaurant').related_model._meta.get_field('reviews').related_model
+        reviews = review_model.objects.all()
+        rollups = self.all()
+        if restaurant_ids is not None:
+            reviews = reviews.filter(restaurant_id__in=restaurant_ids)
+            rollups = rollups.filter(restaurant_id__in=restaurant_ids)
+
+        written = 0
+        with transaction.atomic(using=self.db):
+            rollups.delete()
+            for granularity in ROLLUP_GRANULARITIES:
+                rows = reviews.annotate(
+                    period=Trunc('created_at', granularity, output_field=models.DateField()),
+                ).values('restaurant_id', 'period').order_by().annotate(
+                    review_count=Count('pk'),
+                    rating_sum=Sum('rating'),
+                    **{f'rating_count_{star}': Count('pk', filter=Q(rating=star)) for star in RATING_STARS},
+                )
+                batch = []
+                for row in rows.iterator(chunk_size=batch_size):
+                    batch.append(self.model(granularity=granularity, **row))
+                    if len(batch) >= batch_size:
+                        written += len(self.bulk_create(batch))
+                        batch = []
+                written += len(self.bulk_create(batch))
+        return written
+
+class ChangeManager(models.Manager):
+    """Custom manager for the append-only change log"""
+
+    def record(self, changes):
+        """
+        Appends (object type, object id, action) entries with one INSERT.
+        Call it last in the writing transaction, so entries commit shortly
+        after their ids are drawn.
+        Returns:
+            list: The created entries.
+        """
+        now = timezone.now()
+        return self.bulk_create([
+            self.model(object_type=object_type, object_id=object_id, action=action, changed_at=now)
+            for object_type, object_id, action in dict.fromkeys(changes)
+        ])
+
+    def record_existing(self, model, object_type, after=0):
+        """
+        Logs a create entry for every row of `model` whose primary key is
+        above `after`, with one INSERT ... SELECT, e.g. after bulk seeding.
+        Returns:
+            int: Number of entries created.
+        """
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        meta, source = self.model._meta, model._meta
+        columns = ', '.join(
+            quote(meta.get_field(name).column) for name in ('object_type', 'object_id', 'action', 'changed_at')
+        )
+        pk = quote(source.pk.column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {quote(meta.db_table)} ({columns}) "
+                f"SELECT %s, {pk}, %s, %s FROM {quote(source.db_table)} WHERE {pk} > %s ORDER BY {pk}",
+                [object_type, 'create', connection.ops.adapt_datetimefield_value(timezone.now()), after],
+            )
+            return cursor.rowcount
+
+    def after(self, cursor, limit, settle_seconds=0):
+        """
+        Reads the entries following `cursor` in cursor order, with one scan
+        of the primary key index. Stops before the first entry younger than
+        `settle_seconds`: a concurrent transaction may still commit an entry
+        with a lower id, which a client past that id would never see.
+        Returns:
+            tuple: (entries, True if more settled entries may follow).
+        """
+        entries = list(self.filter(change_id__gt=cursor).order_by('change_id')[:limit + 1])
+        horizon = timezone.now() - timedelta(seconds=settle_seconds)
+        for index, entry in enumerate(entries):
+            if entry.changed_at > horizon:
+                return entries[:index], False
+        return entries[:limit], len(entries) > limit
+
+    def compact(self, before, batch_size=10000):
+        """
+        Deletes entries older than `before` that a newer entry of the same
+        object supersedes, one DELETE per `batch_size` ids. The latest entry
+        of every object is kept, tombstones included, so clients syncing from
+        any cursor still end up with every object's current state.
+        Returns:
+            int: Number of entries deleted.
+        """
+        last = self.filter(changed_at__lt=before).order_by('-change_id').values_list('change_id', flat=True).first()
+        first = self.order_by('change_id').values_list('change_id', flat=True).first()
+        if last is None:
+            return 0
+        superseded = self.filter(
+            object_type=OuterRef('object_type'), object_id=OuterRef('object_id'), change_id__gt=OuterRef('change_id'),
+        )
+        deleted = 0
+        for start in range(first, last + 1, batch_size):
+            deleted += self.filter(
+                change_id__gte=start, change_id__lte=min(start + batch_size - 1, last), changed_at__lt=before,
+            ).filter(Exists(superseded)).delete()[0]
+        return deleted
@@ -0,0 +1,203 @@
+"""
+Per-request performance instrumentation and Prometheus histograms.
+
+PerformanceMetricsMiddleware (api/middleware.py) opens a RequestMetrics for
+every request. SQL is measured by an execute wrapper installed on each
+database connection, authentication and serialization by `phase()` blocks
+in the authentication class and serializers. The current request is found
+through a context variable, so queries run by the async ORM in its worker
+thread are counted too, and every hook is a single lookup when no request
+is being measured.
+
+Histograms live in this process only: with several worker processes,
+Prometheus scrapes each one separately.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def enabled():
+    return getattr(settings, 'PERFORMANCE_METRICS_ENABLED', False)
+
+
+class RequestMetrics:
+    """Measurements of a single request."""
+    __slots__ = ('sql_count', 'sql_time', 'phases', '_open')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.phases = {}
+        self._open = set()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if name in self._open:
+            # Nested (e.g. a serializer inside a list serializer), counted once.
+            yield
+            return
+        self._open.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+            self._open.discard(name)
+
+
+def start_request():
+    """
+    Starts measuring the current request.
+    Returns:
+        tuple: (RequestMetrics, token for stop_request).
+    """
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def stop_request(token):
+    _current.reset(token)
+
+
+def phase(name):
+    """Times a block as part of the current request's `name` phase, if one is measured."""
+    metrics = _current.get()
+    if metrics is None:
+        return contextlib.nullcontext()
+    return metrics.phase(name)
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """Database execute wrapper counting the queries of the measured request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_count += 1
+        metrics.sql_time += time.perf_counter() - started
+
+
+def _install_sql_wrapper(sender, connection, **kwargs):
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+def install_sql_wrapper():
+    """Adds the execute wrapper to open connections and every connection opened later."""
+    connection_created.connect(_install_sql_wrapper, dispatch_uid='api.metrics.sql_wrapper')
+    for connection in connections.all(initialized_only=True):
+        _install_sql_wrapper(None, connection)
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with one series per label set."""
+
+    def __init__(self, name, documentation, buckets, labels=('route', 'method')):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # One counter per bucket, then the sum and the count.
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            labels = ','.join(f'{name}="{escape(value)}"' for name, value in zip(self.labels, label_values))
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {series[-2]}')
+            lines.append(f'{self.name}_count{{{labels}}} {series[-1]}')
+        return lines
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_DURATION = Histogram('api_request_duration_seconds', "Total time spent handling the request.", DURATION_BUCKETS)
+VIEW_DURATION = Histogram('api_view_duration_seconds', "Time spent in the view, before rendering.", DURATION_BUCKETS)
+SQL_DURATION = Histogram('api_sql_duration_seconds', "Time spent running SQL queries.", DURATION_BUCKETS)
+SQL_QUERIES = Histogram('api_sql_queries', "Number of SQL queries run.", QUERY_BUCKETS)
+AUTH_DURATION = Histogram('api_auth_duration_seconds', "Time spent authenticating.", DURATION_BUCKETS)
+SERIALIZE_DURATION = Histogram(
+    'api_serialize_duration_seconds', "Time spent serializing, including the queries it runs.", DURATION_BUCKETS,
+)
+RESPONSE_SIZE = Histogram('api_response_size_bytes', "Size of non-streaming response bodies.", SIZE_BUCKETS)
+HISTOGRAMS = (
+    REQUEST_DURATION, VIEW_DURATION, SQL_DURATION, SQL_QUERIES, AUTH_DURATION, SERIALIZE_DURATION, RESPONSE_SIZE,
+)
+PHASE_HISTOGRAMS = {'view': VIEW_DURATION, 'auth': AUTH_DURATION, 'serialize': SERIALIZE_DURATION}
+
+
+def record(route, method, metrics, total, response_size=None):
+    labels = (route, method)
+    REQUEST_DURATION.observe(labels, total)
+    SQL_DURATION.observe(labels, metrics.sql_time)
+    SQL_QUERIES.observe(labels, metrics.sql_count)
+    for name, histogram in PHASE_HISTOGRAMS.items():
+        if name in metrics.phases:
+            histogram.observe(labels, metrics.phases[name])
+    if response_size is not None:
+        RESPONSE_SIZE.observe(labels, response_size)
+
+
+def server_timing(metrics, total):
+    """
+    Formats the measurements as a Server-Timing header value, in milliseconds.
+    Returns:
+        str: The header value.
+    """
+    entries = [f'sql;desc="{metrics.sql_count} queries";dur={metrics.sql_time * 1000:.2f}']
+    entries.extend(f'{name};dur={duration * 1000:.2f}' for name, duration in metrics.phases.items())
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+def render_metrics():
+    return '\n'.join(line for histogram in HISTOGRAMS for line in histogram.render()) + '\n'
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of the histograms. If METRICS_TOKEN is set,
+    scrapers must send it as a bearer token.
+    """
+    if not enabled():
+        raise Http404
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,118 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import db_routing, metrics
+
+KNOWN_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+
+class PerformanceMetricsMiddleware:
+    """
+    Measures SQL, authentication, serialization, view and render time and the
+    response size of every request. Adds them as a Server-Timing header and
+    to the per-route histograms served at /metrics.
+
+    Removed from the middleware stack entirely unless
+    PERFORMANCE_METRICS_ENABLED is set. Keep it first in MIDDLEWARE so the
+    total includes the other middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics.enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        metrics.install_sql_wrapper()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        request_metrics, token = metrics.start_request()
+        request._performance_metrics = request_metrics
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.stop_request(token)
+        return self.finish(request, response, request_metrics, started)
+
+    async def __acall__(self, request):
+        request_metrics, token = metrics.start_request()
+        request._performance_metrics = request_metrics
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.stop_request(token)
+        return self.finish(request, response, request_metrics, started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._performance_view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns, time it separately.
+        now = time.perf_counter()
+        request_metrics = request._performance_metrics
+        request_metrics.phases['view'] = now - request._performance_view_started
+        response.add_post_render_callback(
+            lambda rendered: request_metrics.phases.__setitem__('render', time.perf_counter() - now)
+        )
+        return response
+
+    def finish(self, request, response, request_metrics, started):
+        total = time.perf_counter() - started
+        view_started = getattr(request, '_performance_view_started', None)
+        if view_started is not None and 'view' not in request_metrics.phases:
+            request_metrics.phases['view'] = time.perf_counter() - view_started
+
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        method = request.method if request.method in KNOWN_METHODS else 'OTHER'
+        size = None if response.streaming else len(response.content)
+        metrics.record(route, method, request_metrics, total, size)
+        response['Server-Timing'] = metrics.server_timing(request_metrics, total)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Routes the database reads of each request through
+    db_routing.PrimaryReplicaRouter. Removed from the middleware stack when
+    no DATABASE_REPLICAS are configured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not db_routing.replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        _, token = db_routing.start_request(request.method)
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            db_routing.stop_request(token, response.status_code if response is not None else 500)
+        return response
+
+    async def __acall__(self, request):
+        _, token = db_routing.start_request(request.method)
+        response = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            db_routing.stop_request(token, response.status_code if response is not None else 500)
+        return response
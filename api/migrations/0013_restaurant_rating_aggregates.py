@@ -0,0 +1,69 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:17
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Restaurant = apps.get_model("api", "Restaurant")
+    Review = apps.get_model("api", "Review")
+    totals = (
+        Review.objects.values("restaurant_id")
+        .order_by()
+        .annotate(
+            review_count=Count("pk"),
+            rating_sum=Sum("rating"),
+            **{
+                f"rating_count_{star}": Count("pk", filter=Q(rating=star))
+                for star in range(1, 6)
+            },
+        )
+    )
+    for row in totals:
+        Restaurant.objects.filter(pk=row.pop("restaurant_id")).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_alter_review_created_at_alter_review_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="rating_count_1",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="rating_count_2",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="rating_count_3",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="rating_count_4",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="rating_count_5",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="review_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
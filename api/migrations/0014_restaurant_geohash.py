@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+from api import geo
+
+
+def backfill_geohash(apps, schema_editor):
+    Restaurant = apps.get_model("api", "Restaurant")
+    restaurants = Restaurant.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).only("pk", "latitude", "longitude")
+    batch = []
+    for restaurant in restaurants.iterator(chunk_size=1000):
+        restaurant.geohash = geo.encode(restaurant.latitude, restaurant.longitude)
+        batch.append(restaurant)
+        if len(batch) == 1000:
+            Restaurant.objects.bulk_update(batch, ["geohash"])
+            batch = []
+    Restaurant.objects.bulk_update(batch, ["geohash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0013_restaurant_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="geohash",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=9, null=True
+            ),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
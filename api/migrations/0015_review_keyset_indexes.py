@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0014_restaurant_geohash"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["restaurant", "created_at", "review_id"],
+                name="review_restaurant_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["user", "created_at", "review_id"],
+                name="review_user_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["created_at", "review_id"], name="review_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["restaurant", "rating", "review_id"],
+                name="review_restaurant_rating_idx",
+            ),
+        ),
+    ]
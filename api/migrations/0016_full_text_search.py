@@ -0,0 +1,90 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:28
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+GIN_INDEXES = (
+    ("api_restaurant", "restaurant_search_vector_gin"),
+    ("api_review", "review_search_vector_gin"),
+)
+
+
+def create_gin_indexes(apps, schema_editor):
+    """GIN indexes are PostgreSQL only, other databases use SearchToken."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, index in GIN_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {index} ON {table} USING gin (search_vector)"
+        )
+    schema_editor.execute(
+        "UPDATE api_restaurant SET search_vector ="
+        " setweight(to_tsvector('english', coalesce(name, '')), 'A')"
+        " || setweight(to_tsvector('english', coalesce(address, '')), 'B')"
+        " || setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+    )
+    schema_editor.execute(
+        "UPDATE api_review SET search_vector ="
+        " setweight(to_tsvector('english', coalesce(review, '')), 'A')"
+    )
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for _, index in GIN_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0015_review_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="review",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.CreateModel(
+            name="SearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=20)),
+                ("object_id", models.IntegerField()),
+                ("token", models.CharField(max_length=64)),
+                ("weight", models.FloatField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "token", "object_id"],
+                        name="searchtoken_lookup_idx",
+                    ),
+                    models.Index(
+                        fields=["kind", "object_id"], name="searchtoken_object_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0016_full_text_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_rankings(apps, schema_editor):
+    Restaurant = apps.get_model("api", "Restaurant")
+    RestaurantRanking = apps.get_model("api", "RestaurantRanking")
+    totals = Restaurant.objects.aggregate(
+        ratings=Sum("rating_sum"), reviews=Sum("review_count")
+    )
+    mean = totals["ratings"] / totals["reviews"] if totals["reviews"] else 3.0
+    weight = getattr(settings, "RANKING_PRIOR_WEIGHT", 10)
+    rows = Restaurant.objects.values_list("pk", "geohash", "review_count", "rating_sum")
+    batch = []
+    for pk, geohash, review_count, rating_sum in rows.iterator(chunk_size=1000):
+        batch.append(
+            RestaurantRanking(
+                restaurant_id=pk,
+                score=(weight * mean + rating_sum) / (weight + review_count),
+                average_rating=rating_sum / review_count if review_count else 0,
+                review_count=review_count,
+                area=(geohash or "")[:6],
+            )
+        )
+        if len(batch) == 1000:
+            RestaurantRanking.objects.bulk_create(batch)
+            batch = []
+    RestaurantRanking.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0017_restaurant_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RestaurantRanking",
+            fields=[
+                (
+                    "restaurant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="ranking",
+                        serialize=False,
+                        to="api.restaurant",
+                    ),
+                ),
+                ("score", models.FloatField(default=0)),
+                ("average_rating", models.FloatField(default=0)),
+                ("review_count", models.PositiveIntegerField(default=0)),
+                ("area", models.CharField(blank=True, max_length=6)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["-score", "restaurant"], name="ranking_score_idx"
+                    ),
+                    models.Index(
+                        fields=["area", "-score", "restaurant"],
+                        name="ranking_area_score_idx",
+                    ),
+                    models.Index(
+                        fields=["-average_rating", "restaurant"],
+                        name="ranking_rating_idx",
+                    ),
+                    models.Index(
+                        fields=["-review_count", "restaurant"],
+                        name="ranking_review_count_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_rankings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:17
+
+import json
+import logging
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Min, Q, Sum
+
+logger = logging.getLogger("api.migrations")
+
+
+def remove_duplicate_reviews(apps, schema_editor):
+    """
+    Keep the first review of each user per restaurant and log every removed
+    review as an import_reviews row so it can be restored, then recount the
+    restaurants that lost reviews.
+    """
+    Restaurant = apps.get_model("api", "Restaurant")
+    RestaurantRanking = apps.get_model("api", "RestaurantRanking")
+    Review = apps.get_model("api", "Review")
+    SearchToken = apps.get_model("api", "SearchToken")
+    duplicates = (
+        Review.objects.values("user_id", "restaurant_id")
+        .order_by()
+        .annotate(first=Min("pk"), reviews=Count("pk"))
+        .filter(reviews__gt=1)
+    )
+    restaurant_ids = set()
+    for row in list(duplicates):
+        extra = Review.objects.filter(
+            user_id=row["user_id"], restaurant_id=row["restaurant_id"]
+        ).exclude(pk=row["first"])
+        for review in extra.select_related("user").order_by("pk"):
+            logger.warning(
+                "Removing duplicate review %s (kept review %s): %s",
+                review.pk,
+                row["first"],
+                json.dumps(
+                    {
+                        "user": review.user.username,
+                        "restaurant": review.restaurant_id,
+                        "rating": review.rating,
+                        "review": review.review,
+                        "created_at": review.created_at.isoformat(),
+                    }
+                ),
+            )
+        SearchToken.objects.filter(
+            kind="review", object_id__in=extra.values("pk")
+        ).delete()
+        extra.delete()
+        restaurant_ids.add(row["restaurant_id"])
+    if not restaurant_ids:
+        return
+
+    totals = (
+        Review.objects.filter(restaurant_id__in=restaurant_ids)
+        .values("restaurant_id")
+        .order_by()
+        .annotate(
+            review_count=Count("pk"),
+            rating_sum=Sum("rating"),
+            **{
+                f"rating_count_{star}": Count("pk", filter=Q(rating=star))
+                for star in range(1, 6)
+            },
+        )
+    )
+    for row in totals:
+        Restaurant.objects.filter(pk=row.pop("restaurant_id")).update(**row)
+
+    totals = Restaurant.objects.aggregate(
+        ratings=Sum("rating_sum"), reviews=Sum("review_count")
+    )
+    mean = totals["ratings"] / totals["reviews"] if totals["reviews"] else 3.0
+    weight = getattr(settings, "RANKING_PRIOR_WEIGHT", 10)
+    rows = Restaurant.objects.filter(pk__in=restaurant_ids).values_list(
+        "pk", "review_count", "rating_sum"
+    )
+    for pk, review_count, rating_sum in rows:
+        RestaurantRanking.objects.filter(restaurant_id=pk).update(
+            score=(weight * mean + rating_sum) / (weight + review_count),
+            average_rating=rating_sum / review_count if review_count else 0,
+            review_count=review_count,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0018_restaurant_ranking"),
+    ]
+
+    operations = [
+        # Deleted reviews are logged above; nothing is restored on reversal.
+        migrations.RunPython(remove_duplicate_reviews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0019_remove_duplicate_reviews"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="review",
+            constraint=models.UniqueConstraint(
+                fields=("user", "restaurant"), name="review_unique_user_restaurant"
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0020_review_unique_user_restaurant"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RestaurantSimilarity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.FloatField()),
+                ("common_reviewers", models.PositiveIntegerField()),
+                ("computed_at", models.DateTimeField()),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="similarities",
+                        to="api.restaurant",
+                    ),
+                ),
+                (
+                    "similar",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="api.restaurant",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["restaurant", "-score", "similar"],
+                        name="similarity_lookup_idx",
+                    ),
+                    models.Index(
+                        fields=["computed_at"], name="similarity_computed_idx"
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("restaurant", "similar"), name="similarity_unique_pair"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Trunc
+
+
+def backfill_rollups(apps, schema_editor):
+    Review = apps.get_model("api", "Review")
+    RatingRollup = apps.get_model("api", "RatingRollup")
+    for granularity in ("day", "week", "month"):
+        rows = (
+            Review.objects.annotate(
+                period=Trunc("created_at", granularity, output_field=models.DateField())
+            )
+            .values("restaurant_id", "period")
+            .order_by()
+            .annotate(
+                review_count=Count("pk"),
+                rating_sum=Sum("rating"),
+                **{
+                    f"rating_count_{star}": Count("pk", filter=Q(rating=star))
+                    for star in range(1, 6)
+                },
+            )
+        )
+        batch = []
+        for row in rows.iterator(chunk_size=1000):
+            batch.append(RatingRollup(granularity=granularity, **row))
+            if len(batch) == 1000:
+                RatingRollup.objects.bulk_create(batch)
+                batch = []
+        RatingRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0021_restaurant_similarity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RatingRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("day", "day"), ("week", "week"), ("month", "month")],
+                        max_length=5,
+                    ),
+                ),
+                ("period", models.DateField()),
+                ("review_count", models.PositiveIntegerField(default=0)),
+                ("rating_sum", models.PositiveIntegerField(default=0)),
+                ("rating_count_1", models.PositiveIntegerField(default=0)),
+                ("rating_count_2", models.PositiveIntegerField(default=0)),
+                ("rating_count_3", models.PositiveIntegerField(default=0)),
+                ("rating_count_4", models.PositiveIntegerField(default=0)),
+                ("rating_count_5", models.PositiveIntegerField(default=0)),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rollups",
+                        to="api.restaurant",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("restaurant", "granularity", "period"),
+                        name="rollup_unique_bucket",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
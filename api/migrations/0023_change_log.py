@@ -0,0 +1,68 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:48
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_changes(apps, schema_editor):
+    # One create entry per existing restaurant and review, so a client
+    # syncing from cursor 0 gets the whole catalogue.
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+    table = quote(apps.get_model("api", "Change")._meta.db_table)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        for object_type in ("restaurant", "review"):
+            meta = apps.get_model("api", object_type)._meta
+            pk = quote(meta.pk.column)
+            cursor.execute(
+                f"INSERT INTO {table} (object_type, object_id, action, changed_at) "
+                f"SELECT %s, {pk}, 'create', %s FROM {quote(meta.db_table)} ORDER BY {pk}",
+                [object_type, now],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0022_rating_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Change",
+            fields=[
+                ("change_id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "object_type",
+                    models.CharField(
+                        choices=[("restaurant", "restaurant"), ("review", "review")],
+                        max_length=10,
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("create", "create"),
+                            ("update", "update"),
+                            ("delete", "delete"),
+                        ],
+                        max_length=6,
+                    ),
+                ),
+                ("changed_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["object_type", "object_id", "change_id"],
+                        name="change_object_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
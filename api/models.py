@@ -1,11 +1,16 @@
 import uuid
 
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
-from django.db.models import Avg
+from django.utils import timezone
 from django.utils.timesince import timesince
 
-from .managers import UserManager
+from . import geo
+from .managers import (
+    CHANGE_ACTIONS, CHANGE_TYPES, RANKING_AREA_PRECISION, RATING_STARS, ROLLUP_GRANULARITIES, ChangeManager,
+    RankingManager, RestaurantManager, RollupManager, SimilarityManager, UserManager,
+)
 
 
 class User(AbstractBaseUser, PermissionsMixin):
@@ -47,21 +52,54 @@ class Restaurant(models.Model):
     restaurant_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=200)
     image = models.ImageField(upload_to='restaurant_images/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # see api/images.py
     description = models.TextField()
     address = models.CharField(max_length=200)
     latitude = models.FloatField(blank=True, null=True)
     longitude = models.FloatField(blank=True, null=True)
     website = models.CharField(max_length=200, blank=True, null=True)
+    geohash = models.CharField(max_length=geo.GEOHASH_PRECISION, blank=True, null=True, db_index=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)  # PostgreSQL only, see api/search.py
+
+    # Denormalized rating aggregates, maintained by ReviewViewSet and
+    # rebuilt by the rebuild_rating_aggregates management command.
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count_1 = models.PositiveIntegerField(default=0)
+    rating_count_2 = models.PositiveIntegerField(default=0)
+    rating_count_3 = models.PositiveIntegerField(default=0)
+    rating_count_4 = models.PositiveIntegerField(default=0)
+    rating_count_5 = models.PositiveIntegerField(default=0)
+
+    objects = RestaurantManager()
+
+    def save(self, *args, **kwargs):
+        self.geohash = self.compute_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+
+    def compute_geohash(self):
+        """
+        Calculates the geohash used to index the restaurant location.
+        Returns:
+            str: The geohash, or None if the restaurant has no coordinates.
+        """
+        if self.latitude is None or self.longitude is None:
+            return None
+        return geo.encode(self.latitude, self.longitude)
 
     @property
     def total_rating(self):
         """
-        Calculates the average rating for the restaurant based on all reviews.
+        Calculates the average rating for the restaurant from the stored aggregates.
         Returns:
             float: The average rating rounded to one decimal place, or 0 if no ratings exist.
         """
-        rating = self.reviews.aggregate(avg_rating=Avg('rating'))['avg_rating']
-        return round(rating,1) if rating else 0
+        if not self.review_count:
+            return 0
+        return round(self.rating_sum / self.review_count, 1)
     
     @total_rating.setter
     def set_bar(self, obj):
@@ -73,7 +111,16 @@ class Restaurant(models.Model):
     
     @property
     def total_reviews(self):
-        return self.reviews.count()
+        return self.review_count
+
+    @property
+    def rating_distribution(self):
+        """
+        Returns the number of reviews per star.
+        Returns:
+            dict: Mapping of star (1-5) to review count.
+        """
+        return {star: getattr(self, f'rating_count_{star}') for star in RATING_STARS}
 
 class Review(models.Model):
     review_id = models.AutoField(primary_key=True)
@@ -84,6 +131,19 @@ class Review(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews')
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='reviews')
+    search_vector = SearchVectorField(null=True, editable=False)  # PostgreSQL only, see api/search.py
+
+    class Meta:
+        indexes = [
+            # Keyset pagination: every (filter, ordering) page is an index range scan.
+            models.Index(fields=['restaurant', 'created_at', 'review_id'], name='review_restaurant_created_idx'),
+            models.Index(fields=['user', 'created_at', 'review_id'], name='review_user_created_idx'),
+            models.Index(fields=['created_at', 'review_id'], name='review_created_idx'),
+            models.Index(fields=['restaurant', 'rating', 'review_id'], name='review_restaurant_rating_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'restaurant'], name='review_unique_user_restaurant'),
+        ]
     
     @property
     def time_since_posted(self):
@@ -102,4 +162,127 @@ class Review(models.Model):
         Returns:
             bool: True if the review has been updated after creation, False otherwise.
         """
-        return self.created_at != self.updated_at
\ No newline at end of file
+        return self.created_at != self.updated_at
+
+class SearchToken(models.Model):
+    """
+    Inverted index entry used for full-text search on databases without
+    native text search (PostgreSQL uses the search_vector columns instead).
+    """
+    kind = models.CharField(max_length=20)  # model name of the indexed object
+    object_id = models.IntegerField()
+    token = models.CharField(max_length=64)
+    weight = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'token', 'object_id'], name='searchtoken_lookup_idx'),
+            models.Index(fields=['kind', 'object_id'], name='searchtoken_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.token}"
+
+class RestaurantRanking(models.Model):
+    """
+    Precomputed leaderboard entry of a restaurant, kept in sync with its
+    rating aggregates so rating orderings are index scans.
+    """
+    restaurant = models.OneToOneField(Restaurant, on_delete=models.CASCADE, primary_key=True, related_name='ranking')
+    # Bayesian average: the mean rating pulled towards the mean of all
+    # ratings, so a single 5-star review can't top the leaderboard.
+    score = models.FloatField(default=0)
+    average_rating = models.FloatField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    area = models.CharField(max_length=RANKING_AREA_PRECISION, blank=True)  # geohash prefix
+
+    objects = RankingManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score', 'restaurant'], name='ranking_score_idx'),
+            models.Index(fields=['area', '-score', 'restaurant'], name='ranking_area_score_idx'),
+            models.Index(fields=['-average_rating', 'restaurant'], name='ranking_rating_idx'),
+            models.Index(fields=['-review_count', 'restaurant'], name='ranking_review_count_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id}: {self.score:.3f}"
+
+class RestaurantSimilarity(models.Model):
+    """
+    One of the precomputed nearest neighbours of a restaurant by the
+    ratings of their common reviewers, built by api/recommendations.py.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='similarities')
+    similar = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    common_reviewers = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+
+    objects = SimilarityManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'similar'], name='similarity_unique_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['restaurant', '-score', 'similar'], name='similarity_lookup_idx'),
+            models.Index(fields=['computed_at'], name='similarity_computed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id} ~ {self.similar_id}: {self.score:.3f}"
+
+class RatingRollup(models.Model):
+    """
+    Review count, rating sum and star histogram of the reviews of a
+    restaurant created in one day, week or month, kept in sync by
+    ReviewViewSet so rating trends never scan the review table.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='rollups')
+    granularity = models.CharField(max_length=5, choices=[(name, name) for name in ROLLUP_GRANULARITIES])
+    period = models.DateField()  # first day of the bucket, weeks start on Monday
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count_1 = models.PositiveIntegerField(default=0)
+    rating_count_2 = models.PositiveIntegerField(default=0)
+    rating_count_3 = models.PositiveIntegerField(default=0)
+    rating_count_4 = models.PositiveIntegerField(default=0)
+    rating_count_5 = models.PositiveIntegerField(default=0)
+
+    objects = RollupManager()
+
+    class Meta:
+        constraints = [
+            # Also the index trend queries scan.
+            models.UniqueConstraint(fields=['restaurant', 'granularity', 'period'], name='rollup_unique_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id} {self.granularity} {self.period}: {self.review_count}"
+
+
+class Change(models.Model):
+    """
+    Append-only log of restaurant and review writes, read by /api/changes/
+    so clients can sync what changed since their last cursor, the id of the
+    last entry they read. Deletes leave tombstones; compact_changes drops
+    old entries superseded by newer ones of the same object.
+    """
+    change_id = models.BigAutoField(primary_key=True)
+    object_type = models.CharField(max_length=10, choices=[(name, name) for name in CHANGE_TYPES])
+    object_id = models.PositiveIntegerField()
+    action = models.CharField(max_length=6, choices=[(name, name) for name in CHANGE_ACTIONS])
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    objects = ChangeManager()
+
+    class Meta:
+        indexes = [
+            # Finds newer entries of the same object when compacting.
+            models.Index(fields=['object_type', 'object_id', 'change_id'], name='change_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.change_id}: {self.action} {self.object_type} {self.object_id}"
@@ -0,0 +1,381 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks with a `(ordering field, primary key)` keyset
+    instead of an offset, so every page is an index range scan no matter how
+    deep the client pages, and no COUNT(*) is run.
+
+    The ordering comes from the `ordering` query parameter (restricted to
+    `ordering_fields`) and the primary key breaks ties between equal values.
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    ordering_query_param = 'ordering'
+    default_limit = 25
+    max_limit = 100
+    ordering_fields = ()
+    default_ordering = None
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._finish_page(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async variant of paginate_queryset for views using the async ORM."""
+        queryset = self._page_queryset(queryset, request)
+        return self._finish_page([obj async for obj in queryset.aiterator()])
+
+    def _page_queryset(self, queryset, request):
+        """
+        Orders and filters the queryset down to the rows of the requested page.
+        Returns:
+            QuerySet: The page plus one extra row telling whether more follow.
+        """
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.field, self.descending = self.get_ordering(request)
+        pk_name = queryset.model._meta.pk.attname
+        self.pk_name = pk_name
+
+        value, pk, backwards = self.decode_cursor(request)
+        if pk is not None:
+            try:
+                value = queryset.model._meta.get_field(self.field).to_python(value)
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        self.cursor_pk, self.backwards = pk, backwards
+        # Walking backwards means reading the opposite direction and flipping the page.
+        descending = self.descending != backwards
+        direction = '-' if descending else ''
+        queryset = queryset.order_by(f'{direction}{self.field}', f'{direction}{pk_name}')
+
+        if pk is not None:
+            past, beyond = ('lt', 'lte') if descending else ('gt', 'gte')
+            # The redundant bound on the ordering field alone gives the planner an index range.
+            queryset = queryset.filter(**{f'{self.field}__{beyond}': value}).filter(
+                Q(**{f'{self.field}__{past}': value}) | Q(**{f'{pk_name}__{past}': pk})
+            )
+        return queryset[:self.limit + 1]
+
+    def _finish_page(self, page):
+        has_more = len(page) > self.limit
+        page = page[:self.limit]
+        if self.backwards:
+            page.reverse()
+
+        self.page = page
+        self.has_next = has_more if not self.backwards else self.cursor_pk is not None
+        self.has_previous = (self.cursor_pk is not None) if not self.backwards else has_more
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def get_ordering(self, request):
+        """
+        Resolves the requested ordering to a field and direction.
+        Returns:
+            tuple: (field name, True if descending).
+        """
+        ordering = request.query_params.get(self.ordering_query_param, '').split(',')[0].strip()
+        if ordering.lstrip('-') not in self.ordering_fields:
+            ordering = self.default_ordering
+        return ordering.lstrip('-'), ordering.startswith('-')
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], backwards=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], backwards=True)
+
+    def encode_cursor(self, instance, backwards):
+        """
+        Builds the URL of the page after (or before) `instance`.
+        Returns:
+            str: Absolute URL carrying the cursor.
+        """
+        # Pages hold model instances, or values() rows on the fast list path.
+        read = instance.__getitem__ if isinstance(instance, dict) else partial(getattr, instance)
+        value = read(self.field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        payload = {'v': value, 'pk': read(self.pk_name)}
+        if backwards:
+            payload['b'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        """
+        Reads the cursor of the current request.
+        Returns:
+            tuple: (ordering value, primary key, backwards), or (None, None, False) for the first page.
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            value, pk, backwards = payload['v'], payload['pk'], bool(payload.get('b'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        # Cursors are built from a scalar column and an integer key, anything else was crafted.
+        if not isinstance(value, (str, int, float)) or not isinstance(pk, int) or isinstance(pk, bool):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk, backwards
+
+
+class ReviewCursorPagination(KeysetPagination):
+    ordering_fields = ('created_at', 'rating')
+    default_ordering = '-created_at'
+
+
+class AsyncLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination that can also page a queryset with the async ORM.
+    """
+    default_limit = 25
+    max_limit = 100
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async variant of paginate_queryset for views using the async ORM."""
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [obj async for obj in queryset[self.offset:self.offset + self.limit].aiterator()]
+
+
+class EstimatedCountPagination(AsyncLimitOffsetPagination):
+    """
+    Limit/offset pagination that only counts small results exactly.
+
+    Up to PAGINATION_EXACT_COUNT_THRESHOLD rows are counted with a COUNT(*)
+    bounded by that many rows. Larger results get the planner's row estimate
+    on PostgreSQL, and elsewhere an exact count cached for
+    PAGINATION_COUNT_CACHE_TTL seconds. `count_is_exact` in the response
+    tells which; an estimated page reads one extra row to know whether
+    another page follows.
+
+    Views can spare the count with a `known_count` attribute, or have
+    `count_queryset` counted instead of the paginated queryset, such as the
+    model queryset behind a values() page, whose joins the count would keep.
+    """
+    count_cache_prefix = 'page-count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self._start_page(request, view):
+            return None
+        self.count, self.count_is_exact = self.count_results(queryset)
+        queryset = self._page_queryset(queryset)
+        return self._finish_page([] if queryset is None else list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async variant of paginate_queryset for views using the async ORM."""
+        if not self._start_page(request, view):
+            return None
+        self.count, self.count_is_exact = await self.acount_results(queryset)
+        queryset = self._page_queryset(queryset)
+        return self._finish_page([] if queryset is None else [obj async for obj in queryset.aiterator()])
+
+    def _start_page(self, request, view):
+        self.request, self.view = request, view
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        return self.limit is not None
+
+    def _page_queryset(self, queryset):
+        """
+        Slices the requested page out of the queryset.
+        Returns:
+            QuerySet: The page, plus one extra row if the count is estimated, or None past the end.
+        """
+        if not self.count_is_exact:
+            return queryset[self.offset:self.offset + self.limit + 1]
+        if self.count == 0 or self.offset > self.count:
+            return None
+        return queryset[self.offset:self.offset + self.limit]
+
+    def _finish_page(self, page):
+        if self.count_is_exact:
+            self.has_next = self.offset + self.limit < self.count
+        else:
+            self.has_next = len(page) > self.limit
+            page = page[:self.limit]
+            # An estimate can't be below the rows actually seen.
+            self.count = max(self.count, self.offset + len(page) + self.has_next)
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        return page
+
+    def get_count_queryset(self, queryset):
+        count_queryset = getattr(self.view, 'count_queryset', None)
+        return (queryset if count_queryset is None else count_queryset).order_by()
+
+    def count_results(self, queryset):
+        """
+        Counts the rows of the queryset, exactly up to the threshold.
+        Returns:
+            tuple: (count, True if the count is exact).
+        """
+        known_count = getattr(self.view, 'known_count', None)
+        if known_count is not None:
+            return known_count, True
+        queryset = self.get_count_queryset(queryset)
+        threshold = self.get_exact_count_threshold()
+        count = queryset.values('pk')[:threshold + 1].count()
+        if count <= threshold:
+            return count, True
+        return self.estimate_count(queryset, threshold)
+
+    async def acount_results(self, queryset):
+        """Async variant of count_results."""
+        known_count = getattr(self.view, 'known_count', None)
+        if known_count is not None:
+            return known_count, True
+        queryset = self.get_count_queryset(queryset)
+        threshold = self.get_exact_count_threshold()
+        count = await queryset.values('pk')[:threshold + 1].acount()
+        if count <= threshold:
+            return count, True
+        return await sync_to_async(self.estimate_count)(queryset, threshold)
+
+    def get_exact_count_threshold(self):
+        return getattr(settings, 'PAGINATION_EXACT_COUNT_THRESHOLD', 10000)
+
+    def estimate_count(self, queryset, threshold):
+        """
+        Estimates the row count of a queryset known to exceed the threshold.
+        Returns:
+            tuple: (count, True if the count is exact).
+        """
+        connection = connections[queryset.db]
+        sql, params = queryset.query.get_compiler(connection=connection).as_sql()
+        if connection.vendor == 'postgresql':
+            return max(self.planner_estimate(connection, sql, params), threshold + 1), False
+
+        key = f'{self.count_cache_prefix}:{hashlib.md5(f"{sql}{params!r}".encode()).hexdigest()}'
+        count = cache.get(key)
+        if count is not None:
+            return count, False
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, 'PAGINATION_COUNT_CACHE_TTL', 60))
+        return count, True
+
+    def planner_estimate(self, connection, sql, params):
+        """
+        Reads the row estimate of the query's top plan node from EXPLAIN.
+        Returns:
+            int: Estimated number of rows.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return super().get_next_link()
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'count_is_exact': self.count_is_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_exact'] = {'type': 'boolean', 'example': True}
+        return response_schema
+
+
+class ReviewPagination(EstimatedCountPagination):
+    """
+    Limit/offset pagination for reviews that switches to keyset pagination
+    when the client asks for it with `?cursor=` (empty for the first page)
+    or `?pagination=cursor`.
+    """
+    cursor_pagination_class = ReviewCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self._use_cursor(request):
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        if self._use_cursor(request):
+            return await self.cursor_paginator.apaginate_queryset(queryset, request, view)
+        return await super().apaginate_queryset(queryset, request, view)
+
+    def _use_cursor(self, request):
+        self.cursor_paginator = None
+        if self.cursor_pagination_class.cursor_query_param in request.query_params \
+                or request.query_params.get('pagination') == 'cursor':
+            if self.offset_query_param in request.query_params:
+                raise ValidationError({'offset': 'Cannot be combined with cursor pagination.'})
+            self.cursor_paginator = self.cursor_pagination_class()
+        return self.cursor_paginator is not None
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
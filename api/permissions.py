@@ -1,17 +1,22 @@
 from rest_framework import permissions
 
+from .models import Review
+
 class IsOwnerOrAdmin(permissions.BasePermission):
     """
     Custom permission: 
     - Owners can update/delete their own reviews.
-    - Admins can delete any review.
+    - Admins can delete any review and reset any user's password.
     - Other users can only read.
     """
 
     def has_object_permission(self, request, view, obj):
-        # Allow admin to delete any object
-        if request.method == "DELETE" and request.user.is_staff:
+        # Allow admin to delete any object or reset any password
+        if request.user.is_staff and (request.method == "DELETE" or getattr(view, 'action', None) == 'change_password'):
             return True
         
         # Allow the owner to update/delete their own object
+        # A review belongs to its author, compared by id so the author isn't loaded
+        if isinstance(obj, Review):
+            return obj.user_id == request.user.pk
         return obj == request.user
\ No newline at end of file
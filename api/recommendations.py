@@ -0,0 +1,189 @@
+"""
+Item-item collaborative filtering over the review matrix.
+
+`build()` loads every review into a sparse user x restaurant matrix of
+ratings centered on each user's mean rating, and scores each pair of
+restaurants reviewed by the same people with the adjusted cosine
+similarity, shrunk towards zero when few people reviewed both:
+
+    sim(i, j) = x_i . x_j / (|x_i| |x_j|) * n_ij / (n_ij + shrinkage)
+
+The products are computed for blocks of restaurants at a time with SciPy
+sparse matrix products, so memory stays bounded by the block size rather
+than the number of restaurant pairs. The `neighbours` best scored
+restaurants of each restaurant are stored in RestaurantSimilarity, which
+the similar and recommendations endpoints read with one indexed query.
+
+`build(incremental=True)` only recomputes the neighbours of restaurants
+reviewed since the previous build. Other restaurants keep their lists until
+the next full build, which also drops deleted reviews.
+"""
+import time
+
+import numpy as np
+from scipy import sparse
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .bulk import adapt_rows, insert_rows
+from .models import RestaurantSimilarity, Review
+
+NEIGHBOURS = 20
+SHRINKAGE = 10
+MIN_COMMON_REVIEWERS = 2
+BLOCK_SIZE = 512
+FETCH_SIZE = 100000
+SIMILARITY_COLUMNS = ('restaurant', 'similar', 'score', 'common_reviewers', 'computed_at')
+
+
+def load_reviews(using='default'):
+    """
+    Reads (user, restaurant, rating) of every review with a raw cursor.
+    Returns:
+        tuple: Three numpy arrays of equal length.
+    """
+    meta = Review._meta
+    quote = connections[using].ops.quote_name
+    columns = ', '.join(quote(meta.get_field(name).column) for name in ('user', 'restaurant', 'rating'))
+    chunks = []
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"SELECT {columns} FROM {quote(meta.db_table)}")
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            chunks.append(np.array(rows, dtype=np.int64).reshape(-1, 3))
+    data = np.concatenate(chunks) if chunks else np.empty((0, 3), dtype=np.int64)
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+def sorted_keys(matrix):
+    """
+    Sorts the entries of a CSR matrix in place by row, then column.
+    Returns:
+        numpy.ndarray: row * columns + column of every entry, in data order.
+    """
+    matrix.sort_indices()
+    rows = np.repeat(np.arange(matrix.shape[0], dtype=np.int64), np.diff(matrix.indptr))
+    return rows * matrix.shape[1] + matrix.indices
+
+
+def compute_neighbours(users, items, ratings, targets=None, neighbours=NEIGHBOURS, shrinkage=SHRINKAGE,
+                       min_common=MIN_COMMON_REVIEWERS, block_size=BLOCK_SIZE):
+    """
+    Finds the most similar items of each target item. Users and items are
+    arbitrary integer ids, `targets` defaults to every item.
+    Returns:
+        tuple: Arrays of (item, similar item, score, common reviewers), best first per item.
+    """
+    user_ids, user_index = np.unique(users, return_inverse=True)
+    item_ids, item_index = np.unique(items, return_inverse=True)
+    shape = (len(user_ids), len(item_ids))
+
+    ratings = ratings.astype(np.float64)
+    means = np.bincount(user_index, weights=ratings) / np.bincount(user_index)
+    centered = ratings - means[user_index]
+    # Explicit zeros (a rating equal to the user's mean) are kept so the
+    # rating and reviewer matrices share one sparsity pattern.
+    ratings_matrix = sparse.csr_matrix((centered, (user_index, item_index)), shape=shape)
+    reviewers_matrix = sparse.csr_matrix((np.ones_like(centered), (user_index, item_index)), shape=shape)
+    norms = np.sqrt(np.asarray(ratings_matrix.multiply(ratings_matrix).sum(axis=0)).ravel())
+    ratings_by_item = ratings_matrix.T.tocsr()
+    reviewers_by_item = reviewers_matrix.T.tocsr()
+
+    if targets is None:
+        target_index = np.arange(len(item_ids))
+    else:
+        target_index = np.flatnonzero(np.isin(item_ids, targets))
+
+    results = ([], [], [], [])
+    for start in range(0, len(target_index), block_size):
+        block = target_index[start:start + block_size]
+        products = ratings_by_item[block] @ ratings_matrix
+        common = reviewers_by_item[block] @ reviewers_matrix
+        # Products summing to exactly zero are dropped, so the entries of
+        # `products` are a subset of those of `common`: match them by key.
+        product_keys, common_keys = sorted_keys(products), sorted_keys(common)
+        rows, columns = np.divmod(product_keys, shape[1])
+        counts = common.data[np.searchsorted(common_keys, product_keys)]
+        denominators = norms[block[rows]] * norms[columns]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = products.data / denominators * counts / (counts + shrinkage)
+        keep = (block[rows] != columns) & (counts >= min_common) & (scores > 0) & np.isfinite(scores)
+        rows, columns, scores, counts = rows[keep], columns[keep], scores[keep], counts[keep]
+
+        # Best `neighbours` per row: sort by row, then by descending score.
+        order = np.lexsort((-scores, rows))
+        rows, columns, scores, counts = rows[order], columns[order], scores[order], counts[order]
+        starts = np.searchsorted(rows, rows, side='left')
+        top = np.arange(len(rows)) - starts < neighbours
+
+        results[0].append(item_ids[block[rows[top]]])
+        results[1].append(item_ids[columns[top]])
+        results[2].append(scores[top])
+        results[3].append(counts[top].astype(np.int64))
+    if not results[0]:
+        return tuple(np.empty(0) for _ in results)
+    return tuple(np.concatenate(parts) for parts in results)
+
+
+def store(restaurant_ids, neighbours, computed_at, replace_all, using='default'):
+    """
+    Replaces the stored neighbours of the given restaurants (all of them if
+    `replace_all`) with the computed ones, in one transaction.
+    Returns:
+        int: Number of rows written.
+    """
+    items, similar, scores, counts = neighbours
+    rows = adapt_rows(RestaurantSimilarity, SIMILARITY_COLUMNS, [
+        (int(item), int(other), float(score), int(count), computed_at)
+        for item, other, score, count in zip(items, similar, scores, counts)
+    ], using=using)
+    with transaction.atomic(using=using):
+        existing = RestaurantSimilarity.objects.using(using)
+        if replace_all:
+            existing.all().delete()
+        else:
+            existing.filter(restaurant_id__in=list(restaurant_ids)).delete()
+        insert_rows(RestaurantSimilarity, SIMILARITY_COLUMNS, rows, using=using)
+    return len(rows)
+
+
+def build(incremental=False, neighbours=NEIGHBOURS, shrinkage=SHRINKAGE, min_common=MIN_COMMON_REVIEWERS,
+          block_size=BLOCK_SIZE, using='default', progress=None):
+    """
+    Rebuilds the stored restaurant neighbours from the reviews, only those
+    of restaurants reviewed since the last build if `incremental`.
+    Returns:
+        dict: Counts of reviews, restaurants recomputed and rows written, and timings in seconds.
+    """
+    progress = progress or (lambda message: None)
+    started = timezone.now()
+    targets = None
+    if incremental:
+        since = RestaurantSimilarity.objects.using(using).aggregate(last=Max('computed_at'))['last']
+        if since is not None:
+            targets = np.fromiter(
+                Review.objects.using(using).filter(updated_at__gte=since)
+                .values_list('restaurant_id', flat=True).distinct(),
+                dtype=np.int64,
+            )
+            if not len(targets):
+                return {'reviews': 0, 'restaurants': 0, 'rows': 0, 'load': 0.0, 'compute': 0.0, 'store': 0.0}
+
+    clock = time.perf_counter()
+    users, items, ratings = load_reviews(using)
+    load_time = time.perf_counter() - clock
+    progress(f"Loaded {len(ratings)} reviews in {load_time:.1f}s.")
+
+    clock = time.perf_counter()
+    result = compute_neighbours(users, items, ratings, targets, neighbours, shrinkage, min_common, block_size)
+    compute_time = time.perf_counter() - clock
+    restaurant_count = len(np.unique(items)) if targets is None else len(targets)
+    progress(f"Computed neighbours of {restaurant_count} restaurants in {compute_time:.1f}s.")
+
+    clock = time.perf_counter()
+    rows = store(targets if targets is not None else (), result, started, targets is None, using)
+    store_time = time.perf_counter() - clock
+    return {
+        'reviews': len(ratings), 'restaurants': restaurant_count, 'rows': rows,
+        'load': load_time, 'compute': compute_time, 'store': store_time,
+    }
@@ -0,0 +1,169 @@
+"""
+Full-text search over restaurants and reviews.
+
+On PostgreSQL every searchable row keeps a weighted `search_vector` (tsvector)
+backed by a GIN index. Other databases (SQLite for local development) use the
+`SearchToken` inverted index instead: one row per (document, token) with a
+relevance weight, looked up through a (kind, token) index. Both are updated
+incrementally whenever a restaurant or review is saved or deleted.
+"""
+import math
+import re
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum
+
+SEARCH_CONFIG = 'english'
+
+# Searchable fields per model with their PostgreSQL weight class.
+SEARCH_FIELDS = {
+    'restaurant': (('name', 'A'), ('address', 'B'), ('description', 'C')),
+    'review': (('review', 'A'),),
+}
+# Same relative weights as PostgreSQL's ts_rank defaults.
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+MAX_TOKEN_LENGTH = 64
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have in is it its of on or that the this to was were will with'.split()
+)
+TOKEN_RE = re.compile(r'\w+')
+
+
+def stem(token):
+    """
+    Folds simple English plurals so "noodles" matches "noodle".
+    Returns:
+        str: The stemmed token.
+    """
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase, stemmed search tokens, skipping stopwords.
+    Returns:
+        list: Tokens in document order.
+    """
+    return [
+        stem(token)[:MAX_TOKEN_LENGTH]
+        for token in TOKEN_RE.findall((text or '').lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def uses_postgres(using):
+    return connections[using].vendor == 'postgresql'
+
+
+def kind_of(model):
+    return model._meta.model_name
+
+
+def search_vector(kind):
+    """
+    Builds the weighted tsvector expression of a searchable model.
+    Returns:
+        SearchVector: The combined vector of all searchable fields.
+    """
+    vectors = [SearchVector(field, weight=weight, config=SEARCH_CONFIG) for field, weight in SEARCH_FIELDS[kind]]
+    vector = vectors[0]
+    for other in vectors[1:]:
+        vector = vector + other
+    return vector
+
+
+def document_tokens(instance):
+    """
+    Weighs the tokens of a searchable instance for the inverted index.
+    Returns:
+        dict: Mapping of token to relevance weight.
+    """
+    weights = defaultdict(float)
+    for field, weight_class in SEARCH_FIELDS[kind_of(type(instance))]:
+        counts = defaultdict(int)
+        for token in tokenize(getattr(instance, field)):
+            counts[token] += 1
+        for token, count in counts.items():
+            weights[token] += WEIGHTS[weight_class] * (1 + math.log(count))
+    return weights
+
+
+def index_instances(model, instances, using='default'):
+    """
+    Updates the search index of the given restaurants or reviews.
+    """
+    from .models import SearchToken
+
+    instances = list(instances)
+    if not instances:
+        return
+    kind = kind_of(model)
+    if uses_postgres(using):
+        model.objects.using(using).filter(pk__in=[obj.pk for obj in instances]).update(
+            search_vector=search_vector(kind)
+        )
+        return
+
+    SearchToken.objects.using(using).filter(kind=kind, object_id__in=[obj.pk for obj in instances]).delete()
+    # Posting rows outnumber documents several times over, so skip model
+    # instantiation and insert plain tuples.
+    connection = connections[using]
+    table = connection.ops.quote_name(SearchToken._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} (kind, object_id, token, weight) VALUES (%s, %s, %s, %s)",
+            [
+                (kind, obj.pk, token, weight)
+                for obj in instances
+                for token, weight in document_tokens(obj).items()
+            ],
+        )
+
+
+def remove_instances(model, pks, using='default'):
+    """
+    Drops deleted restaurants or reviews from the inverted index. `pks` may be
+    a list or a values() queryset used as a subquery.
+    """
+    from .models import SearchToken
+
+    if not uses_postgres(using):
+        SearchToken.objects.using(using).filter(kind=kind_of(model), object_id__in=pks).delete()
+
+
+def search(queryset, text):
+    """
+    Filters a restaurant or review queryset down to the rows matching every
+    term of `text`, annotated with a `search_rank` relevance score.
+    Returns:
+        QuerySet: The filtered and annotated queryset.
+    """
+    from .models import SearchToken
+
+    kind = kind_of(queryset.model)
+    if uses_postgres(queryset.db):
+        query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(search_rank=SearchRank(F('search_vector'), query))
+
+    terms = set(tokenize(text))
+    if not terms:
+        return queryset.none()
+    matches = (
+        SearchToken.objects.filter(kind=kind, token__in=terms)
+        .values('object_id')
+        .annotate(matched=Count('token'), score=Sum('weight'))
+        .filter(matched=len(terms))
+    )
+    return queryset.filter(pk__in=matches.values('object_id')).annotate(
+        search_rank=Subquery(
+            matches.filter(object_id=OuterRef('pk')).values('score')[:1],
+            output_field=FloatField(),
+        )
+    )
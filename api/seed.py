@@ -0,0 +1,330 @@
+"""
+Deterministic synthetic data for load testing at production scale.
+
+Restaurants are clustered around a set of city centres, review counts per
+restaurant follow a Zipf distribution (a few places get most reviews),
+review counts per user are heavy tailed, ratings lean positive with a
+per-restaurant quality bias, and review dates spread over several years
+with more recent activity.
+
+Every chunk of work draws from its own random generator derived from the
+seed and the chunk number, so the data is identical for a given seed no
+matter how many worker processes generate it. Users and restaurants are
+written with bulk_create; reviews, which outnumber them by far, as plain
+tuples with multi-row INSERTs. Review workers write their own chunks; on
+SQLite, which allows a single writer, they only generate the rows and the
+parent process writes them.
+"""
+import bisect
+import itertools
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+from django.db.models import Max
+
+from . import geo, search
+from .bulk import adapt_rows, bulk_insert, insert_rows
+from .cache import restaurant_cache
+from .models import Change, Restaurant, RestaurantRanking, Review, User
+
+# name, latitude, longitude, spread in degrees
+CITIES = (
+    ('Jakarta', -6.2088, 106.8456, 0.12),
+    ('Bandung', -6.9175, 107.6191, 0.06),
+    ('Surabaya', -7.2575, 112.7521, 0.08),
+    ('Denpasar', -8.6705, 115.2126, 0.05),
+    ('Singapore', 1.3521, 103.8198, 0.08),
+    ('Kuala Lumpur', 3.1390, 101.6869, 0.09),
+    ('Bangkok', 13.7563, 100.5018, 0.12),
+    ('Tokyo', 35.6762, 139.6503, 0.15),
+    ('Seoul', 37.5665, 126.9780, 0.10),
+    ('Sydney', -33.8688, 151.2093, 0.12),
+    ('London', 51.5072, -0.1276, 0.12),
+    ('Paris', 48.8566, 2.3522, 0.08),
+    ('New York', 40.7128, -74.0060, 0.10),
+    ('San Francisco', 37.7749, -122.4194, 0.06),
+    ('Mexico City', 19.4326, -99.1332, 0.12),
+)
+# Relative share of restaurants per city, bigger cities first.
+CITY_WEIGHTS = tuple(1 / (rank + 1) ** 0.7 for rank in range(len(CITIES)))
+
+NAME_WORDS = (
+    ('Golden', 'Little', 'Blue', 'Old', 'Happy', 'Spicy', 'Green', 'Royal', 'Lucky', 'Urban', 'Hidden', 'Red'),
+    ('Wok', 'Bistro', 'Grill', 'Kitchen', 'Noodle House', 'Cafe', 'Diner', 'Tavern', 'Warung', 'Sushi Bar',
+     'Trattoria', 'Bakery', 'Canteen', 'Steakhouse'),
+)
+CUISINES = (
+    'Indonesian', 'Japanese', 'Italian', 'Thai', 'Korean', 'Mexican', 'French', 'Indian', 'Chinese', 'Vietnamese',
+)
+DISHES = (
+    'fried rice', 'satay', 'ramen', 'pizza', 'pad thai', 'bibimbap', 'tacos', 'croissants', 'curry', 'dumplings',
+    'pho', 'sushi', 'noodles', 'grilled fish', 'burgers', 'pasta', 'rendang', 'dim sum',
+)
+# Rows generated per chunk of work. Chunks, not INSERT batches, pick the
+# random generators, so changing --batch-size doesn't change the data.
+CHUNK_SIZE = 20000
+STREETS = ('Market Street', 'Jalan Sudirman', 'Harbour Road', 'Station Avenue', 'Park Lane', 'River Walk')
+REVIEW_PHRASES = {
+    1: ("Terrible experience.", "The {dish} was cold and bland.", "Rude staff and a long wait.", "Never again."),
+    2: ("Disappointing.", "The {dish} was overpriced.", "Slow service.", "Not worth the trip."),
+    3: ("Decent place.", "The {dish} was fine.", "Service was okay.", "Average for the price."),
+    4: ("Really good.", "Tasty {dish}.", "Friendly staff.", "Would come back."),
+    5: ("Outstanding!", "Best {dish} in town.", "Wonderful service.", "Can't wait to return."),
+}
+
+
+@dataclass(frozen=True)
+class SeedSpec:
+    users: int
+    restaurants: int
+    reviews: int
+    end: datetime  # newest review date, fixed so reruns are identical
+    seed: int = 42
+    years: float = 5
+    zipf: float = 1.1
+    prefix: str = 'seed'
+    password: str = None  # shared by every user, unusable by default
+    batch_size: int = 5000
+    index_search: bool = True
+
+
+def rng_for(spec, kind, chunk=0):
+    """
+    Builds the random generator of one chunk of work. String seeds are hashed
+    with SHA-512, so they are stable across processes and runs.
+    Returns:
+        random.Random: The generator.
+    """
+    return random.Random(f'{spec.seed}:{kind}:{chunk}')
+
+
+def chunk_ranges(total, size):
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def user_rows(spec, start, stop, password):
+    return [
+        User(
+            username=f'{spec.prefix}_user{i}', email=f'{spec.prefix}_user{i}@example.com',
+            first_name='Seed', last_name=f'User {i}', password=password,
+        )
+        for i in range(start, stop)
+    ]
+
+
+def restaurant_rows(spec, chunk, start, stop):
+    rng = rng_for(spec, 'restaurants', chunk)
+    rows = []
+    for i in range(start, stop):
+        city, latitude, longitude, spread = rng.choices(CITIES, CITY_WEIGHTS)[0]
+        latitude = max(-90.0, min(90.0, rng.gauss(latitude, spread)))
+        longitude = max(-180.0, min(180.0, rng.gauss(longitude, spread)))
+        cuisine = rng.choice(CUISINES)
+        dishes = rng.sample(DISHES, 2)
+        rows.append(Restaurant(
+            name=f'{rng.choice(NAME_WORDS[0])} {rng.choice(NAME_WORDS[1])} {i}',
+            image='restaurant_images/placeholder.jpg',
+            description=f'{cuisine} restaurant in {city} known for its {dishes[0]} and {dishes[1]}.',
+            address=f'{rng.randint(1, 400)} {rng.choice(STREETS)}, {city}',
+            latitude=latitude,
+            longitude=longitude,
+            geohash=geo.encode(latitude, longitude),
+        ))
+    return rows
+
+
+def review_counts(spec, user_count, restaurant_count):
+    """
+    Splits the review total over users with a heavy-tailed (Pareto)
+    distribution: most users write a few reviews, a few write hundreds.
+    A user can review each restaurant only once.
+    Returns:
+        list: Number of reviews per user.
+    """
+    rng = rng_for(spec, 'review-counts')
+    weights = [rng.paretovariate(1.5) for _ in range(user_count)]
+    scale = spec.reviews / sum(weights)
+    cap = max(1, restaurant_count // 2)
+    counts = [min(cap, int(weight * scale)) for weight in weights]
+    # Hand out the rounding remainder one review at a time.
+    missing = min(spec.reviews, cap * user_count) - sum(counts)
+    users = itertools.cycle(range(user_count))
+    while missing > 0:
+        user = next(users)
+        if counts[user] < cap:
+            counts[user] += 1
+            missing -= 1
+    return counts
+
+
+class ReviewGenerator:
+    """
+    Generates the reviews of a range of users. Restaurant popularity and
+    quality are derived from the seed, so every worker builds the same ones.
+    """
+
+    def __init__(self, spec, restaurant_ids):
+        self.spec = spec
+        self.restaurant_ids = restaurant_ids
+        rng = rng_for(spec, 'popularity')
+        ranks = list(range(1, len(restaurant_ids) + 1))
+        rng.shuffle(ranks)
+        self.cum_weights = list(itertools.accumulate(1 / rank ** spec.zipf for rank in ranks))
+        self.quality = [min(4.8, max(1.5, rng.gauss(3.9, 0.6))) for _ in restaurant_ids]
+        self.end = spec.end
+        self.span = timedelta(days=365 * spec.years).total_seconds()
+
+    def pick_restaurants(self, rng, count):
+        """Draws `count` distinct restaurants by popularity."""
+        total = self.cum_weights[-1]
+        picked = set()
+        attempts = 0
+        while len(picked) < count and attempts < count * 8:
+            picked.add(bisect.bisect_left(self.cum_weights, rng.random() * total))
+            attempts += 1
+        if len(picked) < count:
+            # Heavy users exhaust the popular restaurants, fill up uniformly.
+            remaining = [index for index in range(len(self.restaurant_ids)) if index not in picked]
+            picked.update(rng.sample(remaining, count - len(picked)))
+        return picked
+
+    def rating(self, rng, index):
+        if rng.random() < 0.08:  # polarized reviews
+            return rng.choice((1, 5))
+        return min(5, max(1, round(rng.gauss(self.quality[index], 0.9))))
+
+    def created_at(self, rng):
+        # Activity grows over time: a square root skews dates towards today.
+        age = (1 - math.sqrt(rng.random())) * self.span
+        return self.end - timedelta(seconds=age)
+
+    def reviews(self, chunk, user_ids, counts):
+        rng = rng_for(self.spec, 'reviews', chunk)
+        rows = []
+        for user_id, count in zip(user_ids, counts):
+            for index in sorted(self.pick_restaurants(rng, count)):
+                rating = self.rating(rng, index)
+                phrases = rng.sample(REVIEW_PHRASES[rating], 2)
+                text = ' '.join(phrases).format(dish=rng.choice(DISHES))
+                created_at = self.created_at(rng)
+                updated_at = created_at
+                if rng.random() < 0.05:  # edited later
+                    updated_at = min(self.end, created_at + timedelta(days=rng.uniform(0, 60)))
+                rows.append((user_id, self.restaurant_ids[index], rating, text, created_at, updated_at))
+        return rows
+
+
+_generator = None
+
+
+def _init_worker(spec, restaurant_ids):
+    """Process pool initializer, also sets Django up under the spawn start method."""
+    global _generator
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    _generator = ReviewGenerator(spec, restaurant_ids)
+
+
+def _review_chunk(task):
+    """
+    Generates one chunk of reviews in a worker. With `write` the worker
+    inserts them itself and returns the count, otherwise it returns the rows.
+    """
+    chunk, user_ids, counts, write = task
+    rows = adapt_rows(Review, REVIEW_COLUMNS, _generator.reviews(chunk, user_ids, counts))
+    if not write:
+        return rows
+    try:
+        return write_reviews(_generator.spec, rows)
+    finally:
+        connections.close_all()
+
+
+REVIEW_COLUMNS = ('user', 'restaurant', 'rating', 'review', 'created_at', 'updated_at')
+
+
+def write_reviews(spec, rows):
+    """
+    Inserts adapted review rows and indexes them for search.
+    Returns:
+        int: Number of reviews created.
+    """
+    with transaction.atomic():
+        pks = insert_rows(Review, REVIEW_COLUMNS, rows)
+        if spec.index_search:
+            search.index_instances(Review, [
+                Review(review_id=pk, review=row[3]) for pk, row in zip(pks, rows)
+            ])
+    return len(pks)
+
+
+def seed(spec, workers=1, progress=None):
+    """
+    Generates users, restaurants and reviews, then rebuilds the rating
+    aggregates of the new restaurants and logs them in the change log.
+    Returns:
+        dict: Number of users, restaurants and reviews created.
+    """
+    progress = progress or (lambda message: None)
+    password = make_password(spec.password)  # hashed once for every user
+    previous = {model: model.objects.aggregate(last=Max('pk'))['last'] or 0 for model in (Restaurant, Review)}
+
+    user_ids = []
+    for start, stop in chunk_ranges(spec.users, CHUNK_SIZE):
+        user_ids.extend(user.pk for user in bulk_insert(User, user_rows(spec, start, stop, password), spec.batch_size))
+    progress(f"Created {len(user_ids)} users.")
+
+    restaurants = []
+    for chunk, (start, stop) in enumerate(chunk_ranges(spec.restaurants, CHUNK_SIZE)):
+        created = bulk_insert(Restaurant, restaurant_rows(spec, chunk, start, stop), spec.batch_size)
+        if spec.index_search:
+            search.index_instances(Restaurant, created)
+        restaurants.extend(created)
+    restaurant_ids = [restaurant.pk for restaurant in restaurants]
+    progress(f"Created {len(restaurant_ids)} restaurants.")
+
+    created_reviews = 0
+    if restaurant_ids and user_ids and spec.reviews:
+        counts = review_counts(spec, len(user_ids), len(restaurant_ids))
+        write_in_workers = connection.vendor != 'sqlite' and workers > 1
+        # Chunks hold whole users and roughly CHUNK_SIZE reviews each.
+        tasks, chunk_users, chunk_counts, chunk_total = [], [], [], 0
+        for user_id, count in zip(user_ids, counts):
+            chunk_users.append(user_id)
+            chunk_counts.append(count)
+            chunk_total += count
+            if chunk_total >= CHUNK_SIZE:
+                tasks.append((len(tasks), chunk_users, chunk_counts, write_in_workers))
+                chunk_users, chunk_counts, chunk_total = [], [], 0
+        if chunk_users:
+            tasks.append((len(tasks), chunk_users, chunk_counts, write_in_workers))
+
+        if workers > 1:
+            # Forked workers must not share the parent's database connections.
+            connections.close_all()
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(spec, restaurant_ids)) as executor:
+                for result in executor.map(_review_chunk, tasks):
+                    created_reviews += result if write_in_workers else write_reviews(spec, result)
+                    progress(f"Created {created_reviews} reviews.")
+        else:
+            generator = ReviewGenerator(spec, restaurant_ids)
+            for chunk, chunk_users, chunk_counts, _ in tasks:
+                rows = adapt_rows(Review, REVIEW_COLUMNS, generator.reviews(chunk, chunk_users, chunk_counts))
+                created_reviews += write_reviews(spec, rows)
+                progress(f"Created {created_reviews} reviews.")
+
+    for start, stop in chunk_ranges(len(restaurant_ids), spec.batch_size):
+        Restaurant.objects.rebuild_rating_aggregates(restaurant_ids[start:stop], rank=False)
+    RestaurantRanking.objects.rebuild(spec.batch_size)
+    Change.objects.record_existing(Restaurant, 'restaurant', after=previous[Restaurant])
+    Change.objects.record_existing(Review, 'review', after=previous[Review])
+    restaurant_cache.invalidate(membership=True, scopes=['ranking'])
+    return {'users': len(user_ids), 'restaurants': len(restaurant_ids), 'reviews': created_reviews}
@@ -1,9 +1,225 @@
+from operator import itemgetter
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.timesince import TIME_STRINGS, timesince
 from rest_framework import serializers
-from .models import User, Restaurant, Review
+from . import geo, metrics
+from .managers import RANKING_AREA_PRECISION, RATING_STARS, ROLLUP_GRANULARITIES
+from .models import Change, User, Restaurant, Review
+
+BATCH_MAX_REQUESTS = 25
+
+class TimedSerializerMixin:
+    """Counts representation time towards the request's `serialize` phase."""
+
+    def to_representation(self, instance):
+        with metrics.phase('serialize'):
+            return super().to_representation(instance)
+
+def image_variant_urls(variants, request):
+    """
+    Builds the URLs of stored image variants.
+    Returns:
+        dict: Variant to file extension to URL, absolute when there is a request.
+    """
+    urls = {}
+    for variant, names in variants.items():
+        urls[variant] = {}
+        for extension, name in names.items():
+            url = default_storage.url(name)
+            urls[variant][extension] = request.build_absolute_uri(url) if request else url
+    return urls
+
+class PluralCache:
+    """
+    A lazily translated plural message that formats each number only once,
+    for the `time_strings` of timesince(). Keep one per request, as the
+    active language may change between requests.
+    """
+
+    def __init__(self, message):
+        self.message = message
+        self.formatted = {}
+
+    def __mod__(self, params):
+        num = params['num']
+        if num not in self.formatted:
+            self.formatted[num] = self.message % params
+        return self.formatted[num]
+
+def split_param(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+class SparseFieldsMixin:
+    """
+    Lets GET requests choose the output fields with `?fields=a,b` and add
+    the optional fields of Meta.expandable_fields with `?expand=x`. The
+    primary key is always included. Applies to the top-level serializer
+    only, expanded serializers render in full.
+
+    Meta.field_sources lists the model fields each output field reads
+    (default: the field of the same name), so views can load only the
+    columns and joins a response needs with prune_queryset().
+    """
+    fields_param = 'fields'
+    expand_param = 'expand'
+
+    @classmethod
+    def parse_fieldset(cls, request):
+        """
+        Reads and validates the `fields` and `expand` query parameters.
+        Returns:
+            tuple: (requested field names, or None for all, expanded field names).
+        """
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return None, set()
+        expandable = getattr(cls.Meta, 'expandable_fields', {})
+        requested = None
+        if cls.fields_param in request.query_params:
+            requested = split_param(request.query_params[cls.fields_param])
+            unknown = requested - set(cls.Meta.fields) - set(expandable)
+            if unknown:
+                raise serializers.ValidationError({
+                    cls.fields_param: [f"Unknown fields: {', '.join(sorted(unknown))}."],
+                })
+        expand = split_param(request.query_params.get(cls.expand_param, ''))
+        unknown = expand - set(expandable)
+        if unknown:
+            raise serializers.ValidationError({
+                cls.expand_param: [f"Unknown expansions: {', '.join(sorted(unknown))}."],
+            })
+        return requested, expand
+
+    @classmethod
+    def field_sources(cls, names):
+        sources = getattr(cls.Meta, 'field_sources', {})
+        return {source for name in names for source in sources.get(name, (name,))}
 
-class UserSerializer(serializers.ModelSerializer):
+    @classmethod
+    def prune_queryset(cls, queryset, request, always=()):
+        """
+        Restricts the queryset to the columns and joins the requested fields
+        and expansions read. `always` names model fields to load regardless,
+        such as those cursor pagination reads.
+        Returns:
+            QuerySet: The pruned queryset, unchanged if all fields are requested.
+        """
+        requested, expand = cls.parse_fieldset(request)
+        if requested is None and not expand:
+            return queryset
+        names = set(cls.Meta.fields) if requested is None else requested - expand
+        paths = cls.field_sources(names) | set(always) | {cls.Meta.model._meta.pk.name}
+        for name in expand:
+            expansion = cls.Meta.expandable_fields[name]
+            if isinstance(expansion, type) and issubclass(expansion, SparseFieldsMixin):
+                paths.add(name)
+                paths.update(f"{name}__{path}" for path in expansion.field_sources(expansion.Meta.fields))
+            else:
+                paths.update(cls.field_sources([name]))
+        relations = {path.split('__')[0] for path in paths if '__' in path}
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        return queryset.only(*paths | relations)
+
+    def is_top_level(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.is_top_level():
+            return fields
+        requested, expand = self.parse_fieldset(self.context.get('request'))
+        for name in expand:
+            fields[name] = self.Meta.expandable_fields[name](read_only=True)
+        if requested is not None:
+            keep = requested | expand | {self.Meta.model._meta.pk.name}
+            for name in list(fields):
+                if name not in keep:
+                    del fields[name]
+        return fields
+
+class ValuesSerializerMixin:
+    """
+    Read-only fast path for list pages. values_columns() names the columns
+    the chosen fields read, for QuerySet.values(), and represent_values()
+    turns those rows into exactly what to_representation() returns for the
+    model instances, in one loop without instances or per-field attribute
+    lookups. Plain column fields go through their own to_representation(),
+    everything else needs a reader from get_custom_value_readers().
+    """
+
+    def get_custom_value_readers(self, prefix):
+        """
+        Readers of the fields that aren't plain columns, for the column names
+        prefixed with `prefix` (e.g. 'restaurant__' when nested).
+        Returns:
+            dict: Field name to a function of a values() row.
+        """
+        return {}
+
+    def get_value_readers(self, prefix=''):
+        """
+        Compiles one reader per output field, in output order.
+        Returns:
+            list: (field name, values() columns, function of a row) tuples.
+        """
+        custom = self.get_custom_value_readers(prefix)
+        sources = getattr(self.Meta, 'field_sources', {})
+        readers = []
+        for name, field in self.fields.items():
+            if name in custom:
+                columns = [prefix + source for source in sources.get(name, (name,))]
+                readers.append((name, columns, custom[name]))
+            elif isinstance(field, ValuesSerializerMixin):
+                readers.append(self.nested_value_reader(name, field, prefix))
+            elif isinstance(field, serializers.RelatedField):
+                readers.append((name, [prefix + name], itemgetter(prefix + name)))
+            else:
+                column = prefix + field.source
+                readers.append((name, [column], self.column_value_reader(field, column)))
+        return readers
+
+    @staticmethod
+    def column_value_reader(field, column):
+        represent = field.to_representation
+
+        def read(row):
+            value = row[column]
+            return None if value is None else represent(value)
+        return read
+
+    @staticmethod
+    def nested_value_reader(name, serializer, prefix):
+        key = prefix + name
+        readers = serializer.get_value_readers(f'{key}__')
+
+        def read(row):
+            if row[key] is None:
+                return None
+            return {field_name: field_read(row) for field_name, _, field_read in readers}
+        return name, [key, *(column for _, columns, _ in readers for column in columns)], read
+
+    def values_columns(self):
+        return list(dict.fromkeys(column for _, columns, _ in self.get_value_readers() for column in columns))
+
+    def represent_values(self, rows):
+        """
+        Builds the output of every values() row.
+        Returns:
+            list: One dict per row, as to_representation() would build it.
+        """
+        with metrics.phase('serialize'):
+            readers = [(name, read) for name, _, read in self.get_value_readers()]
+            return [{name: read(row) for name, read in readers} for row in rows]
+
+class UserSerializer(SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     uuid = serializers.UUIDField(read_only=True)
-    total_reviews = serializers.ReadOnlyField()
+    total_reviews = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -18,6 +234,13 @@ class UserSerializer(serializers.ModelSerializer):
             'total_reviews',
         )
         read_only_fields = ('uuid', 'is_active', 'is_staff')
+        # total_reviews is annotated by UserViewSet when requested.
+        field_sources = {'total_reviews': ()}
+
+    def get_total_reviews(self, obj):
+        """Use the review count annotated by the viewset, falling back to a COUNT query."""
+        review_count = getattr(obj, 'review_count', None)
+        return obj.total_reviews if review_count is None else review_count
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -41,9 +264,10 @@ class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True)
     new_password = serializers.CharField(required=True)
 
-class RestaurantSerializer(serializers.ModelSerializer):
+class RestaurantSerializer(SparseFieldsMixin, TimedSerializerMixin, ValuesSerializerMixin, serializers.ModelSerializer):
     total_rating = serializers.SerializerMethodField()
     total_reviews = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Restaurant
@@ -51,6 +275,7 @@ class RestaurantSerializer(serializers.ModelSerializer):
             'restaurant_id',
             'name',
             'image',
+            'image_variants',
             'description',
             'address',
             'latitude',
@@ -59,17 +284,49 @@ class RestaurantSerializer(serializers.ModelSerializer):
             'total_rating',
             'total_reviews',
         )
-        read_only_fields = ('total_rating', 'total_reviews')  # Ensure these fields are read-only
+        read_only_fields = ('total_rating', 'total_reviews', 'image_variants')  # Ensure these fields are read-only
+        expandable_fields = {'rating_distribution': serializers.ReadOnlyField}
+        field_sources = {
+            'total_rating': ('review_count', 'rating_sum'),
+            'total_reviews': ('review_count',),
+            'rating_distribution': tuple(f'rating_count_{star}' for star in RATING_STARS),
+        }
 
     def get_total_rating(self, obj):
         """Retrieve the restaurant's total rating from the model property."""
         return obj.total_rating
 
+    def get_image_variants(self, obj):
+        """Build the URLs of the resized image variants, empty until they are generated."""
+        return image_variant_urls(obj.image_variants, self.context.get('request'))
+
     def get_total_reviews(self, obj):
-        """Retrieve the count of reviews for the restaurant."""
-        return obj.reviews.count()
+        """Retrieve the count of reviews for the restaurant from the model property."""
+        return obj.total_reviews
+
+    def get_custom_value_readers(self, prefix):
+        request = self.context.get('request')
+        storage = Restaurant._meta.get_field('image').storage
+        image, variants = f'{prefix}image', f'{prefix}image_variants'
+        count, total = f'{prefix}review_count', f'{prefix}rating_sum'
+        stars = [(star, f'{prefix}rating_count_{star}') for star in RATING_STARS]
 
-class ReviewSerializer(serializers.ModelSerializer):
+        def read_image(row):
+            if not row[image]:
+                return None
+            url = storage.url(row[image])
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return {
+            'image': read_image,
+            'image_variants': lambda row: image_variant_urls(row[variants], request),
+            # As Restaurant.total_rating.
+            'total_rating': lambda row: round(row[total] / row[count], 1) if row[count] else 0,
+            'total_reviews': itemgetter(count),
+            'rating_distribution': lambda row: {star: row[column] for star, column in stars},
+        }
+
+class ReviewSerializer(SparseFieldsMixin, TimedSerializerMixin, ValuesSerializerMixin, serializers.ModelSerializer):
     user_full_name = serializers.ReadOnlyField(source='user.full_name')
     user_username = serializers.ReadOnlyField(source='user.username')
     time_since_posted = serializers.ReadOnlyField()
@@ -85,8 +342,109 @@ class ReviewSerializer(serializers.ModelSerializer):
             'time_since_posted',
         )
         read_only_fields = ['user']
+        expandable_fields = {'restaurant': RestaurantSerializer}
+        field_sources = {
+            'user_username': ('user__username',),
+            'user_full_name': ('user__first_name', 'user__last_name'),
+            'time_since_posted': ('created_at',),
+        }
+
+    def get_custom_value_readers(self, prefix):
+        first_name, last_name = f'{prefix}user__first_name', f'{prefix}user__last_name'
+        created_at = f'{prefix}created_at'
+        now = timezone.now()  # one clock reading for the whole page
+        time_strings = {name: PluralCache(message) for name, message in TIME_STRINGS.items()}
+        return {
+            'user_username': itemgetter(f'{prefix}user__username'),
+            # As User.full_name and Review.time_since_posted.
+            'user_full_name': lambda row: " ".join(filter(None, [row[first_name], row[last_name]])),
+            'time_since_posted': lambda row: timesince(row[created_at], now, time_strings=time_strings),
+        }
 
     def validate_rating(self, value):
         if value <= 0 or value > 5:
             raise serializers.ValidationError("Rating must be between one to five.")
-        return value
\ No newline at end of file
+        return value
+
+class ReviewBatchSerializer(serializers.ListSerializer):
+
+    def validate(self, attrs):
+        restaurant_ids = [review['restaurant_id'] for review in attrs]
+        if len(set(restaurant_ids)) != len(restaurant_ids):
+            raise serializers.ValidationError("A batch may contain only one review per restaurant.")
+        return attrs
+
+class ReviewCreateSerializer(ReviewSerializer):
+    """
+    Review serializer for creating reviews. The restaurant is taken as a
+    plain id instead of being fetched: the aggregate update of the create
+    path proves it exists.
+    """
+    restaurant = serializers.IntegerField(source='restaurant_id', min_value=1)
+
+    class Meta(ReviewSerializer.Meta):
+        list_serializer_class = ReviewBatchSerializer
+
+class NearbyQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(min_value=0.01, max_value=100, default=5)  # kilometers
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=25)
+
+class TopQuerySerializer(serializers.Serializer):
+    area = serializers.CharField(required=False, max_length=RANKING_AREA_PRECISION)  # geohash prefix
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=25)
+
+    def validate_area(self, value):
+        value = value.lower()
+        if any(char not in geo.BASE32 for char in value):
+            raise serializers.ValidationError("Area must be a geohash prefix.")
+        return value
+
+class LimitQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=25)
+
+class TrendsQuerySerializer(serializers.Serializer):
+    granularity = serializers.ChoiceField(choices=ROLLUP_GRANULARITIES, default='month')
+
+    def get_fields(self):
+        # `from` is a keyword, so the date range can't be declared as class attributes.
+        fields = super().get_fields()
+        fields['from'] = serializers.DateField(required=False)
+        fields['to'] = serializers.DateField(required=False)
+        return fields
+
+    def validate(self, attrs):
+        if 'from' in attrs and 'to' in attrs and attrs['from'] > attrs['to']:
+            raise serializers.ValidationError("from must not be after to.")
+        return attrs
+
+class BatchRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['GET'], default='GET')
+    path = serializers.CharField(max_length=2000)
+
+    def validate_path(self, value):
+        if not value.startswith('/api/'):
+            raise serializers.ValidationError("Path must start with /api/.")
+        if value.split('?', 1)[0].rstrip('/') == '/api/batch':
+            raise serializers.ValidationError("Batches can't be nested.")
+        return value
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchRequestSerializer(many=True, min_length=1, max_length=BATCH_MAX_REQUESTS)
+
+class RestaurantReviewsQuerySerializer(serializers.Serializer):
+    summary = serializers.BooleanField(default=False)  # add the restaurant's rating summary
+
+class ChangesQuerySerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=0, default=0)  # cursor of the last entry read
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+
+class ChangeSerializer(serializers.ModelSerializer):
+    cursor = serializers.IntegerField(source='change_id')
+    type = serializers.CharField(source='object_type')
+    id = serializers.IntegerField(source='object_id')
+
+    class Meta:
+        model = Change
+        fields = ('cursor', 'type', 'id', 'action', 'changed_at')
@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import search
+from .authentication import invalidate_cached_user
+from .models import Restaurant, RestaurantRanking, Review, User
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=Review)
+def update_search_index(sender, instance, using, **kwargs):
+    """Keep the full-text search index in sync with saved restaurants and reviews."""
+    search.index_instances(sender, [instance], using=using)
+
+
+@receiver(post_save, sender=Restaurant)
+def update_restaurant_ranking(sender, instance, raw=False, **kwargs):
+    """Rank new restaurants and move edited ones to the area of their new location."""
+    if not raw:
+        RestaurantRanking.objects.refresh([instance.pk])
+
+
+@receiver(post_delete, sender=Restaurant)
+def remove_restaurant_from_search_index(sender, instance, using, **kwargs):
+    """Drop deleted restaurants from the full-text search index."""
+    search.remove_instances(Restaurant, [instance.pk], using=using)
+
+
+@receiver(pre_delete, sender=Restaurant)
+@receiver(pre_delete, sender=User)
+def remove_cascaded_reviews_from_search_index(sender, instance, using, **kwargs):
+    """
+    Drop the reviews about to be cascade-deleted with a restaurant or user in a
+    single statement. Review itself has no delete receiver so that cascades
+    stay fast deletes; ReviewViewSet removes single reviews explicitly.
+    """
+    search.remove_instances(Review, instance.reviews.values('pk'), using=using)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_auth_cache(sender, instance, **kwargs):
+    """Make the next authenticated request reload the user, e.g. after a password change."""
+    invalidate_cached_user(instance.pk)
@@ -0,0 +1,17 @@
+"""
+Query-count and latency regression tests for the API endpoints.
+
+Every endpoint has a fixed query budget that must not grow with the page
+size, so an N+1 query in a serializer or viewset fails the suite.
+
+Setting API_BENCHMARK=1 also runs the latency benchmark: every endpoint is
+timed against a larger dataset and its p50/p95/p99 latency and allocated
+memory are compared to the baseline in API_BENCHMARK_BASELINE (default
+api/benchmark_baseline.json). A p95 or memory regression beyond
+API_BENCHMARK_THRESHOLD (default 0.25, i.e. 25%) fails the test. The
+baseline is only written when API_BENCHMARK_UPDATE=1, and the benchmark
+fails when there is none.
+
+    python manage.py test api
+    API_BENCHMARK=1 python manage.py test api.tests.test_benchmark
+"""
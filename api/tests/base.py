@@ -0,0 +1,86 @@
+"""Fixtures shared by the API test modules."""
+import random
+from datetime import timedelta
+
+from django.core.cache import cache, caches
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .. import geo, search
+from ..cache import RESPONSE_CACHE_ALIAS
+from ..imports import preserve_timestamps
+from ..models import Restaurant, Review, User
+
+
+PAGE_SIZES = (1, 25, 100)
+
+
+def seed(restaurant_count, user_count, reviews_per_user, rng=None):
+    """
+    Creates restaurants, users and reviews with realistic skew: a few
+    restaurants get most reviews and ratings lean positive.
+    Returns:
+        tuple: (restaurants, users).
+    """
+    rng = rng or random.Random(0)
+    restaurants = []
+    for i in range(restaurant_count):
+        latitude, longitude = -6.2 + rng.random() / 10, 106.8 + rng.random() / 10
+        restaurants.append(Restaurant(
+            name=f"{rng.choice(['Golden', 'Little', 'Blue', 'Old'])} {rng.choice(['Wok', 'Bistro', 'Grill'])} {i}",
+            image='restaurant_images/placeholder.jpg',
+            description="Fresh noodles and grilled fish in a quiet courtyard.",
+            address=f"{i} Market Street",
+            latitude=latitude,
+            longitude=longitude,
+            geohash=geo.encode(latitude, longitude),
+        ))
+    restaurants = Restaurant.objects.bulk_create(restaurants)
+    users = User.objects.bulk_create(
+        User(username=f"user{i}", email=f"user{i}@example.com", first_name='User', last_name=str(i), password='!')
+        for i in range(user_count)
+    )
+    weights = [1 / (rank + 1) for rank in range(restaurant_count)]
+    now = timezone.now()
+    reviews = []
+    for user in users:
+        reviewed = set(rng.choices(range(restaurant_count), weights, k=reviews_per_user))
+        for index in reviewed:
+            created_at = now - timedelta(minutes=rng.randint(0, 500000))
+            reviews.append(Review(
+                user=user, restaurant=restaurants[index], rating=rng.choices(range(1, 6), (1, 1, 2, 4, 4))[0],
+                review="Tasty noodles, friendly staff.", created_at=created_at, updated_at=created_at,
+            ))
+    with preserve_timestamps(Review, 'created_at', 'updated_at'):
+        reviews = Review.objects.bulk_create(reviews)
+    Restaurant.objects.rebuild_rating_aggregates()
+    search.index_instances(Restaurant, restaurants)
+    search.index_instances(Review, reviews)
+    return restaurants, users
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryBudgetTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurants, cls.users = seed(restaurant_count=120, user_count=120, reviews_per_user=5)
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', first_name='Admin', password='admin-password',
+        )
+
+    def setUp(self):
+        cache.clear()
+        caches[RESPONSE_CACHE_ALIAS].clear()
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def assertQueryBudget(self, budget, method, url, status_code=200, **kwargs):
+        """Asserts the request runs exactly `budget` queries and returns the response."""
+        with self.assertNumQueries(budget):
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertEqual(response.status_code, status_code, response.content[:500])
+        return response
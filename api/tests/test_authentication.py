@@ -0,0 +1,70 @@
+"""Cached JWT authentication and password change tests."""
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..authentication import CACHED_USER_FIELDS, CachedJWTAuthentication, user_cache_key
+from ..models import Restaurant, User
+from .base import QueryBudgetTestCase
+
+
+class CachedUserTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username='alice', email='alice@example.com', first_name='Alice', last_name='Liddell', password='old-pw',
+        )
+
+    def get_user(self):
+        return CachedJWTAuthentication().get_user(AccessToken.for_user(self.user))
+
+    def test_cache_hits_keep_every_field_in_place(self):
+        loaded = self.get_user()
+        with self.assertNumQueries(0):
+            cached = self.get_user()
+        for field in CACHED_USER_FIELDS:
+            self.assertEqual(getattr(cached, field), getattr(loaded, field), field)
+        self.assertEqual(cached.full_name, "Alice Liddell")
+        # Fields left out of the cache load on access instead of defaulting.
+        self.assertEqual(cached.email, 'alice@example.com')
+
+        cached.first_name = 'Alicia'
+        cached.save()
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.username, self.user.first_name, self.user.email),
+                         ('alice', 'Alicia', 'alice@example.com'))
+
+    def test_batch_reviews_name_the_cached_user(self):
+        self.authenticate(self.user)
+        restaurants = Restaurant.objects.order_by('pk')[:2]
+        for restaurant in restaurants:
+            response = self.client.post('/api/reviews/batch/', [
+                {'restaurant': restaurant.pk, 'rating': 4, 'review': "Nice."},
+            ], format='json')
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual(response.data[0]['user_username'], 'alice')
+            self.assertEqual(response.data[0]['user_full_name'], "Alice Liddell")
+
+    def test_saves_drop_the_cached_user(self):
+        self.get_user()
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+        User.objects.get(pk=self.user.pk).save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+        self.get_user()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.get_user()
+
+    def test_password_changes_drop_the_cached_user(self):
+        self.authenticate(self.user)
+        self.client.get(f'/api/users/{self.user.username}/')
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+
+        response = self.client.post(f'/api/users/{self.user.username}/change_password/', {
+            'old_password': 'old-pw', 'new_password': 'new-pw',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
@@ -0,0 +1,60 @@
+"""Multi-get (?ids=) and /api/batch/ tests."""
+from django.test import override_settings
+
+from ..models import Review
+from .base import QueryBudgetTestCase
+
+
+class MultiGetTests(QueryBudgetTestCase):
+
+    def test_ids_are_one_query_in_requested_order(self):
+        restaurants = [self.restaurants[5].pk, self.restaurants[1].pk, 999999, self.restaurants[5].pk]
+        response = self.assertQueryBudget(1, 'get', f'/api/restaurants/?ids={",".join(map(str, restaurants))}')
+        self.assertEqual([item['restaurant_id'] for item in response.data], restaurants[:2])
+        cached = self.assertQueryBudget(0, 'get', f'/api/restaurants/?ids={",".join(map(str, restaurants))}')
+        self.assertEqual((cached['X-Cache'], cached.data), ('HIT', response.data))
+
+        reviews = list(Review.objects.order_by('-pk').values_list('pk', flat=True)[:3])
+        response = self.assertQueryBudget(1, 'get', f'/api/reviews/?ids={",".join(map(str, reviews))}&fields=review_id')
+        self.assertEqual(response.data, [{'review_id': pk} for pk in reviews])
+
+        self.authenticate(self.admin)
+        usernames = [self.users[2].username, self.users[0].username]
+        response = self.assertQueryBudget(2, 'get', f'/api/users/?ids={",".join(usernames)}')
+        self.assertEqual([item['username'] for item in response.data], usernames)
+
+    def test_invalid_ids(self):
+        for ids in ['', ',', 'one,2', ','.join(map(str, range(1, 102)))]:
+            with self.subTest(ids=ids):
+                self.assertQueryBudget(0, 'get', f'/api/restaurants/?ids={ids}', status_code=400)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class BatchTests(QueryBudgetTestCase):
+
+    def test_sub_requests_share_authentication(self):
+        self.authenticate(self.admin)
+        restaurant, user = self.restaurants[0], self.users[0]
+        paths = [
+            f'/api/restaurants/{restaurant.pk}/', '/api/reviews/?limit=5', f'/api/users/{user.username}/',
+            f'/api/users/?ids={user.username}', '/api/missing/', '/api/async/reviews/',
+        ]
+        # One user lookup, then 1 + 2 + 1 + 1 queries for the sub-requests.
+        response = self.assertQueryBudget(6, 'post', '/api/batch/', data={
+            'requests': [{'method': 'GET', 'path': path} for path in paths],
+        }, format='json')
+        responses = response.data['responses']
+        self.assertEqual([item['status'] for item in responses], [200, 200, 200, 200, 404, 400])
+        self.assertEqual(responses[0]['body'], self.client.get(paths[0]).data)
+        self.assertEqual(responses[3]['body'][0]['username'], user.username)
+
+    def test_anonymous_and_invalid_batches(self):
+        response = self.assertQueryBudget(0, 'post', '/api/batch/', data={
+            'requests': [{'path': f'/api/users/{self.users[0].username}/'}],
+        }, format='json')
+        self.assertEqual(response.data['responses'][0]['status'], 401)
+        for requests in [[], [{'path': '/api/batch/'}], [{'method': 'POST', 'path': '/api/reviews/'}],
+                         [{'path': '/admin/'}], [{'path': '/api/reviews/'}] * 26]:
+            with self.subTest(requests=requests[:2]):
+                self.assertQueryBudget(0, 'post', '/api/batch/', status_code=400, data={'requests': requests},
+                                       format='json')
@@ -0,0 +1,109 @@
+"""Latency and memory benchmark of the main endpoints against a stored baseline."""
+import gc
+import json
+import os
+import statistics
+import time
+import tracemalloc
+import unittest
+from pathlib import Path
+
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..models import User
+from .base import QueryBudgetTestCase, seed
+
+
+BENCHMARK_BASELINE = Path(os.getenv(
+    'API_BENCHMARK_BASELINE', Path(__file__).resolve().parent.parent / 'benchmark_baseline.json',
+))
+
+
+@unittest.skipUnless(os.getenv('API_BENCHMARK'), "set API_BENCHMARK=1 to run the latency benchmark")
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class EndpointBenchmarkTests(QueryBudgetTestCase):
+    rounds = int(os.getenv('API_BENCHMARK_ROUNDS', 5))
+    iterations = int(os.getenv('API_BENCHMARK_ITERATIONS', 40))
+    threshold = float(os.getenv('API_BENCHMARK_THRESHOLD', 0.25))
+    # Differences this small are noise even when they exceed the threshold.
+    slack = {'p95': 1.0, 'peak_kib': 16.0}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurants, cls.users = seed(restaurant_count=2000, user_count=1000, reviews_per_user=20)
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', first_name='Admin', password='admin-password',
+        )
+
+    def endpoints(self):
+        restaurant = self.restaurants[0].pk
+        return {
+            'restaurant list': ('get', '/api/restaurants/?limit=100', {}),
+            'restaurant search': ('get', '/api/restaurants/?search=noodles&limit=25', {}),
+            'restaurant detail': ('get', f'/api/restaurants/{restaurant}/', {}),
+            'review list': ('get', '/api/reviews/?limit=100&offset=5000', {}),
+            'review cursor': ('get', '/api/reviews/?cursor=&limit=100', {}),
+            'review filter': ('get', f'/api/reviews/?restaurant={restaurant}&limit=100', {}),
+            'user list': ('get', '/api/users/?limit=100', {'HTTP_AUTHORIZATION': self.admin_header}),
+            'token': ('post', '/api/token/', {'data': {'username': 'admin', 'password': 'admin-password'}}),
+        }
+
+    def measure(self, method, url, kwargs):
+        """
+        Times an endpoint over several rounds with the garbage collector
+        paused, keeping the best round's percentiles to filter out noise
+        (like timeit does), and traces the memory one request allocates.
+        Returns:
+            dict: p50/p95/p99 latency in milliseconds and peak allocated KiB.
+        """
+        call = getattr(self.client, method)
+        call(url, **kwargs)  # warm up
+        rounds = []
+        for _ in range(self.rounds):
+            samples = []
+            gc.collect()
+            gc.disable()
+            try:
+                for _ in range(self.iterations):
+                    started = time.perf_counter()
+                    response = call(url, **kwargs)
+                    samples.append(time.perf_counter() - started)
+                    self.assertEqual(response.status_code, 200)
+            finally:
+                gc.enable()
+            rounds.append(statistics.quantiles(samples, n=100, method='inclusive'))
+
+        tracemalloc.start()
+        call(url, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            'p50': round(min(quantiles[49] for quantiles in rounds) * 1000, 3),
+            'p95': round(min(quantiles[94] for quantiles in rounds) * 1000, 3),
+            'p99': round(min(quantiles[98] for quantiles in rounds) * 1000, 3),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    def test_latency_against_baseline(self):
+        update = bool(os.getenv('API_BENCHMARK_UPDATE'))
+        if not update and not BENCHMARK_BASELINE.exists():
+            self.fail(f"No benchmark baseline at {BENCHMARK_BASELINE}; record one with API_BENCHMARK_UPDATE=1.")
+        self.admin_header = f'Bearer {AccessToken.for_user(self.admin)}'
+        results = {name: self.measure(*endpoint) for name, endpoint in self.endpoints().items()}
+
+        if update:
+            BENCHMARK_BASELINE.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+            return
+
+        baseline = json.loads(BENCHMARK_BASELINE.read_text())
+        regressions = []
+        for name, current in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            for metric in ('p95', 'peak_kib'):
+                if current[metric] > max(previous[metric] * (1 + self.threshold), previous[metric] + self.slack[metric]):
+                    regressions.append(f"{name}: {metric} {previous[metric]} -> {current[metric]}")
+        self.assertFalse(regressions, "Regressed past the baseline:\n" + "\n".join(regressions))
@@ -0,0 +1,67 @@
+"""Change feed (/api/changes/) and change log compaction tests."""
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+
+from ..models import Change, Restaurant, Review
+from .base import QueryBudgetTestCase
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False, CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedTests(QueryBudgetTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Change.objects.record_existing(Restaurant, 'restaurant')
+        Change.objects.record_existing(Review, 'review')
+
+    def feed(self, since, limit=100, budget=1):
+        return self.assertQueryBudget(budget, 'get', f'/api/changes/?since={since}&limit={limit}').data
+
+    def test_writes_are_logged_in_order(self):
+        seeded = self.feed(0, limit=1000)
+        self.assertEqual(len(seeded['results']), Restaurant.objects.count() + Review.objects.count())
+        cursor = seeded['next_cursor']
+        self.assertEqual(self.feed(cursor), {'results': [], 'next_cursor': cursor, 'has_more': False})
+
+        user = self.users[0]
+        self.authenticate(user)
+        restaurant = Restaurant.objects.exclude(reviews__user=user).first()
+        data = {'restaurant': restaurant.pk, 'rating': 5, 'review': "Ok."}
+        review_id = self.client.post('/api/reviews/', data).data['review_id']
+        self.client.patch(f'/api/reviews/{review_id}/', {'review': "Good."})
+        self.client.delete(f'/api/reviews/{review_id}/')
+
+        page = self.feed(cursor, limit=3)
+        self.assertTrue(page['has_more'])
+        rest = self.feed(page['next_cursor'])
+        self.assertEqual([(item['type'], item['id'], item['action']) for item in page['results'] + rest['results']], [
+            ('review', review_id, 'create'), ('restaurant', restaurant.pk, 'update'),
+            ('review', review_id, 'update'),
+            ('review', review_id, 'delete'), ('restaurant', restaurant.pk, 'update'),
+        ])
+        cursors = [item['cursor'] for item in page['results'] + rest['results']]
+        self.assertEqual(cursors, sorted(cursors))
+
+    @override_settings(CHANGE_FEED_SETTLE_SECONDS=60)
+    def test_recent_entries_settle_first(self):
+        cursor = Change.objects.order_by('-change_id').values_list('change_id', flat=True).first()
+        Change.objects.record([('restaurant', self.restaurants[0].pk, 'update')])
+        self.assertEqual(self.feed(cursor), {'results': [], 'next_cursor': cursor, 'has_more': False})
+
+    def test_compaction_keeps_the_latest_entry_of_each_object(self):
+        restaurant, review = self.restaurants[0].pk, Review.objects.first().pk
+        start = Change.objects.count()
+        Change.objects.record([('restaurant', restaurant, 'update'), ('review', review, 'update')])
+        Change.objects.record([('restaurant', restaurant, 'update'), ('review', review, 'delete')])
+        deleted = Change.objects.compact(timezone.now() + timedelta(seconds=1), batch_size=50)
+        # The seeded create entries and the first updates.
+        self.assertEqual(deleted, 4)
+        self.assertEqual(Change.objects.count(), start)
+        self.assertEqual(
+            list(Change.objects.filter(object_type='review', object_id=review).values_list('action', flat=True)),
+            ['delete'],
+        )
+        self.assertEqual(Change.objects.compact(timezone.now() + timedelta(seconds=1)), 0)
@@ -0,0 +1,53 @@
+"""Primary/replica database routing tests."""
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .. import db_routing
+from ..db_routing import PrimaryReplicaRouter
+from ..models import Restaurant, Review
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class DatabaseRoutingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+
+    def test_safe_requests_read_from_one_replica(self):
+        self.assertIsNone(self.router.db_for_read(Review))
+        _, token = db_routing.start_request('GET')
+        alias = self.router.db_for_read(Review)
+        self.assertIn(alias, ['replica1', 'replica2'])
+        self.assertEqual(self.router.db_for_read(Restaurant), alias)
+        self.assertEqual(self.router.db_for_write(Review), 'default')
+        db_routing.stop_request(token, 200)
+
+        _, token = db_routing.start_request('POST')
+        self.assertIsNone(self.router.db_for_read(Review))
+        db_routing.stop_request(token, 201)
+
+    def test_writers_read_their_writes(self):
+        for method, status_code, pinned in [('POST', 400, False), ('PATCH', 200, True)]:
+            _, token = db_routing.start_request(method)
+            db_routing.set_user(7)
+            db_routing.stop_request(token, status_code)
+
+            _, token = db_routing.start_request('GET')
+            db_routing.set_user(7)
+            self.assertEqual(self.router.db_for_read(Review) is None, pinned)
+            db_routing.stop_request(token, 200)
+
+        _, token = db_routing.start_request('GET')
+        db_routing.set_user(8)
+        self.assertIsNotNone(self.router.db_for_read(Review))
+        db_routing.stop_request(token, 200)
+
+    def test_batched_reads_use_a_replica_without_pinning(self):
+        _, token = db_routing.start_request('POST')
+        db_routing.set_user(9)
+        with db_routing.safe_reads():
+            self.assertIn(self.router.db_for_read(Review), ['replica1', 'replica2'])
+        self.assertIsNone(self.router.db_for_read(Review))
+        db_routing.stop_request(token, 200)
+        self.assertIsNone(cache.get(db_routing.pin_key(9)))
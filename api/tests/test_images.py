@@ -0,0 +1,152 @@
+"""Restaurant image variant tests."""
+import io
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .. import images
+from ..models import Restaurant, User
+
+
+def image_bytes(color, size=(800, 600), image_format='JPEG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0, RESPONSE_CACHE_ENABLED=False)
+class ImageVariantTests(APITestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def restaurant(self, image_name, data):
+        restaurant = Restaurant(name="Wok", description="Noodles.", address="1 Road")
+        restaurant.image.save(image_name, ContentFile(data), save=False)
+        restaurant.save()
+        return restaurant
+
+    def pixel(self, name):
+        with default_storage.open(name, 'rb') as handle, Image.open(handle) as image:
+            return image.size, image.convert('RGB').getpixel((0, 0))
+
+    def authenticate_admin(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', first_name='Admin', password='admin-password',
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}')
+
+    def variant_names(self, restaurant):
+        return [name for stored in restaurant.image_variants.values() for name in stored.values()]
+
+    def test_uploads_generate_variants_inline(self):
+        self.authenticate_admin()
+        upload = ContentFile(image_bytes('red'), name='pizza.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/restaurants/', {
+                'name': "Pizza", 'image': upload, 'description': "Pizza.", 'address': "2 Road",
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+
+        restaurant = Restaurant.objects.get(pk=response.data['restaurant_id'])
+        self.assertEqual(set(restaurant.image_variants), set(images.VARIANTS))
+        for variant, (width, height, crop) in images.VARIANTS.items():
+            for extension in images.FORMATS:
+                size, _ = self.pixel(restaurant.image_variants[variant][extension])
+                self.assertEqual(size, (width, height) if crop else (800, 600))
+
+        response = self.client.get(f'/api/restaurants/{restaurant.pk}/')
+        name = restaurant.image_variants['card']['webp']
+        self.assertEqual(response.data['image_variants']['card']['webp'], f'http://testserver/media/{name}')
+        self.assertEqual(self.client.get('/api/restaurants/').data['results'][0]['image_variants'],
+                         response.data['image_variants'])
+
+    def test_images_with_the_same_stem_keep_their_own_variants(self):
+        red = self.restaurant('p.jpg', image_bytes('red'))
+        blue = self.restaurant('p.png', image_bytes('blue', image_format='PNG'))
+        shared = self.restaurant('p.jpg', image_bytes('green'))
+        shared.image.name = red.image.name
+        shared.save()
+
+        variants = {restaurant.pk: images.generate_variants(restaurant) for restaurant in (red, blue, shared)}
+        names = [name for restaurant in variants.values() for urls in restaurant.values() for name in urls.values()]
+        self.assertEqual(len(names), len(set(names)))
+        # Regenerating replaces the restaurant's own files only.
+        images.generate_variants(red)
+        for restaurant, color in [(red, (255, 0, 0)), (blue, (0, 0, 255)), (shared, (255, 0, 0))]:
+            _, pixel = self.pixel(variants[restaurant.pk]['thumbnail']['webp'])
+            self.assertTrue(all(abs(a - b) <= 10 for a, b in zip(pixel, color)), (restaurant.image.name, pixel))
+
+    def test_variants_of_a_replaced_image_are_not_recorded(self):
+        restaurant = self.restaurant('old.jpg', image_bytes('red'))
+        old_name = restaurant.image.name
+        names = images.store_variants(restaurant.pk, old_name, images.render_variants(image_bytes('red')))
+        restaurant.image.save('new.jpg', ContentFile(image_bytes('blue')))
+
+        images.record_variants(restaurant.pk, old_name, names)
+        restaurant.refresh_from_db()
+        self.assertEqual(restaurant.image_variants, {})
+        self.assertEqual(self.client.get(f'/api/restaurants/{restaurant.pk}/').data['image_variants'], {})
+
+        images.record_variants(restaurant.pk, restaurant.image.name, names)
+        restaurant.refresh_from_db()
+        self.assertEqual(restaurant.image_variants, names)
+
+    def test_replaced_and_deleted_images_drop_their_variants(self):
+        self.authenticate_admin()
+        restaurant = self.restaurant('old.jpg', image_bytes('red'))
+        images.generate_variants(restaurant)
+        restaurant.refresh_from_db()
+        old_names = self.variant_names(restaurant)
+        self.assertTrue(all(default_storage.exists(name) for name in old_names))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/restaurants/{restaurant.pk}/', {
+                'image': ContentFile(image_bytes('blue'), name='new.jpg'),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertFalse(any(default_storage.exists(name) for name in old_names))
+        restaurant.refresh_from_db()
+        new_names = self.variant_names(restaurant)
+        self.assertEqual(len(new_names), len(old_names))
+        self.assertTrue(all(default_storage.exists(name) for name in new_names))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f'/api/restaurants/{restaurant.pk}/').status_code, 204)
+        self.assertFalse(any(default_storage.exists(name) for name in new_names))
+
+    def test_callbacks_only_close_connections_off_the_request_thread(self):
+        restaurant = self.restaurant('p.jpg', image_bytes('red'))
+        rendered = images.render_variants(image_bytes('red'))
+        finished, pending = Future(), Future()
+        finished.set_result(rendered)
+        executor = mock.Mock()
+        with mock.patch.object(images, 'get_executor', return_value=executor), \
+                mock.patch.object(images.connections, 'close_all') as close_all:
+            # A render that already finished runs the callback on the request thread.
+            executor.submit.return_value = finished
+            images.schedule_variants(restaurant)
+            close_all.assert_not_called()
+            restaurant.refresh_from_db()
+            self.assertEqual(set(restaurant.image_variants), set(images.VARIANTS))
+
+            executor.submit.return_value = pending
+            images.schedule_variants(restaurant)
+            with mock.patch.object(images, 'record_variants'):
+                thread = threading.Thread(target=pending.set_result, args=(rendered,))
+                thread.start()
+                thread.join()
+            close_all.assert_called_once_with()
@@ -0,0 +1,112 @@
+"""Bulk import command tests."""
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.core.management import call_command
+
+from .. import imports
+from ..models import Change, Restaurant, Review
+from .base import QueryBudgetTestCase
+
+
+def ndjson(*rows):
+    return io.StringIO(''.join((row if isinstance(row, str) else json.dumps(row)) + '\n' for row in rows))
+
+
+class ImportTests(QueryBudgetTestCase):
+
+    def write(self, name, content):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(lambda: (os.remove(path), os.rmdir(directory)))
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8', newline='') as handle:
+            handle.write(content)
+        return path
+
+    def import_reviews(self, *rows, **kwargs):
+        return imports.import_reviews(imports.iter_rows(ndjson(*rows), 'ndjson'), **kwargs)
+
+    def test_commands_import_csv_and_ndjson(self):
+        path = self.write('restaurants.csv', (
+            "name,image,description,address,latitude,longitude,website\n"
+            "Imported Wok,a.jpg,Noodles.,1 Road,-6.2,106.8,\n"
+            "Imported Grill,b.jpg,Fish.,2 Road,,,https://grill.example.com\n"
+            "Nowhere,c.jpg,Soup.,3 Road,95,106.8,\n"
+        ))
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_restaurants', path, stdout=stdout, stderr=stderr)
+        self.assertIn("Imported 2 restaurants, skipped 1", stdout.getvalue())
+        self.assertIn("line 4: latitude must be between -90 and 90", stderr.getvalue())
+        wok, grill = Restaurant.objects.filter(name__startswith='Imported').order_by('-name')
+        self.assertIsNotNone(wok.geohash)
+        self.assertEqual((grill.geohash, grill.website), (None, 'https://grill.example.com'))
+
+        user = self.users[0]
+        path = self.write('reviews.ndjson', ''.join(json.dumps(row) + '\n' for row in [
+            {'user': user.username, 'restaurant': wok.pk, 'rating': 4, 'review': "Good.",
+             'created_at': '2025-03-01T12:00:00Z'},
+            {'user': user.username, 'restaurant': grill.pk, 'rating': '5', 'review': "Great."},
+        ]))
+        call_command('import_reviews', path, stdout=stdout, stderr=stderr)
+        self.assertIn("Imported 2 reviews, skipped 0", stdout.getvalue())
+        review = Review.objects.get(user=user, restaurant=wok)
+        self.assertEqual(review.created_at, datetime(2025, 3, 1, 12, tzinfo=dt_timezone.utc))
+        wok.refresh_from_db()
+        self.assertEqual((wok.review_count, wok.rating_sum), (1, 4))
+        self.assertTrue(Change.objects.filter(object_type='review', object_id=review.pk, action='create').exists())
+
+    def test_rows_are_rejected_with_their_line(self):
+        user, restaurant = self.users[0], Restaurant.objects.exclude(reviews__user=self.users[0]).first()
+        valid = {'user': user.username, 'restaurant': restaurant.pk, 'rating': 3, 'review': "Fine."}
+        result = self.import_reviews(
+            {**valid, 'rating': '4.7'}, {**valid, 'rating': 4.7}, {**valid, 'rating': True},
+            {**valid, 'rating': 6}, {**valid, 'restaurant': 'five'}, {**valid, 'user': ' '},
+            {**valid, 'user': 'nobody'}, {**valid, 'restaurant': 10 ** 6}, {**valid, 'created_at': 'yesterday'},
+            'not json', '[1, 2]', {**valid, 'rating': 3.0},
+        )
+        self.assertEqual((result.created, result.skipped), (1, 11))
+        self.assertEqual(result.errors, [
+            "line 1: rating must be an integer",
+            "line 2: rating must be an integer",
+            "line 3: rating must be an integer",
+            "line 4: Rating must be between one to five.",
+            "line 5: restaurant must be an integer",
+            "line 6: user is required",
+            "line 9: created_at must be an ISO 8601 datetime",
+            "line 10: invalid JSON (Expecting value: line 1 column 1 (char 0))",
+            "line 11: expected a JSON object",
+            "line 7: user 'nobody' does not exist",
+            f"line 8: restaurant {10 ** 6} does not exist",
+        ])
+        self.assertEqual(Review.objects.get(user=user, restaurant=restaurant).rating, 3)
+
+    def test_duplicates_are_skipped(self):
+        user = self.users[0]
+        reviewed = user.reviews.first().restaurant_id
+        restaurant = Restaurant.objects.exclude(reviews__user=user).first()
+        row = {'user': user.username, 'restaurant': restaurant.pk, 'rating': 5, 'review': "Again."}
+        result = self.import_reviews(row, {**row, 'rating': 1}, {**row, 'restaurant': reviewed}, batch_size=2)
+        self.assertEqual((result.created, result.skipped), (1, 2))
+        self.assertEqual(result.errors, [
+            f"line 2: user '{user.username}' has already reviewed restaurant {restaurant.pk}",
+            f"line 3: user '{user.username}' has already reviewed restaurant {reviewed}",
+        ])
+        self.assertEqual(Review.objects.get(user=user, restaurant=restaurant).rating, 5)
+
+    def test_a_failing_batch_is_rolled_back(self):
+        user = self.users[0]
+        first, second = Restaurant.objects.exclude(reviews__user=user).order_by('pk')[:2]
+        rows = [
+            {'user': user.username, 'restaurant': restaurant.pk, 'rating': 5, 'review': "Batch."}
+            for restaurant in (first, second)
+        ]
+        with mock.patch.object(imports.search, 'index_instances', side_effect=[None, RuntimeError("index down")]):
+            with self.assertRaises(RuntimeError):
+                self.import_reviews(*rows, batch_size=1)
+        self.assertTrue(Review.objects.filter(user=user, restaurant=first).exists())
+        self.assertFalse(Review.objects.filter(user=user, restaurant=second).exists())
+        self.assertEqual(Change.objects.filter(object_type='review').count(), 1)
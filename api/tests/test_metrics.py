@@ -0,0 +1,22 @@
+"""Server-Timing header and /metrics tests."""
+from django.test import override_settings
+
+from .base import QueryBudgetTestCase
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class PerformanceMetricsTests(QueryBudgetTestCase):
+
+    @override_settings(PERFORMANCE_METRICS_ENABLED=True, METRICS_TOKEN='scrape')
+    def test_server_timing_and_metrics(self):
+        response = self.client.get('/api/reviews/?limit=10')
+        self.assertIn('sql;desc="2 queries"', response['Server-Timing'])
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape').content.decode()
+        self.assertIn('api_sql_queries_bucket{route="review-list",method="GET",le="2"}', body)
+
+    def test_disabled_by_default(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/reviews/?limit=10'))
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
@@ -0,0 +1,68 @@
+"""Pagination tests: review cursors and estimated counts."""
+import base64
+import json
+
+from django.test import override_settings
+
+from ..models import Restaurant, Review
+from .base import QueryBudgetTestCase
+
+
+def cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+class CursorPaginationTests(QueryBudgetTestCase):
+
+    def test_crafted_cursors_are_not_found(self):
+        payloads = [
+            {'v': {}, 'pk': 1}, {'v': [1], 'pk': 1}, {'v': None, 'pk': 1}, {'v': '2026-01-01T00:00:00Z', 'pk': '1'},
+            {'v': 4, 'pk': True}, {'v': 'soon', 'pk': 1}, [1, 2],
+        ]
+        for payload in payloads:
+            for ordering in ('-created_at', 'rating'):
+                with self.subTest(payload=payload, ordering=ordering):
+                    response = self.assertQueryBudget(
+                        0, 'get', f'/api/reviews/?ordering={ordering}&cursor={cursor(payload)}', status_code=404,
+                    )
+                    self.assertEqual(response.data['detail'], 'Invalid cursor')
+        self.assertQueryBudget(0, 'get', '/api/reviews/?cursor=not-base64', status_code=404)
+
+        review = Review.objects.order_by('-rating', '-review_id').first()
+        response = self.client.get(f'/api/reviews/?ordering=-rating&cursor={cursor({"v": review.rating, "pk": review.pk})}')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False, PAGINATION_EXACT_COUNT_THRESHOLD=100)
+class EstimatedCountTests(QueryBudgetTestCase):
+
+    def test_small_results_are_counted_exactly(self):
+        restaurant = Restaurant.objects.filter(review_count__gt=0).order_by('-review_count').first()
+        response = self.assertQueryBudget(3, 'get', f'/api/reviews/?restaurant={restaurant.pk}&limit=1')
+        self.assertEqual(response.data['count'], restaurant.review_count)
+        self.assertTrue(response.data['count_is_exact'])
+
+    def test_large_results_use_a_cached_count(self):
+        url = '/api/reviews/?created_at__gte=2000-01-01&limit=10'
+        total = Review.objects.count()
+        # The first page counts every row, later pages reuse the cached count.
+        response = self.assertQueryBudget(3, 'get', url)
+        self.assertEqual((response.data['count'], response.data['count_is_exact']), (total, True))
+        response = self.assertQueryBudget(2, 'get', f'{url}&offset=20')
+        self.assertEqual((response.data['count'], response.data['count_is_exact']), (total, False))
+        self.assertIn('offset=30', response.data['next'])
+
+        Review.objects.filter(pk__in=Review.objects.order_by('-pk').values('pk')[:5]).delete()
+        response = self.client.get(f'{url}&offset={total - 10}')
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(response.data['count'], total)
+
+    def test_async_pages_match(self):
+        url = '/api/reviews/?created_at__gte=2000-01-01&limit=10'
+        self.client.get(url)
+        response = self.client.get(f'/api/async{url[4:]}').json()
+        expected = self.client.get(url).json()
+        for key in ('count', 'count_is_exact', 'results'):
+            self.assertEqual(response[key], expected[key])
+        self.assertFalse(response['count_is_exact'])
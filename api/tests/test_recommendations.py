@@ -0,0 +1,62 @@
+"""Item-item recommendation build and endpoint tests."""
+import numpy as np
+
+from .. import recommendations
+from ..models import RestaurantSimilarity, Review, User
+from .base import QueryBudgetTestCase
+
+
+class RecommendationTests(QueryBudgetTestCase):
+
+    def test_neighbours_match_adjusted_cosine(self):
+        users = np.array([1, 1, 1, 2, 2, 2, 3, 3, 4, 4])
+        items = np.array([10, 20, 30, 10, 20, 30, 10, 20, 20, 30])
+        ratings = np.array([5, 4, 1, 4, 5, 2, 5, 3, 1, 5])
+        items_out, similar, scores, counts = recommendations.compute_neighbours(
+            users, items, ratings, shrinkage=0, min_common=1,
+        )
+        self.assertEqual(list(zip(items_out, similar)), [(10, 20), (20, 10)])
+        # Ratings centered on each user's mean, restaurants 10 and 20 share users 1-3.
+        x10, x20 = np.array([5 - 10 / 3, 4 - 11 / 3, 1]), np.array([4 - 10 / 3, 5 - 11 / 3, -1, -2])
+        expected = x10 @ x20[:3] / (np.linalg.norm(x10) * np.linalg.norm(x20))
+        self.assertAlmostEqual(scores[0], expected)
+        self.assertEqual(scores[0], scores[1])
+        self.assertEqual(list(counts), [3, 3])
+
+    def test_similar_and_recommendations_are_one_lookup(self):
+        recommendations.build(min_common=1)
+        restaurant = RestaurantSimilarity.objects.values_list('restaurant', flat=True).first()
+        expected = list(
+            RestaurantSimilarity.objects.filter(restaurant=restaurant).order_by('-score').values_list('similar', flat=True)
+        )
+        response = self.assertQueryBudget(1, 'get', f'/api/restaurants/{restaurant}/similar/?limit=100')
+        self.assertEqual([item['restaurant_id'] for item in response.data], expected)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        response = self.assertQueryBudget(0, 'get', f'/api/restaurants/{restaurant}/similar/?limit=100')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertQueryBudget(2, 'get', '/api/restaurants/0/similar/', status_code=404)
+
+        user = User.objects.filter(reviews__restaurant=restaurant).first()
+        self.authenticate(user)
+        response = self.assertQueryBudget(4, 'get', f'/api/users/{user.username}/recommendations/')
+        reviewed = set(user.reviews.values_list('restaurant', flat=True))
+        self.assertTrue(response.data)
+        self.assertFalse(reviewed & {item['restaurant_id'] for item in response.data})
+        scores = [item['score'] for item in response.data]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertQueryBudget(1, 'get', f'/api/users/{self.users[-1].username}/recommendations/', status_code=403)
+
+    def test_incremental_build_recomputes_reviewed_restaurants(self):
+        recommendations.build(min_common=1)
+        before = dict(RestaurantSimilarity.objects.values_list('pk', 'computed_at'))
+        restaurant = self.restaurants[0]
+        reviewer = User.objects.exclude(reviews__restaurant=restaurant).first()
+        Review.objects.create(user=reviewer, restaurant=restaurant, rating=5, review="Great.")
+
+        result = recommendations.build(incremental=True, min_common=1)
+        self.assertEqual(result['restaurants'], 1)
+        after = RestaurantSimilarity.objects.exclude(restaurant=restaurant)
+        self.assertEqual(dict(after.values_list('pk', 'computed_at')), {
+            pk: computed_at for pk, computed_at in before.items() if pk in set(after.values_list('pk', flat=True))
+        })
+        self.assertEqual(recommendations.build(incremental=True)['restaurants'], 0)
@@ -0,0 +1,42 @@
+"""orjson and MessagePack renderer tests."""
+from datetime import datetime, timezone as dt_timezone
+
+import msgpack
+from rest_framework.renderers import JSONRenderer
+
+from ..renderers import encode_default
+from ..models import Restaurant
+from .base import QueryBudgetTestCase
+
+
+class RendererTests(QueryBudgetTestCase):
+
+    def test_json_is_identical_to_drf(self):
+        for url in ['/api/reviews/?limit=100', '/api/restaurants/?limit=100', '/api/reviews/?rating=9']:
+            response = self.client.get(url)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_messagepack_is_negotiated(self):
+        expected = self.client.get('/api/reviews/?limit=25').json()['results']
+        for kwargs in [{'HTTP_ACCEPT': 'application/msgpack'}, {'data': {'format': 'msgpack'}}]:
+            response = self.client.get('/api/reviews/?limit=25', **kwargs)
+            self.assertEqual(response['Content-Type'], 'application/msgpack')
+            self.assertEqual(msgpack.unpackb(response.content)['results'], expected)
+
+        self.authenticate(self.users[0])
+        restaurant = Restaurant.objects.exclude(reviews__user=self.users[0]).first()
+        response = self.client.post(
+            '/api/reviews/', msgpack.packb({'restaurant': restaurant.pk, 'rating': 4, 'review': "Sate ✓"}),
+            content_type='application/msgpack', HTTP_ACCEPT='application/msgpack',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(msgpack.unpackb(response.content)['review'], "Sate ✓")
+        response = self.client.post('/api/reviews/', b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
+
+    def test_values_are_encoded_like_drf(self):
+        user, restaurant = self.users[0], self.restaurants[0]
+        self.assertEqual(encode_default(user.uuid), str(user.uuid))
+        self.assertEqual(encode_default(datetime(2026, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc)), '2026-01-02T03:04:05Z')
+        self.assertEqual(encode_default(restaurant.image), '/media/restaurant_images/placeholder.jpg')
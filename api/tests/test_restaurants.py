@@ -0,0 +1,152 @@
+"""Restaurant endpoint tests, including the nested restaurant reviews."""
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from ..models import Restaurant, User
+from ..views import RestaurantViewSet
+from .base import PAGE_SIZES, QueryBudgetTestCase
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class RestaurantQueryTests(QueryBudgetTestCase):
+
+    def test_list_budget_is_independent_of_page_size(self):
+        for limit in PAGE_SIZES:
+            with self.subTest(limit=limit):
+                response = self.assertQueryBudget(2, 'get', f'/api/restaurants/?limit={limit}')
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_filtered_search_and_ordering(self):
+        self.assertQueryBudget(2, 'get', '/api/restaurants/?name__icontains=wok&ordering=-name&limit=100')
+        response = self.assertQueryBudget(2, 'get', '/api/restaurants/?search=noodles&limit=100')
+        self.assertEqual(response.data['count'], len(self.restaurants))
+
+    def test_detail(self):
+        self.assertQueryBudget(1, 'get', f'/api/restaurants/{self.restaurants[0].pk}/')
+
+    def test_nearby(self):
+        self.assertQueryBudget(2, 'get', '/api/restaurants/nearby/?lat=-6.15&lng=106.85&radius=20&limit=100')
+
+    def test_top_and_rating_ordering(self):
+        response = self.assertQueryBudget(1, 'get', '/api/restaurants/top/?limit=100')
+        scores = [item['score'] for item in response.data]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual([item['rank'] for item in response.data[:3]], [1, 2, 3])
+
+        area = self.restaurants[0].geohash[:3]
+        response = self.assertQueryBudget(1, 'get', f'/api/restaurants/top/?area={area}')
+        self.assertTrue(all(
+            Restaurant.objects.get(pk=item['restaurant_id']).geohash.startswith(area) for item in response.data
+        ))
+        self.assertEqual(self.client.get('/api/restaurants/top/?area=a!').status_code, 400)
+
+        response = self.assertQueryBudget(2, 'get', '/api/restaurants/?ordering=-rating&limit=100')
+        ratings = [item['total_rating'] for item in response.data['results']]
+        self.assertEqual(ratings, sorted(ratings, reverse=True))
+
+    def test_async_list_orders_like_the_viewset(self):
+        for ordering in ['name', '-rating', 'review_count', '-review_count', 'score', '-score,name', 'bogus']:
+            with self.subTest(ordering=ordering):
+                query = f'?ordering={ordering}&limit=100'
+                results = self.client.get(f'/api/restaurants/{query}').data['results']
+                expected = [item['restaurant_id'] for item in results]
+                response = self.client.get(f'/api/async/restaurants/{query}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([item['restaurant_id'] for item in response.json()['results']], expected)
+
+    def test_new_review_updates_the_ranking(self):
+        restaurant = Restaurant.objects.filter(review_count=0).first() or self.restaurants[-1]
+        user = User.objects.exclude(reviews__restaurant=restaurant).exclude(is_staff=True).first()
+        self.authenticate(user)
+        response = self.client.post('/api/reviews/', {'restaurant': restaurant.pk, 'rating': 5, 'review': "Great!"})
+        self.assertEqual(response.status_code, 201, response.content)
+        ranking = Restaurant.objects.get(pk=restaurant.pk).ranking
+        restaurant.refresh_from_db()
+        self.assertEqual(ranking.review_count, restaurant.review_count)
+        self.assertAlmostEqual(ranking.average_rating, restaurant.rating_sum / restaurant.review_count)
+
+    def test_sparse_fields_and_expansion(self):
+        restaurant = self.restaurants[0]
+        response = self.assertQueryBudget(
+            1, 'get', f'/api/restaurants/{restaurant.pk}/?fields=name,total_rating&expand=rating_distribution',
+        )
+        self.assertEqual(set(response.data), {'restaurant_id', 'name', 'total_rating', 'rating_distribution'})
+        restaurant.refresh_from_db()
+        self.assertEqual(response.data['rating_distribution'], restaurant.rating_distribution)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_cached_responses_skip_the_database(self):
+        self.client.get('/api/restaurants/?limit=100')
+        response = self.assertQueryBudget(0, 'get', '/api/restaurants/?limit=100')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_cache_keys_keep_query_values_apart(self):
+        first = self.client.get('/api/restaurants/?name__icontains=wok&ordering=-name')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertTrue(first.data['results'])
+        response = self.client.get('/api/restaurants/?name__icontains=wok%26ordering%3D-name')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 0)
+        response = self.client.get('/api/restaurants/?ordering=-name&name__icontains=wok')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data, first.data)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_uncacheable_responses_run_the_view_once(self):
+        calls = []
+
+        def get_response():
+            calls.append(1)
+            return Response({'detail': "Gone."}, status=410)
+
+        request = Request(APIRequestFactory().get('/api/restaurants/1/'))
+        response = RestaurantViewSet()._cached_response(request, 'detail:1', get_response, lambda data: [1])
+        self.assertEqual((response.status_code, len(calls)), (410, 1))
+        self.assertNotIn('X-Cache', response)
+
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_cached_responses_keep_the_view_headers(self):
+        computed = Response({'restaurant_id': 1}, headers={'Link': '</api/restaurants/2/>; rel="next"'})
+        request = Request(APIRequestFactory().get('/api/restaurants/1/'))
+        miss = RestaurantViewSet()._cached_response(request, 'detail:1', lambda: computed, lambda data: [1])
+        self.assertIs(miss, computed)
+        self.assertEqual(miss['X-Cache'], 'MISS')
+
+        hit = RestaurantViewSet()._cached_response(request, 'detail:1', self.fail, lambda data: [1])
+        self.assertEqual((hit['X-Cache'], hit['Link'], hit.data), ('HIT', computed['Link'], computed.data))
+
+
+class RestaurantReviewTests(QueryBudgetTestCase):
+
+    def test_pages_read_the_restaurant_and_the_page(self):
+        restaurant = Restaurant.objects.order_by('-review_count').first()
+        url = f'/api/restaurants/{restaurant.pk}/reviews/'
+        response = self.assertQueryBudget(2, 'get', f'{url}?limit=5&summary=true')
+        expected = list(restaurant.reviews.order_by('-created_at', '-review_id').values_list('pk', flat=True)[:5])
+        self.assertEqual([review['review_id'] for review in response.data['results']], expected)
+        self.assertEqual(response.data['count'], restaurant.reviews.count())
+        self.assertEqual(response.data['summary'], {
+            'review_count': restaurant.review_count,
+            'average_rating': restaurant.total_rating,
+            'rating_distribution': restaurant.rating_distribution,
+        })
+
+        # Filtered pages count their reviews, cursor pages count nothing.
+        response = self.assertQueryBudget(3, 'get', f'{url}?rating__gte=4&limit=100')
+        self.assertEqual(response.data['count'], restaurant.reviews.filter(rating__gte=4).count())
+        self.assertNotIn('summary', response.data)
+        response = self.assertQueryBudget(2, 'get', f'{url}?cursor=&limit=5')
+        self.assertQueryBudget(2, 'get', response.data['next'])
+
+        review = restaurant.reviews.first()
+        self.assertQueryBudget(1, 'get', f'{url}{review.pk}/')
+        self.assertQueryBudget(1, 'get', f'/api/restaurants/{restaurant.pk + 1}/reviews/{review.pk}/', 404)
+
+    def test_unknown_restaurants(self):
+        self.assertQueryBudget(1, 'get', '/api/restaurants/999999/reviews/', 404)
+        self.assertQueryBudget(0, 'get', '/api/restaurants/abc/reviews/', 404)
+        self.assertQueryBudget(0, 'get', '/api/restaurants/abc/reviews/1/', 404)
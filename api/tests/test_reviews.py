@@ -0,0 +1,167 @@
+"""Review endpoint tests."""
+import csv
+import io
+import json
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Restaurant, Review
+from ..views import ReviewViewSet
+from .base import PAGE_SIZES, QueryBudgetTestCase
+
+
+class ReviewQueryTests(QueryBudgetTestCase):
+
+    def test_list_budget_is_independent_of_page_size(self):
+        for limit in PAGE_SIZES:
+            with self.subTest(limit=limit):
+                response = self.assertQueryBudget(2, 'get', f'/api/reviews/?limit={limit}')
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_cursor_pages(self):
+        for limit in PAGE_SIZES:
+            with self.subTest(limit=limit):
+                response = self.assertQueryBudget(1, 'get', f'/api/reviews/?cursor=&limit={limit}')
+                self.assertQueryBudget(1, 'get', response.data['next'])
+
+    def test_filters(self):
+        # The restaurant filter validates the choice with one extra query.
+        restaurant = self.restaurants[0].pk
+        self.assertQueryBudget(3, 'get', f'/api/reviews/?restaurant={restaurant}&rating__gte=3&limit=100')
+        self.assertQueryBudget(2, 'get', '/api/reviews/?search=noodles&ordering=-rating&limit=100')
+
+    def test_detail(self):
+        self.assertQueryBudget(1, 'get', f'/api/reviews/{Review.objects.first().pk}/')
+
+    def test_sparse_fields_prune_columns_and_joins(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/reviews/?fields=rating,restaurant&limit=10')
+        self.assertEqual(set(response.data['results'][0]), {'review_id', 'rating', 'restaurant'})
+        page_sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('api_user', page_sql)
+        self.assertNotIn('"review"', page_sql.replace('"api_review"', ''))
+
+        response = self.assertQueryBudget(1, 'get', '/api/reviews/?fields=rating&expand=restaurant&cursor=&limit=10')
+        review = response.data['results'][0]
+        self.assertEqual(set(review), {'review_id', 'rating', 'restaurant'})
+        self.assertEqual(review['restaurant']['restaurant_id'], Review.objects.get(pk=review['review_id']).restaurant_id)
+
+        response = self.client.get('/api/reviews/?fields=rating,nope')
+        self.assertEqual(response.status_code, 400)
+
+
+class ReviewWriteTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.authenticate(self.user)
+        self.unreviewed = list(Restaurant.objects.exclude(reviews__user=self.user).order_by('pk')[:3])
+
+    def test_create_runs_no_lookups(self):
+        restaurant = self.unreviewed[0]
+        data = {'restaurant': restaurant.pk, 'rating': 4, 'review': "Crispy duck, slow service."}
+        # User, aggregate update, ranking refresh (prior mean, read, upsert),
+        # insert, search index (delete, insert), rollups (insert, update),
+        # change log insert and four savepoint statements.
+        response = self.assertQueryBudget(15, 'post', '/api/reviews/', 201, data=data)
+        self.assertEqual(response.data['restaurant'], restaurant.pk)
+        self.assertEqual(Restaurant.objects.get(pk=restaurant.pk).review_count, restaurant.review_count + 1)
+
+        response = self.client.post('/api/reviews/', data)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, ["You have already reviewed this restaurant."])
+        self.assertEqual(Restaurant.objects.get(pk=restaurant.pk).review_count, restaurant.review_count + 1)
+
+        response = self.client.post('/api/reviews/', {**data, 'restaurant': 10 ** 6})
+        self.assertEqual(response.status_code, 404)
+
+    def test_batch(self):
+        data = [
+            {'restaurant': restaurant.pk, 'rating': rating, 'review': "Worth the queue."}
+            for rating, restaurant in enumerate(self.unreviewed, start=3)
+        ]
+        response = self.client.post('/api/reviews/batch/', data, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual([review['restaurant'] for review in response.data], [r.pk for r in self.unreviewed])
+        for restaurant in self.unreviewed:
+            updated = Restaurant.objects.get(pk=restaurant.pk)
+            self.assertEqual(updated.review_count, restaurant.review_count + 1)
+            self.assertEqual(updated.ranking.review_count, updated.review_count)
+
+        # All or nothing: one duplicate rejects the whole batch.
+        other = Restaurant.objects.exclude(reviews__user=self.user).first()
+        response = self.client.post('/api/reviews/batch/', [
+            {'restaurant': other.pk, 'rating': 5, 'review': "New."}, data[0],
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Review.objects.filter(user=self.user, restaurant=other).exists())
+        self.assertEqual(Restaurant.objects.get(pk=other.pk).review_count, other.review_count)
+
+
+class ReviewPermissionTests(QueryBudgetTestCase):
+
+    def test_only_authors_edit_and_admins_delete(self):
+        author, other = self.users[0], self.users[1]
+        review = author.reviews.first()
+        url = f'/api/reviews/{review.pk}/'
+
+        self.authenticate(other)
+        self.assertEqual(self.client.patch(url, {'rating': 1}).status_code, 403)
+        self.assertEqual(self.client.delete(url).status_code, 403)
+        self.authenticate(author)
+        self.assertEqual(self.client.patch(url, {'rating': 1}).status_code, 200)
+        self.authenticate(self.admin)
+        self.assertEqual(self.client.patch(url, {'rating': 2}).status_code, 403)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(Review.objects.filter(pk=review.pk).exists())
+
+
+class ReviewExportTests(QueryBudgetTestCase):
+    header = ['review_id', 'restaurant_id', 'user_id', 'user_username', 'rating', 'review', 'created_at', 'updated_at']
+
+    def export(self, query='', **kwargs):
+        response = self.client.get(f'/api/reviews/export/{query}', **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def expected(self, queryset=None):
+        rows = (queryset or Review.objects.all()).order_by('review_id').values_list(*ReviewViewSet.export_columns)
+        return [dict(zip(self.header, (*row[:6], row[6].isoformat(), row[7].isoformat()))) for row in rows]
+
+    def test_ndjson_and_csv_bodies(self):
+        self.authenticate(self.admin)
+        # Small chunks so the body spans several streamed pieces.
+        with mock.patch.object(ReviewViewSet, 'export_chunk_size', 100):
+            response, body = self.export()
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            self.assertEqual(response['Content-Disposition'], 'attachment; filename="reviews.ndjson"')
+            self.assertEqual([json.loads(line) for line in body.splitlines()], self.expected())
+            self.assertGreater(len(list(self.client.get('/api/reviews/export/').streaming_content)), 1)
+
+            for kwargs in [{'query': '?format=csv'}, {'HTTP_ACCEPT': 'text/csv'}]:
+                response, body = self.export(**kwargs)
+                self.assertEqual(response['Content-Type'], 'text/csv')
+                rows = list(csv.reader(io.StringIO(body)))
+                self.assertEqual(rows[0], self.header)
+                self.assertEqual(rows[1:], [[str(value) for value in row.values()] for row in self.expected()])
+
+    def test_filters_apply(self):
+        self.authenticate(self.admin)
+        restaurant = self.restaurants[0]
+        _, body = self.export(f'?restaurant={restaurant.pk}&rating__gte=4')
+        expected = self.expected(Review.objects.filter(restaurant=restaurant, rating__gte=4))
+        self.assertTrue(expected)
+        self.assertEqual([json.loads(line) for line in body.splitlines()], expected)
+
+    def test_admins_only(self):
+        response = self.client.get('/api/reviews/export/?format=csv')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.authenticate(self.users[0])
+        response = self.client.get('/api/reviews/export/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(json.loads(response.content), {'detail': "You do not have permission to perform this action."})
@@ -0,0 +1,26 @@
+"""Deterministic seed tests."""
+from datetime import datetime, timezone as dt_timezone
+
+from django.test import TestCase
+
+from ..models import Restaurant, Review, User
+from ..seed import SeedSpec, seed as seed_data
+
+
+class SeedTests(TestCase):
+
+    def test_same_seed_gives_same_data(self):
+        spec = SeedSpec(users=30, restaurants=12, reviews=150, end=datetime(2026, 1, 1, tzinfo=dt_timezone.utc))
+        columns = ('user__username', 'restaurant__name', 'rating', 'review', 'created_at')
+
+        created = seed_data(spec)
+        self.assertEqual(created, {'users': 30, 'restaurants': 12, 'reviews': 150})
+        first = list(Review.objects.order_by('pk').values_list(*columns))
+        self.assertEqual(len(set(Review.objects.values_list('user', 'restaurant'))), 150)
+        self.assertEqual(sum(Restaurant.objects.values_list('review_count', flat=True)), 150)
+
+        Review.objects.all().delete()
+        Restaurant.objects.all().delete()
+        User.objects.all().delete()
+        seed_data(spec)
+        self.assertEqual(list(Review.objects.order_by('pk').values_list(*columns)), first)
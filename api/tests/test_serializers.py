@@ -0,0 +1,35 @@
+"""values() fast path serialization tests."""
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Restaurant
+from .base import QueryBudgetTestCase
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ValuesSerializationTests(QueryBudgetTestCase):
+
+    def test_fast_lists_match_the_serializers(self):
+        restaurant = self.restaurants[0].pk
+        urls = [
+            '/api/reviews/?limit=100', '/api/reviews/?expand=restaurant&limit=20',
+            '/api/reviews/?fields=rating,user_full_name&cursor=&ordering=-rating', '/api/reviews/?search=noodles',
+            '/api/restaurants/?limit=100&ordering=-rating', '/api/restaurants/?fields=name&expand=rating_distribution',
+            f'/api/restaurants/{restaurant}/reviews/?summary=true&expand=restaurant',
+        ]
+        Restaurant.objects.filter(pk=restaurant).update(
+            image='', website='https://example.com', image_variants={'thumb': {'webp': 'variants/1.webp'}},
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                fast = self.client.get(url)
+                with override_settings(FAST_LIST_SERIALIZERS=False):
+                    slow = self.client.get(url)
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(fast.content, slow.content)
+
+    def test_counts_skip_the_joins(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/reviews/?limit=10')
+        self.assertNotIn('api_user', queries.captured_queries[0]['sql'])
@@ -0,0 +1,47 @@
+"""Rating rollup and trends endpoint tests."""
+from datetime import date
+
+from ..models import RatingRollup, Restaurant
+from .base import QueryBudgetTestCase
+
+
+class RatingTrendsTests(QueryBudgetTestCase):
+
+    def rollups(self):
+        return list(RatingRollup.objects.filter(review_count__gt=0).order_by(
+            'restaurant', 'granularity', 'period',
+        ).values_list('restaurant', 'granularity', 'period', 'review_count', 'rating_sum', 'rating_count_5'))
+
+    def test_trends_read_only_rollups(self):
+        restaurant = self.restaurants[0]
+        reviews = list(restaurant.reviews.order_by('created_at').values_list('created_at', 'rating'))
+        response = self.assertQueryBudget(1, 'get', f'/api/restaurants/{restaurant.pk}/trends/?granularity=week')
+        results = response.data['results']
+        self.assertEqual(sum(bucket['review_count'] for bucket in results), len(reviews))
+        self.assertEqual(results[-1]['cumulative_rating'], round(sum(r for _, r in reviews) / len(reviews), 2))
+        for bucket in results:
+            self.assertEqual(date.fromisoformat(bucket['period']).weekday(), 0)
+
+        start, end = reviews[len(reviews) // 2][0].date(), reviews[-1][0].date()
+        url = f'/api/restaurants/{restaurant.pk}/trends/?granularity=day&from={start}&to={end}'
+        response = self.assertQueryBudget(2, 'get', url)
+        self.assertEqual(response.data['results'][-1]['cumulative_rating'], results[-1]['cumulative_rating'])
+        self.assertTrue(all(str(start) <= bucket['period'] <= str(end) for bucket in response.data['results']))
+        self.assertQueryBudget(0, 'get', url)
+
+        self.assertQueryBudget(2, 'get', '/api/restaurants/0/trends/', status_code=404)
+        self.assertQueryBudget(0, 'get', f'/api/restaurants/{restaurant.pk}/trends/?from=2026-02-01&to=2026-01-01', 400)
+
+    def test_review_writes_update_rollups(self):
+        self.authenticate(self.users[0])
+        restaurant = Restaurant.objects.exclude(reviews__user=self.users[0]).first()
+        response = self.client.post('/api/reviews/', {'restaurant': restaurant.pk, 'rating': 2, 'review': "Cold."})
+        self.assertEqual(response.status_code, 201)
+        review_id = response.data['review_id']
+        self.assertEqual(self.client.patch(f'/api/reviews/{review_id}/', {'rating': 5}).status_code, 200)
+        other = self.users[0].reviews.exclude(pk=review_id).first()
+        self.assertEqual(self.client.delete(f'/api/reviews/{other.pk}/').status_code, 204)
+
+        incremental = self.rollups()
+        RatingRollup.objects.rebuild()
+        self.assertEqual(incremental, self.rollups())
@@ -0,0 +1,73 @@
+"""User endpoint tests."""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base import PAGE_SIZES, QueryBudgetTestCase
+
+
+class UserQueryTests(QueryBudgetTestCase):
+
+    def test_list_budget_is_independent_of_page_size(self):
+        self.authenticate(self.admin)
+        for limit in PAGE_SIZES:
+            with self.subTest(limit=limit):
+                # The authenticated user is cached after the first request.
+                budget = 3 if limit == PAGE_SIZES[0] else 2
+                response = self.assertQueryBudget(budget, 'get', f'/api/users/?limit={limit}')
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_sparse_fields_skip_the_review_count(self):
+        self.authenticate(self.admin)
+        self.client.get('/api/users/?limit=10')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/users/?fields=username&limit=10')
+        self.assertEqual(response.data['results'][0], {'username': self.users[0].username})
+        self.assertNotIn('api_review', queries.captured_queries[-1]['sql'])
+
+    def test_detail_counts_reviews_in_the_same_query(self):
+        self.authenticate(self.admin)
+        user = self.users[0]
+        response = self.assertQueryBudget(2, 'get', f'/api/users/{user.username}/')
+        self.assertEqual(response.data['total_reviews'], user.reviews.count())
+
+    def test_register(self):
+        self.assertQueryBudget(3, 'post', '/api/users/register/', status_code=201, data={
+            'username': 'newcomer', 'email': 'newcomer@example.com', 'first_name': 'New', 'password': 'secret-pw',
+        })
+
+    def test_token(self):
+        response = self.assertQueryBudget(1, 'post', '/api/token/', data={
+            'username': 'admin', 'password': 'admin-password',
+        })
+        self.assertIn('access', response.data)
+
+
+class ChangePasswordTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.user.set_password('old-pw')
+        self.user.save()
+        self.url = f'/api/users/{self.user.username}/change_password/'
+
+    def test_owners_give_their_old_password(self):
+        self.authenticate(self.user)
+        response = self.client.post(self.url, {'old_password': 'wrong', 'new_password': 'new-pw'})
+        self.assertEqual((response.status_code, response.data), (400, {'old_password': ["Wrong password."]}))
+        self.assertEqual(self.client.post(self.url, {'old_password': 'old-pw'}).status_code, 400)
+
+        response = self.client.post(self.url, {'old_password': 'old-pw', 'new_password': 'new-pw'})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new-pw'))
+
+        self.authenticate(self.users[1])
+        self.assertEqual(self.client.post(self.url, {'old_password': 'new-pw', 'new_password': 'x'}).status_code, 403)
+
+    def test_admins_reset_any_password(self):
+        self.authenticate(self.admin)
+        response = self.client.post(self.url, {'old_password': 'unknown', 'new_password': 'reset-pw'})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('reset-pw'))
@@ -2,13 +2,23 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested.routers import NestedSimpleRouter
 
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register('restaurants', views.RestaurantViewSet)
 router.register('reviews', views.ReviewViewSet)
 router.register('users', views.UserViewSet)
 
+restaurant_router = NestedSimpleRouter(router, 'restaurants', lookup='restaurant')
+restaurant_router.register('reviews', views.RestaurantReviewViewSet, basename='restaurant-reviews')
+
 urlpatterns = [
+    path('async/restaurants/', async_views.restaurant_list, name='async-restaurant-list'),
+    path('async/restaurants/<str:pk>/', async_views.restaurant_detail, name='async-restaurant-detail'),
+    path('async/reviews/', async_views.review_list, name='async-review-list'),
+    path('async/reviews/<str:pk>/', async_views.review_detail, name='async-review-detail'),
+    path('changes/', views.ChangeFeedView.as_view(), name='changes'),
+    path('batch/', views.BatchView.as_view(), name='batch'),
     path(r'', include(router.urls)),
-]
\ No newline at end of file
+    path(r'', include(restaurant_router.urls)),
+]
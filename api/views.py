@@ -1,18 +1,120 @@
 from django_filters.rest_framework import DjangoFilterBackend
+import csv
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.http import HttpRequest, QueryDict, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import Resolver404, resolve
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.exceptions import MethodNotAllowed, NotFound, ValidationError
 
-from .filters import RestaurantFilter, ReviewFilter, UserFilter
-from .models import Restaurant, Review, User
+from . import db_routing, images, search
+from .cache import restaurant_cache
+from .filters import (
+    FullTextSearchFilter, RankingOrderingFilter, RestaurantFilter, RestaurantReviewFilter, ReviewFilter, UserFilter,
+)
+from .pagination import EstimatedCountPagination, ReviewPagination
+from .renderers import CSVRenderer, NDJSONRenderer
+from .managers import RATING_STARS, period_start
+from .models import Change, RatingRollup, Restaurant, RestaurantSimilarity, Review, User
 from .permissions import IsOwnerOrAdmin
-from .serializers import RestaurantSerializer, ReviewSerializer, UserSerializer, RegisterSerializer, ChangePasswordSerializer
+from .serializers import (
+    RestaurantSerializer, ReviewSerializer, UserSerializer, RegisterSerializer, ChangePasswordSerializer,
+    NearbyQuerySerializer, TopQuerySerializer, ReviewCreateSerializer, SparseFieldsMixin, LimitQuerySerializer,
+    TrendsQuerySerializer, ValuesSerializerMixin, BatchSerializer, ChangesQuerySerializer, ChangeSerializer, RestaurantReviewsQuerySerializer,
+)
+
+class SparseFieldsViewMixin:
+    """
+    Loads only the columns and joins needed by the `fields` and `expand`
+    query parameters of the serializer. Ordering fields are always loaded
+    since cursor pagination reads them.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, SparseFieldsMixin):
+            return queryset
+        columns = {field.name for field in queryset.model._meta.concrete_fields}
+        always = [name for name in getattr(self, 'ordering_fields', ()) if name in columns]
+        return serializer_class.prune_queryset(queryset, self.request, always)
+
+class ValuesListMixin:
+    """
+    Serves list pages with QuerySet.values() and the serializer's
+    represent_values() fast path when it has one (ValuesSerializerMixin)
+    and FAST_LIST_SERIALIZERS is on, skipping model instances and DRF's
+    per-field attribute lookups. The output is the same either way.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        if not isinstance(serializer, ValuesSerializerMixin) or not getattr(settings, 'FAST_LIST_SERIALIZERS', True):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        meta = queryset.model._meta
+        # Cursor pagination reads the ordering fields and the primary key.
+        columns = {field.name for field in meta.concrete_fields}
+        always = [name for name in getattr(self, 'ordering_fields', ()) if name in columns] + [meta.pk.name]
+        rows = queryset.values(*dict.fromkeys(serializer.values_columns() + always))
+        # The joins values() adds for related columns would stay in COUNT(*).
+        self.count_queryset = queryset
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.represent_values(page))
+        return Response(serializer.represent_values(rows))
+
+class MultiGetMixin:
+    """
+    `?ids=1,2,3` on the list endpoint returns the objects with those lookup
+    field values in the requested order, read with one IN query. Unknown
+    ids are left out; filters, ordering and pagination don't apply.
+    """
+    multi_get_param = 'ids'
+    multi_get_max = 100
 
-class UserViewSet(viewsets.ModelViewSet):
+    def list(self, request, *args, **kwargs):
+        if self.multi_get_param not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        field = self.get_lookup_model_field()
+        ids = self.parse_ids(request.query_params[self.multi_get_param], field)
+        queryset = self.get_queryset().filter(**{f'{field.name}__in': ids})
+        found = {getattr(instance, field.attname): instance for instance in queryset}
+        serializer = self.get_serializer([found[value] for value in ids if value in found], many=True)
+        return Response(serializer.data)
+
+    def get_lookup_model_field(self):
+        meta = self.get_queryset().model._meta
+        return meta.pk if self.lookup_field == 'pk' else meta.get_field(self.lookup_field)
+
+    def parse_ids(self, value, field):
+        """
+        Splits and converts the requested ids, dropping repeats.
+        Returns:
+            list: Lookup field values in the requested order.
+        """
+        ids = [part.strip() for part in value.split(',') if part.strip()]
+        if not ids:
+            raise ValidationError({self.multi_get_param: ["Give at least one id."]})
+        if len(ids) > self.multi_get_max:
+            raise ValidationError({self.multi_get_param: [f"Give at most {self.multi_get_max} ids."]})
+        try:
+            return list(dict.fromkeys(field.to_python(part) for part in ids))
+        except DjangoValidationError:
+            raise ValidationError({self.multi_get_param: ["Ids must be valid lookup values."]})
+
+class UserViewSet(SparseFieldsViewMixin, MultiGetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     lookup_field = "username"
@@ -23,15 +125,21 @@ class UserViewSet(viewsets.ModelViewSet):
     ordering_fields = ['username', 'email', 'created_at']
 
     # Pagination
-    pagination_class = LimitOffsetPagination
-    pagination_class.default_limit = 25
-    pagination_class.max_limit = 100
+    pagination_class = EstimatedCountPagination
+
+    def get_queryset(self):
+        """Count the reviews of each user in the same query, unless total_reviews isn't requested."""
+        queryset = super().get_queryset()
+        requested, _ = UserSerializer.parse_fieldset(self.request)
+        if requested is None or 'total_reviews' in requested:
+            queryset = queryset.annotate(review_count=Count('reviews'))
+        return queryset
 
     def get_permissions(self):
         """Set permissions dynamically based on action"""
         if self.action in ['create', 'register']:
             self.permission_classes = [AllowAny]
-        elif self.action in ['update', 'partial_update', 'destroy']:
+        elif self.action in ['update', 'partial_update', 'destroy', 'change_password', 'recommendations']:
             self.permission_classes = [IsOwnerOrAdmin]
         elif self.action == 'list':
             self.permission_classes = [IsAdminUser]
@@ -56,50 +164,370 @@ class UserViewSet(viewsets.ModelViewSet):
         user = self.get_object()
         serializer = ChangePasswordSerializer(data=request.data)
         if serializer.is_valid():
+            # Admins reset passwords without knowing the old one
+            if not request.user.is_staff and not user.check_password(serializer.validated_data['old_password']):
+                return Response({"old_password": ["Wrong password."]}, status=status.HTTP_400_BAD_REQUEST)
             user.set_password(serializer.validated_data['new_password'])
             user.save()
             return Response({"message": "Password updated successfully"}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class RestaurantViewSet(viewsets.ModelViewSet):
-    queryset = Restaurant.objects.all()
+    @action(detail=True, methods=['GET'])
+    def recommendations(self, request, username=None):
+        """
+        Restaurants the user hasn't reviewed, scored by their similarity to
+        the restaurants the user rated (see api/recommendations.py).
+        """
+        user = get_object_or_404(User.objects.only('pk'), username=username)
+        self.check_object_permissions(request, user)
+        query = LimitQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        recommended = RestaurantSimilarity.objects.recommend(user.pk, query.validated_data['limit'])
+        restaurants = Restaurant.objects.defer('search_vector').in_bulk([pk for pk, _ in recommended])
+        results = RestaurantSerializer(
+            [restaurants[pk] for pk, _ in recommended], many=True, context=self.get_serializer_context(),
+        ).data
+        for item, (_, score) in zip(results, recommended):
+            item['score'] = round(score, 4)
+        return Response(results)
+
+    def perform_destroy(self, instance):
+        """
+        Delete the user, refresh the rating aggregates of every restaurant
+        that lost a review through the cascade and log the deleted reviews.
+        """
+        with transaction.atomic():
+            reviews = list(instance.reviews.values_list('pk', 'restaurant_id'))
+            restaurant_ids = list({restaurant_id for _, restaurant_id in reviews})
+            instance.delete()
+            if restaurant_ids:
+                Restaurant.objects.rebuild_rating_aggregates(restaurant_ids)
+                Change.objects.record(
+                    [('review', pk, 'delete') for pk, _ in reviews]
+                    + [('restaurant', pk, 'update') for pk in restaurant_ids]
+                )
+                restaurant_cache.invalidate(restaurant_ids, scopes=['ranking'])
+
+class RestaurantViewSet(SparseFieldsViewMixin, MultiGetMixin, ValuesListMixin, viewsets.ModelViewSet):
+    queryset = Restaurant.objects.defer('search_vector')
     serializer_class = RestaurantSerializer
 
     # Filter
     filterset_class = RestaurantFilter
-    filter_backends = [filters.OrderingFilter, DjangoFilterBackend]
-    ordering_fields = ['name']
+    filter_backends = [RankingOrderingFilter, DjangoFilterBackend, FullTextSearchFilter]
+    ordering_fields = ['name', 'rating', 'review_count', 'score']
 
     # Pagination
-    pagination_class = LimitOffsetPagination
-    pagination_class.default_limit = 25
-    pagination_class.max_limit = 100
+    pagination_class = EstimatedCountPagination
 
     def get_permissions(self):
         self.permission_classes = [AllowAny]
-        if self.request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:
+        if self.request.method in ['POST', 'PUT', 'PATCH', 'DELETE'] or self.action == 'cache_stats':
             self.permission_classes = [IsAdminUser]
         return super().get_permissions()
 
-class ReviewViewSet(viewsets.ModelViewSet):
-    queryset = Review.objects.all()
+    def list(self, request, *args, **kwargs):
+        """
+        List restaurants, served from the versioned response cache when possible.
+        """
+        return self._cached_response(
+            request, 'list', lambda: super(RestaurantViewSet, self).list(request, *args, **kwargs),
+            lambda data: [
+                item['restaurant_id'] for item in (data if isinstance(data, list) else data.get('results', []))
+            ],
+            depends_on_all=True,
+            # Any rating change can reorder a page sorted by rating.
+            scopes=['ranking'] if RankingOrderingFilter().uses_ranking(request, self.get_queryset(), self) else (),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Retrieve a restaurant, served from the versioned response cache when possible.
+        """
+        return self._cached_response(
+            request, f"detail:{kwargs[self.lookup_field]}",
+            lambda: super(RestaurantViewSet, self).retrieve(request, *args, **kwargs),
+            lambda data: [data['restaurant_id']],
+        )
+
+    def _cached_response(self, request, endpoint, get_response, object_ids, depends_on_all=False, scopes=()):
+        """
+        Serves `get_response()` through the response cache. A miss returns the
+        view's own response, a hit rebuilds it from the cached data and the
+        headers the view set.
+        Returns:
+            Response: The response, with an X-Cache header if cacheable.
+        """
+        computed = []
+
+        def compute():
+            response = get_response()
+            computed.append(response)
+            if response.status_code != status.HTTP_200_OK:
+                return None
+            headers = {name: value for name, value in response.items() if name != 'Content-Type'}
+            return {'data': response.data, 'headers': headers}
+
+        entry, hit = restaurant_cache.get_or_set(
+            request, endpoint, compute, lambda entry: object_ids(entry['data']), depends_on_all, scopes,
+        )
+        if entry is None:
+            # Not cacheable (e.g. 404), respond without the cache.
+            return computed[0]
+        response = Response(entry['data'], headers=entry['headers']) if hit else computed[0]
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+            Change.objects.record([('restaurant', serializer.instance.pk, 'create')])
+        restaurant_cache.invalidate([serializer.instance.pk], membership=True)
+        transaction.on_commit(lambda: images.schedule_variants(serializer.instance))
+
+    def perform_update(self, serializer):
+        previous_image, previous_variants = serializer.instance.image.name, serializer.instance.image_variants
+        with transaction.atomic():
+            super().perform_update(serializer)
+            Change.objects.record([('restaurant', serializer.instance.pk, 'update')])
+        restaurant = serializer.instance
+        restaurant_cache.invalidate([restaurant.pk], membership=True)
+        if restaurant.image.name != previous_image:
+            if previous_variants:
+                Restaurant.objects.filter(pk=restaurant.pk).update(image_variants={})
+                restaurant.image_variants = {}
+                transaction.on_commit(lambda: images.delete_variants(previous_variants))
+            transaction.on_commit(lambda: images.schedule_variants(restaurant))
+
+    def perform_destroy(self, instance):
+        restaurant_id = instance.pk
+        with transaction.atomic():
+            review_ids = list(instance.reviews.values_list('pk', flat=True))
+            super().perform_destroy(instance)
+            # Reviews deleted by the cascade get tombstones too.
+            Change.objects.record(
+                [('review', pk, 'delete') for pk in review_ids] + [('restaurant', restaurant_id, 'delete')]
+            )
+        restaurant_cache.invalidate([restaurant_id], membership=True)
+        if instance.image_variants:
+            transaction.on_commit(lambda: images.delete_variants(instance.image_variants))
+
+    @action(detail=False, methods=['GET'])
+    def cache_stats(self, request):
+        """Hit/miss counters of the response cache in this process (admin only)."""
+        return Response(restaurant_cache.stats.as_dict())
+
+    @action(detail=False, methods=['GET'])
+    def nearby(self, request):
+        """
+        List the restaurants nearest to `lat`/`lng` within `radius` kilometers,
+        ordered by distance.
+        """
+        query = NearbyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        nearest = Restaurant.objects.nearby(params['lat'], params['lng'], params['radius'], params['limit'])
+        serializer = self.get_serializer([restaurant for restaurant, _ in nearest], many=True)
+        results = serializer.data
+        for item, (_, distance) in zip(results, nearest):
+            item['distance'] = round(distance, 3)
+        return Response(results)
+
+    @action(detail=True, methods=['GET'])
+    def similar(self, request, pk=None):
+        """
+        The restaurants most similar to this one by the ratings of people who
+        reviewed both, most similar first (see api/recommendations.py).
+        """
+        query = LimitQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        try:
+            restaurant_id = int(pk)
+        except ValueError:
+            raise NotFound()
+
+        def compute():
+            neighbours = list(
+                RestaurantSimilarity.objects.filter(restaurant_id=restaurant_id).select_related('similar')
+                .defer('similar__search_vector').order_by('-score', 'similar')[:query.validated_data['limit']]
+            )
+            if not neighbours and not Restaurant.objects.filter(pk=restaurant_id).exists():
+                return None
+            results = self.get_serializer([neighbour.similar for neighbour in neighbours], many=True).data
+            for item, neighbour in zip(results, neighbours):
+                item['similarity'] = round(neighbour.score, 4)
+            return results
+
+        data, hit = restaurant_cache.get_or_set(
+            request, f"similar:{restaurant_id}", compute,
+            lambda data: [restaurant_id, *(item['restaurant_id'] for item in data)], scopes=['similarity'],
+        )
+        if data is None:
+            raise NotFound("No Restaurant matches the given query.")
+        response = Response(data)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    @action(detail=True, methods=['GET'])
+    def trends(self, request, pk=None):
+        """
+        The restaurant's rating over time: review count, average rating, star
+        histogram and cumulative average rating of every day, week or month
+        with reviews, read from the rating rollups only.
+        """
+        query = TrendsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        granularity = params['granularity']
+        try:
+            restaurant_id = int(pk)
+        except ValueError:
+            raise NotFound()
+
+        def compute():
+            rollups = RatingRollup.objects.filter(restaurant_id=restaurant_id, granularity=granularity)
+            count = total = 0
+            if 'from' in params:
+                start = period_start(params['from'], granularity)
+                earlier = rollups.filter(period__lt=start).aggregate(count=Sum('review_count'), total=Sum('rating_sum'))
+                count, total = earlier['count'] or 0, earlier['total'] or 0
+                rollups = rollups.filter(period__gte=start)
+            if 'to' in params:
+                rollups = rollups.filter(period__lte=params['to'])
+            stars = [f'rating_count_{star}' for star in RATING_STARS]
+            buckets = list(rollups.filter(review_count__gt=0).order_by('period').values_list(
+                'period', 'review_count', 'rating_sum', *stars,
+            ))
+            if not buckets and not Restaurant.objects.filter(pk=restaurant_id).exists():
+                return None
+
+            results = []
+            for period, review_count, rating_sum, *histogram in buckets:
+                count, total = count + review_count, total + rating_sum
+                results.append({
+                    'period': period.isoformat(),
+                    'review_count': review_count,
+                    'average_rating': round(rating_sum / review_count, 2),
+                    'cumulative_rating': round(total / count, 2),
+                    'rating_distribution': dict(zip(RATING_STARS, histogram)),
+                })
+            return {'restaurant_id': restaurant_id, 'granularity': granularity, 'results': results}
+
+        data, hit = restaurant_cache.get_or_set(
+            request, f"trends:{restaurant_id}", compute, lambda data: [restaurant_id], scopes=['rollups'],
+        )
+        if data is None:
+            raise NotFound("No Restaurant matches the given query.")
+        response = Response(data)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    @action(detail=False, methods=['GET'])
+    def top(self, request):
+        """
+        List the best rated restaurants by Bayesian average, optionally only
+        those whose geohash starts with `area`.
+        """
+        query = TopQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        def compute():
+            queryset = self.get_queryset().filter(ranking__review_count__gt=0).annotate(score=F('ranking__score'))
+            if params.get('area'):
+                queryset = queryset.filter(ranking__area__startswith=params['area'])
+            restaurants = list(queryset.order_by('-score', 'pk')[:params['limit']])
+            results = self.get_serializer(restaurants, many=True).data
+            for rank, (item, restaurant) in enumerate(zip(results, restaurants), start=1):
+                item['rank'] = rank
+                item['score'] = round(restaurant.score, 4)
+            return results
+
+        data, hit = restaurant_cache.get_or_set(
+            request, 'top', compute, lambda data: [item['restaurant_id'] for item in data],
+            depends_on_all=True, scopes=['ranking'],
+        )
+        response = Response(data)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+class ReviewViewSet(SparseFieldsViewMixin, MultiGetMixin, ValuesListMixin, viewsets.ModelViewSet):
+    queryset = Review.objects.defer('search_vector').select_related('user')
     serializer_class = ReviewSerializer
 
     # Filter
     filterset_class = ReviewFilter
-    filter_backends = [filters.OrderingFilter, DjangoFilterBackend]
+    filter_backends = [filters.OrderingFilter, DjangoFilterBackend, FullTextSearchFilter]
     ordering_fields = ['rating', 'created_at']
 
     #Pagination
-    pagination_class = LimitOffsetPagination
-    pagination_class.default_limit = 25
-    pagination_class.max_limit = 100
+    pagination_class = ReviewPagination
+
+    # Export
+    export_columns = (
+        'review_id', 'restaurant_id', 'user_id', 'user__username', 'rating', 'review', 'created_at', 'updated_at',
+    )
+    export_chunk_size = 2000
+
+    # Most reviews accepted by one batch request
+    batch_max_size = 100
 
     def get_permissions(self):
         self.permission_classes = [AllowAny]
-        if self.request.method in ['POST', 'PATCH', 'DELETE']:
+        if self.action == 'batch':
+            self.permission_classes = [IsAuthenticated]
+        elif self.request.method in ['POST', 'PATCH', 'DELETE']:
             self.permission_classes = [IsOwnerOrAdmin]
+        elif self.action == 'export':
+            self.permission_classes = [IsAdminUser]
         return super().get_permissions()
+
+    @action(detail=False, methods=['GET'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Stream every review matching the filters as NDJSON (default) or CSV,
+        chosen with `?format=ndjson|csv` or the Accept header (admin only).
+        Rows are read in chunks, so memory use is flat for any result size.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        if not queryset.ordered:
+            queryset = queryset.order_by('review_id')
+        rows = queryset.values_list(*self.export_columns).iterator(chunk_size=self.export_chunk_size)
+        header = [column.replace('user__', 'user_') for column in self.export_columns]
+
+        if request.accepted_renderer.format == 'csv':
+            content = self._export_csv(header, rows)
+        else:
+            content = self._export_ndjson(header, rows)
+        response = StreamingHttpResponse(content, content_type=request.accepted_renderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="reviews.{request.accepted_renderer.format}"'
+        return response
+
+    def _export_chunks(self, rows):
+        chunk = []
+        for row in rows:
+            chunk.append(tuple(value.isoformat() if isinstance(value, datetime) else value for value in row))
+            if len(chunk) == self.export_chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _export_ndjson(self, header, rows):
+        for chunk in self._export_chunks(rows):
+            yield ''.join(json.dumps(dict(zip(header, row))) + '\n' for row in chunk)
+
+    def _export_csv(self, header, rows):
+        class Echo:
+            def write(self, value):
+                return value
+
+        writer = csv.writer(Echo())
+        yield writer.writerow(header)
+        for chunk in self._export_chunks(rows):
+            yield ''.join(writer.writerow(row) for row in chunk)
     
     def put(self, request, *args, **kwargs):
         """
@@ -107,24 +535,241 @@ class ReviewViewSet(viewsets.ModelViewSet):
         """
         raise MethodNotAllowed("PUT")
 
+    def get_serializer_class(self):
+        if self.action in ['create', 'batch']:
+            return ReviewCreateSerializer
+        return super().get_serializer_class()
+
     def create(self, request, *args, **kwargs):
         """
-        Override create method to automatically set the user and ensure restaurant exists.
+        Create a review by the current user. The restaurant aggregate update
+        runs first and doubles as the existence check, and the unique
+        constraint on (user, restaurant) rejects duplicates, so no lookups
+        precede the insert.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        restaurant_id = serializer.validated_data['restaurant_id']
+        with transaction.atomic():
+            if not Restaurant.objects.apply_rating_change(restaurant_id, serializer.validated_data['rating']):
+                raise NotFound("Restaurant does not exist.")
+            try:
+                with transaction.atomic():
+                    review = serializer.save(user=request.user)
+            except IntegrityError:
+                raise ValidationError("You have already reviewed this restaurant.")
+            RatingRollup.objects.apply_changes([(restaurant_id, review.created_at, review.rating, 1)])
+            Change.objects.record([('review', review.pk, 'create'), ('restaurant', restaurant_id, 'update')])
+            restaurant_cache.invalidate([restaurant_id], scopes=['ranking'])
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['POST'])
+    def batch(self, request):
+        """
+        Create up to `batch_max_size` reviews by the current user, each for a
+        different restaurant, in one transaction: one insert for the reviews
+        and one update for the restaurant aggregates. Nothing is saved if any
+        review is invalid.
+        """
+        serializer = self.get_serializer(
+            data=request.data, many=True, allow_empty=False, max_length=self.batch_max_size,
+        )
+        serializer.is_valid(raise_exception=True)
+        ratings = {review['restaurant_id']: review['rating'] for review in serializer.validated_data}
+        with transaction.atomic():
+            if Restaurant.objects.apply_ratings(ratings) != len(ratings):
+                existing = set(Restaurant.objects.filter(pk__in=ratings).values_list('pk', flat=True))
+                missing = sorted(set(ratings) - existing)
+                raise NotFound(f"Restaurants do not exist: {', '.join(map(str, missing))}.")
+            reviews = [Review(user=request.user, **review) for review in serializer.validated_data]
+            try:
+                with transaction.atomic():
+                    Review.objects.bulk_create(reviews)
+            except IntegrityError:
+                reviewed = Review.objects.filter(user=request.user, restaurant_id__in=ratings).values_list(
+                    'restaurant_id', flat=True
+                )
+                raise ValidationError(
+                    f"You have already reviewed these restaurants: {', '.join(map(str, sorted(reviewed)))}."
+                )
+            search.index_instances(Review, reviews)
+            RatingRollup.objects.apply_changes(
+                (review.restaurant_id, review.created_at, review.rating, 1) for review in reviews
+            )
+            Change.objects.record(
+                [('review', review.pk, 'create') for review in reviews]
+                + [('restaurant', restaurant_id, 'update') for restaurant_id in ratings]
+            )
+            restaurant_cache.invalidate(ratings, scopes=['ranking'])
+        serializer.instance = reviews
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def perform_update(self, serializer):
+        """
+        Save the review, move its rating in the restaurant aggregates and
+        rollups if the rating or restaurant changed, and log the change.
+        """
+        with transaction.atomic():
+            previous_restaurant_id, previous_rating = Review.objects.select_for_update().values_list(
+                'restaurant_id', 'rating'
+            ).get(pk=serializer.instance.pk)
+            try:
+                with transaction.atomic():
+                    review = serializer.save()
+            except IntegrityError:
+                raise ValidationError("You have already reviewed this restaurant.")
+            changes = [('review', review.pk, 'update')]
+            if (previous_restaurant_id, previous_rating) != (review.restaurant_id, review.rating):
+                Restaurant.objects.apply_rating_change(previous_restaurant_id, previous_rating, delta=-1)
+                Restaurant.objects.apply_rating_change(review.restaurant_id, review.rating)
+                RatingRollup.objects.apply_changes([
+                    (previous_restaurant_id, review.created_at, previous_rating, -1),
+                    (review.restaurant_id, review.created_at, review.rating, 1),
+                ])
+                restaurant_cache.invalidate({previous_restaurant_id, review.restaurant_id}, scopes=['ranking'])
+                changes += [('restaurant', pk, 'update') for pk in (previous_restaurant_id, review.restaurant_id)]
+            Change.objects.record(changes)
+
+    def perform_destroy(self, instance):
         """
-        
-        restaurant_id = request.data.get("restaurant")
+        Delete the review, remove its rating from the restaurant aggregates
+        and rollups, and leave a tombstone in the change log.
+        """
+        with transaction.atomic():
+            deleted, _ = Review.objects.filter(pk=instance.pk).delete()
+            if deleted:
+                Restaurant.objects.apply_rating_change(instance.restaurant_id, instance.rating, delta=-1)
+                RatingRollup.objects.apply_changes([(instance.restaurant_id, instance.created_at, instance.rating, -1)])
+                Change.objects.record([
+                    ('review', instance.pk, 'delete'), ('restaurant', instance.restaurant_id, 'update'),
+                ])
+                search.remove_instances(Review, [instance.pk])
+                restaurant_cache.invalidate([instance.restaurant_id], scopes=['ranking'])
+
+class RestaurantReviewViewSet(SparseFieldsViewMixin, ValuesListMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    The reviews of one restaurant at /api/restaurants/{id}/reviews/, newest
+    first. Pages read the (restaurant, created_at, review_id) index, and the
+    restaurant row read up front answers 404s, the count of unfiltered pages
+    and the optional `?summary=true` rating summary, so a page costs two
+    queries.
+    """
+    queryset = Review.objects.defer('search_vector').select_related('user')
+    serializer_class = ReviewSerializer
+
+    # Filter
+    filterset_class = RestaurantReviewFilter
+    filter_backends = [filters.OrderingFilter, DjangoFilterBackend]
+    ordering_fields = ['rating', 'created_at']
+    ordering = ['-created_at', '-review_id']
+
+    # Pagination
+    pagination_class = ReviewPagination
+
+    # Count of unfiltered pages, set by list() for the pagination
+    known_count = None
+    summary_fields = ('review_count', 'rating_sum', *(f'rating_count_{star}' for star in RATING_STARS))
 
-        # Ensure restaurant exists
+    def get_restaurant_id(self):
         try:
-            restaurant = Restaurant.objects.get(restaurant_id=restaurant_id)
-        except Restaurant.DoesNotExist:
-            raise NotFound("Restaurant does not exist.")
-        # Check if the user already reviewed this restaurant
-        if Review.objects.filter(user=request.user, restaurant=restaurant).exists():
-            raise ValidationError("You have already reviewed this restaurant.")
-
-        # Save the review
-        serializer = self.get_serializer(data=request.data)
+            return int(self.kwargs['restaurant_pk'])
+        except ValueError:
+            raise NotFound("No Restaurant matches the given query.")
+
+    def get_queryset(self):
+        return super().get_queryset().filter(restaurant_id=self.get_restaurant_id())
+
+    def get_restaurant(self, summary=False):
+        fields = self.summary_fields if summary else ('review_count',)
+        return get_object_or_404(Restaurant.objects.only(*fields), pk=self.get_restaurant_id())
+
+    def list(self, request, *args, **kwargs):
+        query = RestaurantReviewsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        summary = query.validated_data['summary']
+        restaurant = self.get_restaurant(summary)
+        if not any(name in request.query_params for name in RestaurantReviewFilter.get_filters()):
+            self.known_count = restaurant.review_count
+        response = super().list(request, *args, **kwargs)
+        if summary:
+            response.data['summary'] = {
+                'review_count': restaurant.review_count,
+                'average_rating': restaurant.total_rating,
+                'rating_distribution': restaurant.rating_distribution,
+            }
+        return response
+
+class ChangeFeedView(APIView):
+    """
+    Restaurant and review changes after the `since` cursor, oldest first, so
+    offline clients fetch only what changed (e.g. with `?ids=`) instead of
+    listing everything again. Entries are served once they are
+    CHANGE_FEED_SETTLE_SECONDS old, so concurrent writes can't commit
+    behind a cursor a client already passed.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = ChangesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        since = query.validated_data['since']
+        changes, has_more = Change.objects.after(
+            since, query.validated_data['limit'], getattr(settings, 'CHANGE_FEED_SETTLE_SECONDS', 2),
+        )
+        return Response({
+            'results': ChangeSerializer(changes, many=True).data,
+            'next_cursor': changes[-1].change_id if changes else since,
+            'has_more': has_more,
+        })
+
+class BatchView(APIView):
+    """
+    Runs several read-only API requests in one call. The sub-requests share
+    the caller's authentication, decoded once, and the request's database
+    connection, and read from one replica when replicas are configured.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(user=request.user, restaurant=restaurant)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        user, auth = request.user, request.auth
+        with db_routing.safe_reads():
+            responses = [
+                self.run(request, item['path'], user, auth) for item in serializer.validated_data['requests']
+            ]
+        return Response({'responses': responses})
+
+    def run(self, request, path, user, auth):
+        """
+        Dispatches one GET sub-request to its API view.
+        Returns:
+            dict: The status code and body of the sub-response.
+        """
+        path, _, query = path.partition('?')
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return {'status': status.HTTP_404_NOT_FOUND, 'body': {'detail': "Not found."}}
+        view_class = getattr(match.func, 'cls', None)
+        if view_class is None or not issubclass(view_class, APIView) or issubclass(view_class, BatchView):
+            return {'status': status.HTTP_400_BAD_REQUEST, 'body': {'detail': "Only API endpoints can be batched."}}
+
+        sub_request = HttpRequest()
+        sub_request.META = {
+            key: value for key, value in request.META.items() if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH')
+        }
+        sub_request.META.update(REQUEST_METHOD='GET', PATH_INFO=path, QUERY_STRING=query)
+        sub_request.method = 'GET'
+        sub_request.path = sub_request.path_info = path
+        sub_request.GET = QueryDict(query)
+        sub_request.resolver_match = match
+        if user.is_authenticated:
+            # DRF skips the authentication classes for forced credentials.
+            sub_request._force_auth_user = user
+            sub_request._force_auth_token = auth
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        if not isinstance(response, Response):
+            # Streamed exports have no data to embed.
+            return {'status': status.HTTP_400_BAD_REQUEST, 'body': {'detail': "This endpoint can't be batched."}}
+        return {'status': response.status_code, 'body': response.data}
@@ -0,0 +1,60 @@
+"""
+Shared bootstrap for the benchmark scripts.
+
+Benchmarks never touch the database configured in `.env`: they point Django at
+a throwaway SQLite file (or the one given with --db) and migrate it first.
+"""
+import os
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(db_path=None):
+    """
+    Configures Django against a benchmark SQLite database and migrates it.
+    Returns:
+        str: Path of the database file.
+    """
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='restaurant-review-bench-'), 'bench.sqlite3')
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ['DB_ENGINE'] = 'django.db.backends.sqlite3'
+    os.environ['DB_NAME'] = db_path
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'restaurant_review.settings')
+
+    import django
+    from django.core.management import call_command
+    from django.test.utils import setup_test_environment
+
+    django.setup()
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    return db_path
+
+
+def percentiles(samples):
+    """
+    Summarises latency samples given in seconds.
+    Returns:
+        dict: p50/p95/p99 and mean in milliseconds.
+    """
+    ordered = sorted(samples)
+    quantiles = statistics.quantiles(ordered, n=100, method='inclusive') if len(ordered) > 1 else ordered * 99
+    return {
+        'p50': quantiles[49] * 1000,
+        'p95': quantiles[94] * 1000,
+        'p99': quantiles[98] * 1000,
+        'mean': statistics.fmean(ordered) * 1000,
+    }
+
+
+def print_table(title, rows):
+    """Prints latency summaries as an aligned table."""
+    print(f"\n{title}")
+    print(f"{'case':<32}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for name, stats in rows:
+        print(f"{name:<32}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}{stats['mean']:>10.2f}")
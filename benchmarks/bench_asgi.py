@@ -0,0 +1,176 @@
+"""
+Compares the synchronous DRF endpoints served by gunicorn (WSGI) with the
+async endpoints under /api/async/ served by uvicorn (ASGI) at high
+concurrency. The DRF endpoints under uvicorn are measured too, they run in
+the ASGI thread pool.
+
+    pip install gunicorn uvicorn
+    python benchmarks/bench_asgi.py --concurrency 200 --duration 15
+
+Each deployment is started as a subprocess against the same seeded SQLite
+file, then a stdlib asyncio load generator keeps `--concurrency` keep-alive
+connections busy for `--duration` seconds per endpoint and reports
+requests/sec and latency percentiles. The response cache is disabled so
+every request reaches the database.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+from _setup import BASE_DIR, percentiles, setup_django
+
+# label: (server, URL prefix)
+DEPLOYMENTS = {
+    'wsgi': ('wsgi', '/api/'),
+    'asgi drf': ('asgi', '/api/'),
+    'asgi async': ('asgi', '/api/async/'),
+}
+ENDPOINTS = {
+    'restaurants': 'restaurants/?limit=25&offset={offset}',
+    'reviews': 'reviews/?rating__gte=3&limit=25&offset={offset}',
+    'review detail': 'reviews/{review_id}/',
+}
+
+
+def seed(restaurant_count, review_count, rng):
+    from django.utils import timezone
+
+    from api.imports import preserve_timestamps
+    from api.models import Restaurant, Review, User
+
+    restaurants = Restaurant.objects.bulk_create(
+        Restaurant(name=f"Restaurant {i}", image='restaurant_images/placeholder.jpg', description='', address='')
+        for i in range(restaurant_count)
+    )
+    users = User.objects.bulk_create(
+        User(username=f"user{i}", email=f"user{i}@example.com", first_name='User', password='!')
+        for i in range(review_count // restaurant_count + 1)
+    )
+    now = timezone.now()
+    with preserve_timestamps(Review, 'created_at', 'updated_at'):
+        Review.objects.bulk_create(
+            (
+                Review(
+                    user=users[i // restaurant_count], restaurant=restaurants[i % restaurant_count],
+                    rating=rng.randint(1, 5), review='', created_at=now - timedelta(seconds=i), updated_at=now,
+                )
+                for i in range(review_count)
+            ),
+            batch_size=5000,
+        )
+    Restaurant.objects.rebuild_rating_aggregates()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, port, workers, env):
+    if kind == 'wsgi':
+        command = [
+            sys.executable, '-m', 'gunicorn', 'restaurant_review.wsgi:application', '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers), '--threads', '4', '--log-level', 'warning',
+        ]
+    else:
+        command = [
+            sys.executable, '-m', 'uvicorn', 'restaurant_review.asgi:application', '--host', '127.0.0.1',
+            '--port', str(port), '--workers', str(workers), '--log-level', 'warning', '--no-access-log',
+        ]
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{kind} server did not start")
+
+
+async def client(port, paths, deadline, samples, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        while time.monotonic() < deadline:
+            path = random.choice(paths)
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: application/json\r\n\r\n".encode())
+            await writer.drain()
+            status_line = await reader.readline()
+            length, close = 0, False
+            while (line := await reader.readline()) not in (b'\r\n', b''):
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+                elif name.lower() == 'connection' and value.strip().lower() == 'close':
+                    close = True
+            await reader.readexactly(length)
+            samples.append(time.perf_counter() - started)
+            if b' 200 ' not in status_line:
+                errors.append(status_line)
+            if close:
+                writer.close()
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    except (ConnectionError, asyncio.IncompleteReadError) as exc:
+        errors.append(repr(exc))
+    finally:
+        writer.close()
+
+
+async def load(port, paths, concurrency, duration):
+    samples, errors = [], []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(client(port, paths, deadline, samples, errors) for _ in range(concurrency)))
+    return samples, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--restaurants', type=int, default=1000)
+    parser.add_argument('--reviews', type=int, default=100000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--db', help="Reuse an already seeded benchmark database.")
+    args = parser.parse_args()
+
+    seeded = args.db and os.path.exists(args.db)
+    db_path = setup_django(args.db)
+    if not seeded:
+        print(f"Seeding {args.restaurants} restaurants and {args.reviews} reviews into {db_path}...")
+        seed(args.restaurants, args.reviews, random.Random(42))
+
+    from api.models import Review
+
+    review_ids = list(Review.objects.values_list('pk', flat=True)[:1000])
+    env = dict(os.environ, RESPONSE_CACHE_ENABLED='False', IMAGE_VARIANT_WORKERS='0')
+
+    print(f"\n{'deployment':<12}{'endpoint':<16}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for label, (kind, prefix) in DEPLOYMENTS.items():
+        port = free_port()
+        server = start_server(kind, port, args.workers, env)
+        try:
+            for name, template in ENDPOINTS.items():
+                paths = [
+                    prefix + template.format(offset=offset, review_id=review_id)
+                    for offset, review_id in zip(range(0, 2500, 25), review_ids)
+                ]
+                samples, errors = asyncio.run(load(port, paths, args.concurrency, args.duration))
+                stats = percentiles(samples) if samples else {'p50': 0, 'p99': 0}
+                print(f"{label:<12}{name:<16}{len(samples) / args.duration:>10.1f}"
+                      f"{stats['p50']:>10.2f}{stats['p99']:>10.2f}{len(errors):>8}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
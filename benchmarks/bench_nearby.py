@@ -0,0 +1,105 @@
+"""
+Benchmarks GET /api/restaurants/nearby/ against a large restaurant table.
+
+    python benchmarks/bench_nearby.py --restaurants 1000000
+
+Restaurants are clustered around a few city centres. Each query is run through
+the geohash-indexed endpoint and compared with a naive full-table scan.
+"""
+import argparse
+import random
+import time
+
+from _setup import percentiles, print_table, setup_django
+
+CITIES = [
+    (-6.2088, 106.8456),   # Jakarta
+    (1.3521, 103.8198),    # Singapore
+    (40.7128, -74.0060),   # New York
+    (51.5074, -0.1278),    # London
+    (35.6762, 139.6503),   # Tokyo
+]
+
+
+def seed(count, rng):
+    from api import geo
+    from api.models import Restaurant
+
+    batch = []
+    for i in range(count):
+        lat, lng = rng.choice(CITIES)
+        lat, lng = rng.gauss(lat, 0.15), rng.gauss(lng, 0.15)
+        batch.append(Restaurant(
+            name=f"Restaurant {i}", image='restaurant_images/placeholder.jpg',
+            description='', address='', latitude=lat, longitude=lng,
+            geohash=geo.encode(lat, lng),
+        ))
+        if len(batch) == 10000:
+            Restaurant.objects.bulk_create(batch)
+            batch = []
+    Restaurant.objects.bulk_create(batch)
+
+
+def naive_nearby(lat, lng, radius, limit):
+    from api import geo
+    from api.models import Restaurant
+
+    rows = Restaurant.objects.values_list('pk', 'latitude', 'longitude').iterator()
+    distances = ((geo.haversine_km(lat, lng, a, b), pk) for pk, a, b in rows)
+    return sorted(d for d in distances if d[0] <= radius)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--restaurants', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--naive-queries', type=int, default=5)
+    parser.add_argument('--radius', type=float, default=2.0, help="Search radius in kilometers.")
+    parser.add_argument('--limit', type=int, default=25)
+    parser.add_argument('--db', help="Reuse an already seeded SQLite file.")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from rest_framework.test import APIRequestFactory
+
+    from api.models import Restaurant
+    from api.views import RestaurantViewSet
+
+    rng = random.Random(args.seed)
+    existing = Restaurant.objects.count()
+    if existing < args.restaurants:
+        started = time.perf_counter()
+        seed(args.restaurants - existing, rng)
+        print(f"Seeded {args.restaurants - existing} restaurants in {time.perf_counter() - started:.1f}s")
+
+    factory = APIRequestFactory()
+    view = RestaurantViewSet.as_view({'get': 'nearby'})
+    points = [
+        (rng.gauss(lat, 0.1), rng.gauss(lng, 0.1))
+        for lat, lng in (rng.choice(CITIES) for _ in range(args.queries))
+    ]
+
+    indexed = []
+    for lat, lng in points:
+        request = factory.get('/api/restaurants/nearby/', {'lat': lat, 'lng': lng, 'radius': args.radius, 'limit': args.limit})
+        started = time.perf_counter()
+        response = view(request)
+        response.render()
+        indexed.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.data
+
+    naive = []
+    for lat, lng in points[:args.naive_queries]:
+        started = time.perf_counter()
+        naive_nearby(lat, lng, args.radius, args.limit)
+        naive.append(time.perf_counter() - started)
+
+    print_table(
+        f"nearby search, {args.restaurants} restaurants, radius {args.radius} km, limit {args.limit}",
+        [('geohash endpoint', percentiles(indexed)), ('full scan (no index)', percentiles(naive))],
+    )
+
+
+if __name__ == '__main__':
+    main()
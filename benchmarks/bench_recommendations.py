@@ -0,0 +1,120 @@
+"""
+Benchmarks the item-item recommendation build (api/recommendations.py).
+
+    python benchmarks/bench_recommendations.py --reviews 10000000
+    python benchmarks/bench_recommendations.py --reviews 10000000 --db-reviews 1000000
+
+Synthetic reviews are drawn in memory with Zipf distributed restaurant
+popularity and user activity, and the similarity computation is timed for a
+full build and for an incremental build of the restaurants reviewed since.
+With --db-reviews, a SQLite database is also seeded and the whole
+`build_recommendations` job (load, compute and store) is timed against it,
+followed by the /similar/ endpoint the stored neighbours serve.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from _setup import percentiles, print_table, setup_django
+
+
+def synthetic_reviews(reviews, users, restaurants, rng):
+    """
+    Draws unique (user, restaurant) pairs with ratings leaning positive.
+    Returns:
+        tuple: Arrays of users, restaurants and ratings.
+    """
+    user_ids = np.minimum(rng.zipf(1.3, reviews * 2), users) - 1
+    user_ids = (user_ids + rng.integers(0, users, reviews * 2)) % users
+    restaurant_ids = np.minimum(rng.zipf(1.2, reviews * 2), restaurants) - 1
+    restaurant_ids = (restaurant_ids * 7919) % restaurants
+    pairs = np.unique(user_ids * restaurants + restaurant_ids)
+    pairs = rng.permutation(pairs)[:reviews]
+    ratings = rng.choice(np.arange(1, 6), len(pairs), p=(0.08, 0.08, 0.17, 0.33, 0.34))
+    return pairs // restaurants, pairs % restaurants, ratings
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def bench_compute(args, rng):
+    from api import recommendations
+
+    (users, items, ratings), draw_time = timed(synthetic_reviews, args.reviews, args.users, args.restaurants, rng)
+    print(f"Drew {len(ratings)} reviews of {len(np.unique(items))} restaurants by "
+          f"{len(np.unique(users))} users in {draw_time:.1f}s")
+
+    result, full_time = timed(recommendations.compute_neighbours, users, items, ratings, block_size=args.block_size)
+    print(f"Full build: {len(result[0])} neighbours in {full_time:.1f}s")
+
+    # Restaurants touched by the newest 0.1% of reviews.
+    targets = np.unique(items[-max(len(items) // 1000, 1):])
+    result, incremental_time = timed(
+        recommendations.compute_neighbours, users, items, ratings, targets, block_size=args.block_size,
+    )
+    print(f"Incremental build of {len(targets)} restaurants: {len(result[0])} neighbours in {incremental_time:.1f}s")
+
+
+def bench_database(args, rng):
+    from django.utils import timezone
+    from rest_framework.test import APIRequestFactory
+
+    from api import recommendations
+    from api.models import Restaurant, RestaurantSimilarity
+    from api.seed import SeedSpec, seed
+    from api.views import RestaurantViewSet
+
+    if not Restaurant.objects.exists():
+        spec = SeedSpec(
+            users=max(args.db_reviews // 20, 1), restaurants=max(args.db_reviews // 200, 1), reviews=args.db_reviews,
+            end=timezone.now(), index_search=False,
+        )
+        _, seed_time = timed(seed, spec)
+        print(f"Seeded {args.db_reviews} reviews in {seed_time:.1f}s")
+
+    stats, build_time = timed(recommendations.build, block_size=args.block_size)
+    print(f"build_recommendations over {stats['reviews']} reviews: {stats['rows']} neighbours in {build_time:.1f}s "
+          f"(load {stats['load']:.1f}s, compute {stats['compute']:.1f}s, store {stats['store']:.1f}s)")
+
+    factory = APIRequestFactory()
+    view = RestaurantViewSet.as_view({'get': 'similar'})
+    ids = list(RestaurantSimilarity.objects.values_list('restaurant', flat=True).distinct()[:1000])
+    samples = []
+    for pk in rng.choice(ids, args.queries):
+        request = factory.get(f'/api/restaurants/{pk}/similar/')
+        started = time.perf_counter()
+        response = view(request, pk=str(pk))
+        response.render()
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.data
+    print_table("similar restaurants endpoint (response cache disabled)", [('/similar/', percentiles(samples))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reviews', type=int, default=10_000_000)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--restaurants', type=int, default=50_000)
+    parser.add_argument('--block-size', type=int, default=512)
+    parser.add_argument('--db-reviews', type=int, default=0, help="Also time the job against a seeded database.")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--db', help="Reuse an already seeded SQLite file.")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from django.test.utils import override_settings
+
+    rng = np.random.default_rng(args.seed)
+    bench_compute(args, rng)
+    if args.db_reviews:
+        with override_settings(RESPONSE_CACHE_ENABLED=False, ALLOWED_HOSTS=['*']):
+            bench_database(args, rng)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmarks rendering API pages with DRF's JSONRenderer, the orjson renderer
+and the MessagePack renderer.
+
+    python benchmarks/bench_renderers.py --limit 25 --limit 100
+
+Each page is fetched once through the viewset, then only the renderer is
+timed on its response data, so the numbers are the encoding cost alone.
+The decode time is the matching client side parse with the standard
+library json module or msgpack.
+"""
+import argparse
+import json
+import time
+
+from _setup import percentiles, setup_django
+
+PAGES = ('/api/reviews/', '/api/restaurants/')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reviews', type=int, default=20_000)
+    parser.add_argument('--limit', type=int, action='append', help="Page sizes, at most 100 (default: 25 and 100).")
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--db', help="Reuse an already seeded SQLite file.")
+    args = parser.parse_args()
+    limits = args.limit or [25, 100]
+
+    setup_django(args.db)
+    import msgpack
+    from django.test.utils import override_settings
+    from django.utils import timezone
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIClient
+
+    from api.models import Review
+    from api.renderers import MessagePackRenderer, ORJSONRenderer
+    from api.seed import SeedSpec, seed
+
+    if not Review.objects.exists():
+        started = time.perf_counter()
+        seed(SeedSpec(
+            users=args.reviews // 10, restaurants=max(args.reviews // 20, 100), reviews=args.reviews,
+            end=timezone.now(), index_search=False,
+        ))
+        print(f"Seeded {args.reviews} reviews in {time.perf_counter() - started:.1f}s")
+
+    renderers = [
+        ('DRF JSONRenderer', JSONRenderer(), json.loads),
+        ('ORJSONRenderer', ORJSONRenderer(), json.loads),
+        ('MessagePackRenderer', MessagePackRenderer(), lambda content: msgpack.unpackb(content, strict_map_key=False)),
+    ]
+    client = APIClient()
+
+    print(f"\n{'page':<36}{'renderer':<22}{'p50 ms':>9}{'p95 ms':>9}{'decode ms':>11}{'bytes':>10}")
+    for path in PAGES:
+        for limit in limits:
+            with override_settings(RESPONSE_CACHE_ENABLED=False, ALLOWED_HOSTS=['*']):
+                data = client.get(path, {'limit': limit}).data
+            for name, renderer, decode in renderers:
+                encode_samples, decode_samples = [], []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    content = renderer.render(data, renderer.media_type, {})
+                    encode_samples.append(time.perf_counter() - started)
+                    started = time.perf_counter()
+                    decode(content)
+                    decode_samples.append(time.perf_counter() - started)
+                encode, decoded = percentiles(encode_samples), percentiles(decode_samples)
+                print(f"{f'{path}?limit={limit}':<36}{name:<22}{encode['p50']:>9.3f}{encode['p95']:>9.3f}"
+                      f"{decoded['p50']:>11.3f}{len(content):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmarks deep paging through GET /api/reviews/ with limit/offset versus
+keyset (cursor) pagination.
+
+    python benchmarks/bench_review_pagination.py --reviews 500000
+
+Only the pagination step (page query plus COUNT(*) for limit/offset) is
+timed, serialization is the same for both modes. Offset pages get slower the
+deeper they are; cursor pages should stay flat.
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from _setup import percentiles, print_table, setup_django
+
+
+def seed(count, rng):
+    from django.utils import timezone
+
+    from api.models import Restaurant, Review, User
+
+    restaurants = Restaurant.objects.bulk_create(
+        Restaurant(name=f"Restaurant {i}", image='restaurant_images/placeholder.jpg', description='', address='')
+        for i in range(100)
+    )
+    users = User.objects.bulk_create(
+        User(username=f"user{i}", email=f"user{i}@example.com", first_name='User', password='!')
+        for i in range(count // len(restaurants) + 1)
+    )
+    created_at = Review._meta.get_field('created_at')
+    created_at.auto_now_add = False
+    now = timezone.now()
+    try:
+        batch = []
+        for i in range(count):
+            batch.append(Review(
+                user=users[i // len(restaurants)], restaurant=restaurants[i % len(restaurants)],
+                rating=rng.randint(1, 5), review='', created_at=now - timedelta(seconds=i),
+            ))
+            if len(batch) == 10000:
+                Review.objects.bulk_create(batch)
+                batch = []
+        Review.objects.bulk_create(batch)
+    finally:
+        created_at.auto_now_add = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reviews', type=int, default=500_000)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--db', help="Reuse an already seeded SQLite file.")
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from api.models import Review
+    from api.pagination import ReviewPagination
+
+    if not Review.objects.exists():
+        started = time.perf_counter()
+        seed(args.reviews, random.Random(42))
+        print(f"Seeded {args.reviews} reviews in {time.perf_counter() - started:.1f}s")
+
+    factory = APIRequestFactory()
+
+    def timed(url):
+        samples = []
+        for _ in range(args.repeat):
+            request = Request(factory.get(url))
+            queryset = Review.objects.order_by('-created_at')
+            started = time.perf_counter()
+            page = ReviewPagination().paginate_queryset(queryset, request)
+            samples.append(time.perf_counter() - started)
+            assert len(page) == args.limit
+        return percentiles(samples)
+
+    rows = []
+    for depth in (0, args.reviews // 10, args.reviews // 2, args.reviews - args.limit):
+        stats = timed(f'/api/reviews/?ordering=-created_at&limit={args.limit}&offset={depth}')
+        rows.append((f'offset={depth}', stats))
+
+        # The cursor of the row just before `depth`.
+        anchor = Review.objects.order_by('-created_at', '-review_id')[max(depth - 1, 0)]
+        cursor_url = f'/api/reviews/?ordering=-created_at&limit={args.limit}&cursor='
+        if depth:
+            paginator = ReviewPagination.cursor_pagination_class()
+            paginator.request = factory.get(cursor_url)
+            paginator.field, paginator.pk_name = 'created_at', 'review_id'
+            cursor_url = paginator.encode_cursor(anchor, backwards=False)
+        stats = timed(cursor_url)
+        rows.append((f'cursor at row {depth}', stats))
+
+    print_table(f"/api/reviews/ paging, {args.reviews} reviews, limit {args.limit}", rows)
+
+
+if __name__ == '__main__':
+    main()
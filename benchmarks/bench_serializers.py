@@ -0,0 +1,100 @@
+"""
+Benchmarks the list endpoints with DRF's per-field serializers against the
+values() fast path (FAST_LIST_SERIALIZERS).
+
+    python benchmarks/bench_serializers.py --reviews 100000
+
+For every page the fast and slow responses are first checked to be byte for
+byte identical. Then whole requests are timed in each mode, and separately
+the serialization alone: model instances through the serializer versus
+values() rows through represent_values(), both already fetched.
+"""
+import argparse
+import time
+
+from _setup import percentiles, setup_django
+
+PAGES = (
+    '/api/reviews/?limit=100',
+    '/api/reviews/?limit=100&expand=restaurant',
+    '/api/restaurants/?limit=100',
+    '/api/restaurants/{restaurant}/reviews/?limit=100',
+)
+
+
+def rows_per_second(samples, rows):
+    return rows / percentiles(samples)['p50'] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reviews', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--db', help="Reuse an already seeded SQLite file.")
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from django.test.utils import override_settings
+    from django.utils import timezone
+    from rest_framework.request import Request
+    from rest_framework.test import APIClient, APIRequestFactory
+
+    from api.models import Restaurant, Review
+    from api.seed import SeedSpec, seed
+    from api.serializers import RestaurantSerializer, ReviewSerializer
+
+    if not Review.objects.exists():
+        started = time.perf_counter()
+        seed(SeedSpec(
+            users=args.reviews // 10, restaurants=max(args.reviews // 20, 100), reviews=args.reviews,
+            end=timezone.now(), index_search=False,
+        ))
+        print(f"Seeded {args.reviews} reviews in {time.perf_counter() - started:.1f}s")
+    restaurant = Restaurant.objects.order_by('-review_count').values_list('pk', flat=True).first()
+    client = APIClient()
+
+    print(f"\n{'request':<52}{'DRF rows/s':>12}{'values() rows/s':>17}{'speedup':>9}")
+    with override_settings(RESPONSE_CACHE_ENABLED=False, ALLOWED_HOSTS=['*']):
+        for page in PAGES:
+            url = page.format(restaurant=restaurant)
+            fast = client.get(url)
+            with override_settings(FAST_LIST_SERIALIZERS=False):
+                slow = client.get(url)
+            assert fast.content == slow.content, f"{url} differs between the two paths"
+            rows = len(fast.data['results'])
+
+            results = []
+            for enabled in (False, True):
+                samples = []
+                with override_settings(FAST_LIST_SERIALIZERS=enabled):
+                    for _ in range(args.repeat):
+                        started = time.perf_counter()
+                        client.get(url).render()
+                        samples.append(time.perf_counter() - started)
+                results.append(rows_per_second(samples, rows))
+            print(f"{url:<52}{results[0]:>12.0f}{results[1]:>17.0f}{results[1] / results[0]:>8.1f}x")
+
+        print(f"\n{'serialization only':<52}{'DRF rows/s':>12}{'values() rows/s':>17}{'speedup':>9}")
+        request = Request(APIRequestFactory().get('/api/reviews/'))
+        cases = [
+            ('ReviewSerializer', ReviewSerializer, Review.objects.select_related('user')),
+            ('RestaurantSerializer', RestaurantSerializer, Restaurant.objects.defer('search_vector')),
+        ]
+        for name, serializer_class, queryset in cases:
+            serializer = serializer_class(context={'request': request})
+            instances = list(queryset.order_by('pk')[:1000])
+            values = list(queryset.order_by('pk').values(*serializer.values_columns())[:1000])
+            slow_samples, fast_samples = [], []
+            for _ in range(max(args.repeat // 10, 5)):
+                started = time.perf_counter()
+                serializer_class(instances, many=True, context={'request': request}).data
+                slow_samples.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                serializer.represent_values(values)
+                fast_samples.append(time.perf_counter() - started)
+            slow_rate, fast_rate = rows_per_second(slow_samples, len(instances)), rows_per_second(fast_samples, len(values))
+            print(f"{name:<52}{slow_rate:>12.0f}{fast_rate:>17.0f}{fast_rate / slow_rate:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
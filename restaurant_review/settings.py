@@ -35,6 +35,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.PerformanceMetricsMiddleware",
+    "api.middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -68,17 +70,78 @@ WSGI_APPLICATION = "restaurant_review.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before
+# reuse. Under ASGI set DB_CONN_MAX_AGE = "0"; with PostgreSQL and psycopg 3,
+# DB_POOL = "True" uses a connection pool instead.
+DB_CONNECTION = {
+    "ENGINE": os.getenv("DB_ENGINE"),
+    "NAME": os.getenv("DB_NAME"),
+    "USER": os.getenv("DB_USER"),
+    "PASSWORD": os.getenv("DB_PASSWORD"),
+    "HOST": os.getenv("DB_HOST"),
+    "PORT": os.getenv("DB_PORT"),
+    "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)),
+    "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True",
+}
+# The migration history has an unbounded CharField that Django's SQLite
+# backend can't create, restaurant_review/sqlite3 adds support for it.
+if DB_CONNECTION["ENGINE"] == "django.db.backends.sqlite3":
+    DB_CONNECTION["ENGINE"] = "restaurant_review.sqlite3"
+if os.getenv("DB_POOL", "False") == "True":
+    DB_CONNECTION["CONN_MAX_AGE"] = 0
+    DB_CONNECTION["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+            "timeout": int(os.getenv("DB_POOL_TIMEOUT", 10)),
+        },
+    }
+
 DATABASES = {
+    "default": DB_CONNECTION,
+}
+
+# Read replicas, as comma-separated hosts (host or host:port) and/or database
+# names (e.g. SQLite files); missing values are taken from the primary.
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+DB_REPLICA_NAMES = [name.strip() for name in os.getenv("DB_REPLICA_NAMES", "").split(",") if name.strip()]
+DATABASE_REPLICAS = []
+for index in range(max(len(DB_REPLICA_HOSTS), len(DB_REPLICA_NAMES))):
+    replica = {**DB_CONNECTION, "TEST": {"MIRROR": "default"}}
+    if index < len(DB_REPLICA_HOSTS):
+        host, _, port = DB_REPLICA_HOSTS[index].partition(":")
+        replica["HOST"], replica["PORT"] = host, port or DB_CONNECTION["PORT"]
+    if index < len(DB_REPLICA_NAMES):
+        replica["NAME"] = DB_REPLICA_NAMES[index]
+    DATABASES[f"replica{index + 1}"] = replica
+    DATABASE_REPLICAS.append(f"replica{index + 1}")
+
+DATABASE_ROUTERS = ["api.db_routing.PrimaryReplicaRouter"]
+
+# Seconds a user reads from the primary after writing, so they see their own writes.
+DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# The locmem backend evicts least recently used entries once MAX_ENTRIES is reached.
+
+CACHES = {
     "default": {
-        "ENGINE": os.getenv("DB_ENGINE"),
-        "NAME": os.getenv("DB_NAME"),
-        "USER": os.getenv("DB_USER"),
-        "PASSWORD": os.getenv("DB_PASSWORD"),
-        "HOST": os.getenv("DB_HOST"),
-        "PORT": os.getenv("DB_PORT"),
-    }
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "api_responses": {
+        "BACKEND": os.getenv("RESPONSE_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("RESPONSE_CACHE_LOCATION", "api-responses"),
+        "TIMEOUT": int(os.getenv("RESPONSE_CACHE_TTL", 300)),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 5000)),
+        },
+    },
 }
 
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "True") == "True"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -125,9 +188,21 @@ AUTH_USER_MODEL = 'api.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    # JSON through orjson, MessagePack when the client asks for it.
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.ORJSONParser',
+        'api.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 from datetime import timedelta
@@ -139,5 +214,30 @@ SIMPLE_JWT = {
 
 }
 
+# Seconds an authenticated user's state is cached between requests.
+JWT_USER_CACHE_TTL = int(os.getenv("JWT_USER_CACHE_TTL", 60))
+
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Server-Timing headers and Prometheus histograms at /metrics. When METRICS_TOKEN
+# is set, /metrics requires it as a bearer token.
+PERFORMANCE_METRICS_ENABLED = os.getenv("PERFORMANCE_METRICS_ENABLED", "False") == "True"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Worker processes that resize uploaded restaurant images, 0 resizes inline.
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", 2))
+# Bayesian ranking of /api/restaurants/top/: each restaurant's mean rating is
+# blended with the mean of all ratings as if it had this many extra reviews.
+RANKING_PRIOR_WEIGHT = int(os.getenv("RANKING_PRIOR_WEIGHT", 10))
+# /api/changes/ holds back entries younger than this, so a write committing
+# after a newer one is never skipped by a client's cursor.
+CHANGE_FEED_SETTLE_SECONDS = float(os.getenv("CHANGE_FEED_SETTLE_SECONDS", 2))
+# Restaurant and review list pages are read with values() and serialized
+# without model instances (api/serializers.py ValuesSerializerMixin).
+FAST_LIST_SERIALIZERS = os.getenv("FAST_LIST_SERIALIZERS", "True") == "True"
+# List pages count exactly up to this many rows. Beyond it the count is the
+# planner's estimate on PostgreSQL, or an exact count cached for
+# PAGINATION_COUNT_CACHE_TTL seconds on other databases.
+PAGINATION_EXACT_COUNT_THRESHOLD = int(os.getenv("PAGINATION_EXACT_COUNT_THRESHOLD", 10000))
+PAGINATION_COUNT_CACHE_TTL = int(os.getenv("PAGINATION_COUNT_CACHE_TTL", 60))
@@ -0,0 +1,19 @@
+"""
+SQLite backend that accepts CharFields without a max_length.
+
+0001_initial created User.role as an unbounded CharField, which PostgreSQL
+stores as varchar but Django's SQLite backend renders as "varchar(None)".
+Like the PostgreSQL backend, this one falls back to a plain varchar, so the
+migration history applies on SQLite unchanged.
+"""
+from django.db.backends.sqlite3 import base
+
+
+def _get_varchar_column(data):
+    if data['max_length'] is None:
+        return 'varchar'
+    return 'varchar(%(max_length)s)' % data
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    data_types = {**base.DatabaseWrapper.data_types, 'CharField': _get_varchar_column}